@@ -1,10 +1,62 @@
 # main.py (in root)
 from mcpserver.server import mcp
+import argparse
+import os
 import traceback
 
+# Same as mcpserver.asgi.LOCAL_HOSTS; importing that module builds the HTTP app
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Outlook MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"], default="stdio",
+                        help="stdio for Claude Desktop (default), or an HTTP transport for remote and concurrent clients")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="HTTP port (default: 8000)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="HTTP worker processes sharing the port (default: 1); streamable-http only")
+    parser.add_argument("--stateful", action="store_true",
+                        help="Keep streamable-http sessions in the worker (single worker only)")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.transport != "streamable-http":
+        # SSE streams and stdio are bound to one process
+        parser.error("--workers > 1 requires --transport streamable-http")
+    if args.workers > 1 and args.stateful:
+        # Each worker keeps its own sessions, and requests are not routed back to the worker holding theirs
+        parser.error("--stateful requires a single worker")
+    if args.transport != "stdio" and args.host not in LOCAL_HOSTS and not os.getenv("OUTLOOK_MCP_AUTH_TOKEN"):
+        # Anyone reaching the port would otherwise act as the signed-in user
+        parser.error("set OUTLOOK_MCP_AUTH_TOKEN before binding to a non-loopback --host")
+    return args
+
+
+def run_http(args):
+    import uvicorn
+
+    # Workers are separate processes that import mcpserver.asgi, so configuration travels in the environment
+    os.environ["OUTLOOK_MCP_TRANSPORT"] = args.transport
+    os.environ["OUTLOOK_MCP_STATELESS_HTTP"] = "false" if args.stateful else "true"
+    os.environ["OUTLOOK_MCP_HOST"] = args.host
+    # Each worker paces Graph requests on its own, so the per-mailbox budget is split between them
+    os.environ["OUTLOOK_MCP_WORKERS"] = str(args.workers)
+    if args.workers > 1:
+        # Folder trees and search results must be visible to every worker
+        os.environ.setdefault("OUTLOOK_MCP_SHARED_CACHE", "true")
+
+    uvicorn.run("mcpserver.asgi:app", host=args.host, port=args.port, workers=args.workers)
+
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        mcp.run()
+        if args.transport == "stdio":
+            mcp.run()
+        else:
+            run_http(args)
     except Exception as e:
         print(f"Error running server: {str(e)}")
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
@@ -0,0 +1,129 @@
+# mcpserver/asgi.py
+"""
+ASGI application for serving the MCP server over HTTP, e.g. with several uvicorn worker processes:
+
+    uvicorn mcpserver.asgi:app --workers 4 --port 8000
+
+Configured through environment variables (main.py sets them from its command line):
+    OUTLOOK_MCP_TRANSPORT: "streamable-http" (default) or "sse"
+    OUTLOOK_MCP_STATELESS_HTTP: "true" (default) lets any worker answer any request, so no session affinity is needed
+    OUTLOOK_MCP_HOST: Address the server is bound to
+    OUTLOOK_MCP_AUTH_TOKEN: Bearer token every request must carry; required unless bound to a loopback address
+    OUTLOOK_MCP_ALLOWED_HOSTS: Comma-separated host names clients reach the server by, accepted in Host headers
+"""
+import hmac
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from mcp.server.transport_security import TransportSecuritySettings
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+
+from mcpserver.context_manager import close_app_context, keep_app_context_open
+from mcpserver.server import mcp
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+# Bind addresses that listen on every interface; they are never what clients put in the Host header
+WILDCARD_HOSTS = ("0.0.0.0", "::", "")
+
+
+class BearerTokenMiddleware:
+    """ASGI middleware rejecting HTTP requests that lack the header "Authorization: Bearer <token>"."""
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.expected = f"Bearer {token}".encode("utf-8")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            authorization = dict(scope.get("headers") or []).get(b"authorization", b"")
+            if not hmac.compare_digest(authorization, self.expected):
+                response = JSONResponse({"error": "unauthorized"}, status_code=401,
+                                        headers={"WWW-Authenticate": "Bearer"})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def transport_security(host: str, allowed_hosts: Optional[List[str]] = None) -> TransportSecuritySettings:
+    """
+    DNS rebinding protection accepting the loopback names, the bind address and allowed_hosts
+
+    Args:
+        host: Address the server is bound to
+        allowed_hosts: Host names clients reach the server by, e.g. a DNS name or load balancer address
+
+    Returns:
+        TransportSecuritySettings for FastMCP
+    """
+    names = ["127.0.0.1", "localhost", "[::1]"]
+    if host not in LOCAL_HOSTS + WILDCARD_HOSTS:
+        names.append(f"[{host}]" if ":" in host else host)
+    names.extend(name for name in allowed_hosts or [] if name not in names)
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=[pattern for name in names for pattern in (name, f"{name}:*")],
+        allowed_origins=[pattern for name in names for scheme in ("http", "https")
+                         for pattern in (f"{scheme}://{name}", f"{scheme}://{name}:*")],
+    )
+
+
+def create_app(transport: str = "streamable-http",
+               stateless: bool = True,
+               host: str = "127.0.0.1",
+               auth_token: Optional[str] = None,
+               allowed_hosts: Optional[List[str]] = None) -> Starlette:
+    """
+    Build the HTTP app for a transport
+
+    Args:
+        transport: "streamable-http" or "sse"
+        stateless: Serve streamable HTTP without server-side sessions, so requests need no affinity to a worker
+        host: Address the server is bound to
+        auth_token: Bearer token every request must carry; required unless host is a loopback address
+        allowed_hosts: Host names clients reach the server by, in addition to the loopback names and host
+
+    Returns:
+        Starlette app; the shared Graph client, credential and caches are created on the first request and
+        closed when the app shuts down
+    """
+    if transport not in ("streamable-http", "sse"):
+        raise ValueError("transport must be 'streamable-http' or 'sse'")
+    if host not in LOCAL_HOSTS and not auth_token:
+        # Every caller acts as the signed-in user (or, in app-only mode, on the configured mailboxes)
+        raise ValueError("OUTLOOK_MCP_AUTH_TOKEN must be set to serve on a non-loopback address")
+
+    mcp.settings.stateless_http = stateless
+    mcp.settings.host = host
+    mcp.settings.transport_security = transport_security(host, allowed_hosts)
+    # FastMCP builds its session manager (which captures these settings and runs only once) on first use
+    mcp._session_manager = None
+
+    # Every MCP session would otherwise open and close its own Graph client and caches
+    keep_app_context_open()
+    app = mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(starlette_app):
+        async with mcp_lifespan(starlette_app) as state:
+            try:
+                yield state
+            finally:
+                await close_app_context()
+
+    app.router.lifespan_context = lifespan
+    if auth_token:
+        app.add_middleware(BearerTokenMiddleware, token=auth_token)
+    return app
+
+
+app = create_app(
+    transport=os.getenv("OUTLOOK_MCP_TRANSPORT", "streamable-http"),
+    stateless=os.getenv("OUTLOOK_MCP_STATELESS_HTTP", "true").lower() in ("1", "true", "yes"),
+    host=os.getenv("OUTLOOK_MCP_HOST", "127.0.0.1"),
+    auth_token=os.getenv("OUTLOOK_MCP_AUTH_TOKEN") or None,
+    allowed_hosts=[name.strip() for name in os.getenv("OUTLOOK_MCP_ALLOWED_HOSTS", "").split(",") if name.strip()],
+)
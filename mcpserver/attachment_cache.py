@@ -0,0 +1,186 @@
+# mcpserver/attachment_cache.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attachments (
+    key TEXT PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    attachment_id TEXT NOT NULL,
+    name TEXT,
+    content_type TEXT,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attachments_path ON attachments (path);
+"""
+
+
+@dataclass
+class CachedAttachment:
+    """An attachment stored on disk; path is named by the SHA-256 of the content"""
+    message_id: str
+    attachment_id: str
+    name: str
+    content_type: Optional[str]
+    size: int
+    sha256: str
+    path: str
+    last_used: float = 0.0
+
+
+class AttachmentCache:
+    """
+    Content-addressed attachment files in a bounded directory.
+    Identical content downloaded through different messages is stored once; the least recently
+    used files are deleted when the directory grows beyond max_bytes.
+
+    The index is a SQLite file (WAL) in the directory, so several server processes (e.g. HTTP workers) can
+    share one directory: each sees the others' downloads, and eviction accounts for all of them.
+    One cache serves every mailbox under one byte budget; entries are keyed by mailbox, so a mailbox only
+    finds its own downloads.
+    """
+
+    _COLUMNS = [field.name for field in fields(CachedAttachment)]
+
+    def __init__(self, directory: Path, max_bytes: int = 1024 * 1024 * 1024, timeout: float = 5.0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.directory / "index.db", timeout=timeout, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # Per-download lock and the number of requests holding or waiting for it; dropped when that reaches 0
+        self._locks: Dict[str, List] = {}
+
+    @staticmethod
+    def _key(message_id: str, attachment_id: str, mailbox_id: Optional[str] = None) -> str:
+        # Entries of the signed-in user (/me) keep the unprefixed keys; user principal names are case-insensitive
+        if mailbox_id:
+            return f"{mailbox_id.lower()}|{message_id}/{attachment_id}"
+        return f"{message_id}/{attachment_id}"
+
+    def _upsert(self, key: str, entry: CachedAttachment):
+        values = [getattr(entry, column) for column in self._COLUMNS]
+        with self._lock:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO attachments (key, {', '.join(self._COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in self._COLUMNS)})", [key, *values])
+
+    def close(self):
+        self.connection.close()
+
+    @asynccontextmanager
+    async def lock(self, message_id: str, attachment_id: str, mailbox_id: Optional[str] = None) -> AsyncIterator[None]:
+        """Lock held while an attachment downloads, so concurrent requests in this process share one download"""
+        key = self._key(message_id, attachment_id, mailbox_id)
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def get(self, message_id: str, attachment_id: str, mailbox_id: Optional[str] = None) -> Optional[CachedAttachment]:
+        key = self._key(message_id, attachment_id, mailbox_id)
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM attachments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = CachedAttachment(*row)
+        if not Path(entry.path).exists():
+            return None
+        entry.last_used = time.time()
+        with self._lock:
+            self.connection.execute("UPDATE attachments SET last_used = ? WHERE key = ?", (entry.last_used, key))
+        return entry
+
+    async def store(self, message_id: str, attachment_id: str, name: str, content_type: Optional[str],
+                    chunks: AsyncIterable[bytes], mailbox_id: Optional[str] = None) -> CachedAttachment:
+        """
+        Write a streamed attachment to disk chunk by chunk, hashing as it goes
+
+        Args:
+            message_id: ID of the message the attachment belongs to
+            attachment_id: ID of the attachment
+            name: Attachment file name
+            content_type: MIME type reported by Graph
+            chunks: Async iterable of content chunks
+            mailbox_id: Mailbox the message belongs to (None for the signed-in user)
+
+        Returns:
+            The cached attachment entry
+        """
+        digest = hashlib.sha256()
+        size = 0
+        file_descriptor, temp_name = tempfile.mkstemp(dir=self.directory, prefix=".download-")
+        temp_path = Path(temp_name)
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    file.write(chunk)
+
+            # Keep the original extension so the file opens with the right application
+            sha256 = digest.hexdigest()
+            final_path = self.directory / f"{sha256}{Path(name or '').suffix.lower()}"
+            if final_path.exists():
+                temp_path.unlink()
+            else:
+                os.replace(temp_path, final_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        entry = CachedAttachment(message_id=message_id, attachment_id=attachment_id, name=name,
+                                 content_type=content_type, size=size, sha256=sha256, path=str(final_path),
+                                 last_used=time.time())
+        self._upsert(self._key(message_id, attachment_id, mailbox_id), entry)
+        self._evict(keep=entry.path)
+        return entry
+
+    def _evict(self, keep: str):
+        """Delete least recently used files, other than keep, until the cache fits in max_bytes"""
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so processes evicting at the same time take turns
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Several entries may share one content-addressed file; it is as recent as its newest use
+                files = self.connection.execute(
+                    "SELECT path, MAX(size) FROM attachments GROUP BY path ORDER BY MAX(last_used)").fetchall()
+                total = sum(size for _, size in files)
+                evicted = []
+                for path, size in files:
+                    if total <= self.max_bytes:
+                        break
+                    if path == keep:
+                        # Never delete the file that was just downloaded
+                        continue
+                    evicted.append(path)
+                    total -= size
+                self.connection.executemany("DELETE FROM attachments WHERE path = ?", [(path,) for path in evicted])
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        for path in evicted:
+            Path(path).unlink(missing_ok=True)
@@ -1,6 +1,38 @@
 import functools
 import logging
-from typing import Callable
+from typing import Callable, Collection, Optional
+
+from mcpserver.graph.controller import account_key
+from mcpserver.graph.mailbox import current_mailbox
+
+# HTTP header naming the mailbox (user ID or UPN) a request acts on, for servers serving several mailboxes
+MAILBOX_HEADER = "X-Mailbox"
+
+
+def requested_mailbox(ctx, default: Optional[str] = None, allowed: Collection[str] = ()) -> Optional[str]:
+    """
+    Mailbox a request acts on
+
+    Args:
+        ctx: Tool context
+        default: Mailbox used when the request names none (AZURE_MAILBOX_ID)
+        allowed: Lowercase mailboxes the X-Mailbox header may select (AZURE_ALLOWED_MAILBOXES)
+
+    Returns:
+        The mailbox named by the X-Mailbox header (HTTP transports only), else default
+
+    Raises:
+        PermissionError: If the header names a mailbox that is neither default nor in allowed
+    """
+    request = getattr(ctx.request_context, "request", None)
+    headers = getattr(request, "headers", None)
+    mailbox_id = (headers.get(MAILBOX_HEADER) or "").strip() if headers is not None else ""
+    if not mailbox_id:
+        return default
+    # The header comes from the caller, so it may only pick mailboxes the operator has allowed
+    if account_key(mailbox_id) != account_key(default) and account_key(mailbox_id) not in allowed:
+        raise PermissionError(f"Mailbox {mailbox_id} is not in AZURE_ALLOWED_MAILBOXES")
+    return mailbox_id
 
 
 def requires_graph_auth(func: Callable) -> Callable:
@@ -16,19 +48,34 @@ def requires_graph_auth(func: Callable) -> Callable:
         # Check if we already have a client
         user_client = auth_settings.get_user_client()
 
-        if user_client is not None:
-            # We're authenticated, proceed with the function
-            logging.info("Already authenticated, proceeding with function")
-            ctx.request_context.lifespan_context.graph.user_client = user_client
-            return await func(ctx, *args, **kwargs)
-        else:
-            # We need to authenticate - return instructions
-            logging.info("Authentication required, returning instructions")
+        if user_client is None:
+            # We need to authenticate - all concurrent callers share one device code flow
+            logging.info("Authentication required")
             try:
-                auth_message = auth_settings.get_auth_instructions()
-                return auth_message
+                auth_message = await auth_settings.get_auth_instructions()
             except Exception as e:
                 logging.error(f"Authentication error: {str(e)}")
                 return f"Error during authentication: {str(e)}"
+            if auth_message is not None:
+                return auth_message
+            user_client = auth_settings.user_client
+
+        try:
+            mailbox_id = requested_mailbox(ctx, auth_settings.mailbox_id, auth_settings.allowed_mailboxes)
+        except PermissionError as e:
+            logging.warning(f"Rejected {MAILBOX_HEADER} header: {str(e)}")
+            return f"Error: {str(e)}"
+        if mailbox_id is None and auth_settings.app_only:
+            return f"Error: No mailbox selected. Set AZURE_MAILBOX_ID or send an {MAILBOX_HEADER} header"
+
+        # We're authenticated, proceed with the function
+        logging.info("Authenticated, proceeding with function")
+        ctx.request_context.lifespan_context.graph.set_user_client(user_client)
+        # Services resolve the mailbox per call, so concurrent calls for different mailboxes stay separate
+        token = current_mailbox.set(mailbox_id)
+        try:
+            return await func(ctx, *args, **kwargs)
+        finally:
+            current_mailbox.reset(token)
 
     return wrapper
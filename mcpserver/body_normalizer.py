@@ -0,0 +1,252 @@
+# mcpserver/body_normalizer.py
+import re
+from collections import OrderedDict
+from html import unescape
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+
+# Elements whose content is never shown to a reader
+_SKIP_TAGS = {'head', 'style', 'script', 'title', 'template', 'noscript'}
+
+# Elements that start a new line in the rendered text
+_BLOCK_TAGS = {'p', 'div', 'table', 'tr', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'hr',
+               'section', 'article', 'header', 'footer', 'blockquote'}
+
+# Markers Outlook, Gmail and Apple Mail put around the quoted previous message; everything after is history
+_QUOTE_START_IDS = {'divrplyfwdmsg', 'appendonsend', 'mail-editor-reference-message-container'}
+_QUOTE_START_CLASSES = {'gmail_quote', 'yahoo_quoted', 'moz-cite-prefix'}
+
+# Plain-text lines that introduce quoted history
+_QUOTE_HEADER_PATTERNS = [
+    re.compile(r'^-{2,}\s*Original Message\s*-{2,}', re.IGNORECASE),
+    re.compile(r'^-{2,}\s*Forwarded message\s*-{2,}', re.IGNORECASE),
+    re.compile(r'^_{10,}\s*$'),
+    re.compile(r'^On .{0,200}\bwrote:\s*$', re.IGNORECASE),
+]
+_OUTLOOK_HEADER = re.compile(r'^\*?From:\*?\s.+', re.IGNORECASE)
+_OUTLOOK_HEADER_FOLLOW = re.compile(r'^\*?(Sent|Date|To|Subject):\*?\s', re.IGNORECASE)
+
+# Lines that start a signature block
+_SIGNATURE_PATTERNS = [
+    re.compile(r'^--\s*$'),
+    re.compile(r'^Sent from my \w+', re.IGNORECASE),
+    re.compile(r'^Get Outlook for \w+', re.IGNORECASE),
+]
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the readable text of an HTML body, dropping markup, images and (optionally) quoted history"""
+
+    def __init__(self, strip_quotes: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.strip_quotes = strip_quotes
+        self.parts: List[str] = []
+        # Skipped regions end at the end tag matching skip_tag; other tags inside may be unbalanced
+        self.skip_tag: Optional[str] = None
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.done = False
+
+    def _newline(self):
+        self.parts.append('\n')
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+
+        if tag in _SKIP_TAGS:
+            self._skip(tag)
+            return
+
+        if self.strip_quotes:
+            attributes = dict(attrs)
+            element_id = (attributes.get('id') or '').lower()
+            classes = set((attributes.get('class') or '').lower().split())
+            if element_id in _QUOTE_START_IDS or classes & _QUOTE_START_CLASSES:
+                # Everything from here on is the quoted thread
+                self.done = True
+                return
+            if tag == 'blockquote':
+                self._skip(tag)
+                return
+
+        if tag == 'br':
+            self._newline()
+        elif tag == 'li':
+            self.parts.append('\n- ')
+        elif tag in ('td', 'th'):
+            self.parts.append(' ')
+        elif tag == 'pre':
+            self.pre_depth += 1
+            self._newline()
+        elif tag in _BLOCK_TAGS:
+            self._newline()
+
+    def _skip(self, tag: str):
+        self.skip_tag = tag
+        self.skip_depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags such as <br/> open nothing: they must not reach handle_endtag, and a self-closed
+        # <blockquote/> or <script/> must not start a skipped region
+        skip_depth = self.skip_depth
+        self.handle_starttag(tag, attrs)
+        self.skip_depth = skip_depth
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+            return
+        if tag == 'pre':
+            self.pre_depth = max(0, self.pre_depth - 1)
+        if tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self.done or self.skip_depth:
+            return
+        if self.pre_depth:
+            self.parts.append(data)
+        else:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def html_to_text(html: str, strip_quotes: bool = True) -> str:
+    """
+    Convert an HTML mail body to compact plain text
+
+    Args:
+        html: HTML body content
+        strip_quotes: If True, drops blockquotes and everything after a reply/forward header
+
+    Returns:
+        Plain text with collapsed whitespace and at most one blank line between paragraphs
+    """
+    extractor = _TextExtractor(strip_quotes=strip_quotes)
+    extractor.feed(html)
+    extractor.close()
+    return _collapse_whitespace(extractor.text())
+
+
+def _collapse_whitespace(text: str) -> str:
+    lines = [line.strip() for line in text.replace('\r\n', '\n').replace('\xa0', ' ').split('\n')]
+    result = []
+    for line in lines:
+        if not line and (not result or not result[-1]):
+            continue
+        result.append(line)
+    return '\n'.join(result).strip()
+
+
+def strip_quoted_text(text: str) -> str:
+    """
+    Remove quoted history and signatures from a plain-text body
+
+    Args:
+        text: Plain-text body
+
+    Returns:
+        Only the new content the sender wrote
+    """
+    lines = text.split('\n')
+    kept = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if any(pattern.match(stripped) for pattern in _QUOTE_HEADER_PATTERNS):
+            break
+        # Outlook quotes previous messages under a "From: ... / Sent: ..." header block
+        if _OUTLOOK_HEADER.match(stripped) and index + 1 < len(lines) \
+                and _OUTLOOK_HEADER_FOLLOW.match(lines[index + 1].strip()):
+            break
+        if any(pattern.match(stripped) for pattern in _SIGNATURE_PATTERNS):
+            break
+        if stripped.startswith('>'):
+            continue
+        kept.append(line)
+    return _collapse_whitespace('\n'.join(kept))
+
+
+def normalize_body(content: Optional[str], content_type: Optional[str] = 'html', strip_quotes: bool = True) -> str:
+    """
+    Turn a Graph message body into compact text for the model
+
+    Args:
+        content: Body content as returned by Graph
+        content_type: "html" or "text"
+        strip_quotes: If True, removes quoted previous messages and signatures
+
+    Returns:
+        Normalized plain text
+    """
+    if not content:
+        return ""
+    if (content_type or 'html').lower() == 'html':
+        text = html_to_text(content, strip_quotes=strip_quotes)
+    else:
+        text = _collapse_whitespace(unescape(content))
+    return strip_quoted_text(text) if strip_quotes else text
+
+
+class BodyCache:
+    """LRU cache of normalized bodies keyed by message ID and changeKey, so edits invalidate naturally"""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries: OrderedDict[Tuple, str] = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[str]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Tuple, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+_body_cache = BodyCache()
+
+
+def normalize_message_body(message, strip_quotes: bool = True) -> str:
+    """
+    Normalized body of a Graph message, served from the cache when the message has not changed
+
+    Args:
+        message: Graph Message with body (and ideally change_key) populated
+        strip_quotes: If True, removes quoted previous messages and signatures
+
+    Returns:
+        Normalized plain text body
+    """
+    body = getattr(message, 'body', None)
+    if not body or not body.content:
+        return ""
+
+    content_type = body.content_type.value if body.content_type else 'html'
+    change_key = getattr(message, 'change_key', None)
+    # Without a changeKey there is no way to tell if the cached copy is stale
+    key = (message.id, change_key, content_type, strip_quotes) if message.id and change_key else None
+
+    if key is not None:
+        cached = _body_cache.get(key)
+        if cached is not None:
+            return cached
+
+    text = normalize_body(body.content, content_type, strip_quotes=strip_quotes)
+    if key is not None:
+        _body_cache.set(key, text)
+    return text
@@ -8,12 +8,12 @@ def format_calendar_event(event):
         String with formatted event details
     """
     # Start with the ID (crucial for operations like delete/update)
-    result = f"ID: {event.id}\n"
-    result += f"Subject: {event.subject}\n"
+    parts = [f"ID: {event.id}\n"]
+    parts.append(f"Subject: {event.subject}\n")
 
     # Add organizer info
     if event.organizer and event.organizer.email_address:
-        result += f"Organizer: {event.organizer.email_address.name or 'Unknown'} <{event.organizer.email_address.address or 'No email'}>\n"
+        parts.append(f"Organizer: {event.organizer.email_address.name or 'Unknown'} <{event.organizer.email_address.address or 'No email'}>\n")
 
 
     # Variables to store parsed datetime objects for start and end
@@ -29,9 +29,9 @@ def format_calendar_event(event):
                 from datetime import datetime
                 start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00').split('.')[0])
                 formatted_start = start_dt.strftime("%A, %B %d, %Y at %I:%M %p")
-                result += f"Start: {formatted_start} ({event.start.time_zone.replace(' Time', '')})\n"
+                parts.append(f"Start: {formatted_start} ({event.start.time_zone.replace(' Time', '')})\n")
             except Exception:
-                result += f"Start: {event.start.date_time} ({event.start.time_zone})\n"
+                parts.append(f"Start: {event.start.date_time} ({event.start.time_zone})\n")
 
     if event.end:
         # Format: "Monday, May 5, 2025 at 6:45 PM (AESST)"
@@ -47,43 +47,37 @@ def format_calendar_event(event):
                 else:
                     formatted_end = end_dt.strftime("%A, %B %d, %Y at %I:%M %p")
 
-                result += f"End: {formatted_end} ({event.end.time_zone.replace(' Time', '')})\n"
+                parts.append(f"End: {formatted_end} ({event.end.time_zone.replace(' Time', '')})\n")
             except Exception:
-                result += f"End: {event.end.date_time} ({event.end.time_zone})\n"
+                parts.append(f"End: {event.end.date_time} ({event.end.time_zone})\n")
 
     # Add location if available
     if event.location and event.location.display_name:
-        result += f"Location: {event.location.display_name}\n"
+        parts.append(f"Location: {event.location.display_name}\n")
 
     # Add online meeting info if available
     if hasattr(event, 'is_online_meeting') and event.is_online_meeting:
-        result += f"Online Meeting: Yes\n"
+        parts.append(f"Online Meeting: Yes\n")
         if hasattr(event, 'online_meeting_url') and event.online_meeting_url:
-            result += f"Meeting URL: {event.online_meeting_url}\n"
+            parts.append(f"Meeting URL: {event.online_meeting_url}\n")
 
     # Add attendee count if there are attendees
     if event.attendees:
-        result += f"Attendees: {len(event.attendees)}\n"
+        parts.append(f"Attendees: {len(event.attendees)}\n")
 
-    return result
+    return "".join(parts)
 
 
-def format_event_page(event_page):
+def format_event_page(event_page, output_format: str = "verbose"):
     """Format a page of calendar events for display
 
     Args:
         event_page: Page of events from the GraphController API
+        output_format: "verbose", "compact" or "json"
 
     Returns:
         String with formatted event list
     """
-    result = ""
+    from mcpserver.rendering import render_events
 
-    if event_page and event_page.value:
-        # Format each event
-        for i, event in enumerate(event_page.value, 1):
-            result += f"{i}. {format_calendar_event(event)}\n"
-    else:
-        result += "No events found."
-
-    return result
\ No newline at end of file
+    return render_events(event_page.value if event_page else None, output_format)
@@ -5,6 +5,9 @@ from mcp.server.fastmcp import FastMCP
 from settings import AzureSettings
 import logging
 from mcpserver.graph.controller import GraphController
+from mcpserver.mail_store import MailStore
+from mcpserver.shared_cache import SharedCache
+from mcpserver.transport import create_http_client
 
 
 # Encapsulates state objects for passing via context
@@ -13,26 +16,89 @@ class AppContext:
     settings: AzureSettings
     graph: GraphController
 
-# FastMCP decorated tools accept contexts for managing lifecycle automatically when called by bot
-@asynccontextmanager
-async def app_lifespan(server: Optional[FastMCP]) -> AsyncIterator[AppContext]:
-    """Manage application lifecycle with type-safe context"""
+# HTTP transports enter the lifespan once per session (or per request when stateless); the state below is
+# created once per process and shared, so sessions reuse one connection pool, token cache and set of caches
+_app_context: Optional[AppContext] = None
+_persistent = False
+
+
+def keep_app_context_open():
+    """Keep the shared AppContext open across lifespans; the HTTP app closes it with close_app_context"""
+    global _persistent
+    _persistent = True
+
+
+async def open_app_context() -> AppContext:
+    """Create the process-wide AppContext on first use"""
+    global _app_context
+    if _app_context is not None:
+        return _app_context
 
     # If authenticated in previous session, graph will hold a valid graph_client
     # If not previously authenticated, graph will hold None and a wrapper will trigger auth before tools are run
     try:
         logging.info("Starting app lifespan")
         settings = AzureSettings()
+        # One connection pool for all Graph clients, including those created after re-authentication
+        settings.http_client = create_http_client(max_connections=settings.http_max_connections,
+                                                  max_keepalive_connections=settings.http_max_keepalive,
+                                                  keepalive_expiry=settings.http_keepalive_expiry,
+                                                  http2=settings.http2_enabled,
+                                                  mailbox_rate=settings.mailbox_rate,
+                                                  mailbox_burst=settings.mailbox_burst,
+                                                  mailbox_concurrency=settings.mailbox_concurrency,
+                                                  max_retries=settings.max_retries)
         user_client = settings.get_user_client()
-        graph = GraphController(user_client)
+
+        mail_store = None
+        if settings.local_store_enabled:
+            mail_store = MailStore(settings.local_store_path, sync_interval=settings.local_store_sync_interval)
+            logging.info(f"Local mail store enabled at {settings.local_store_path}")
+
+        shared_cache = None
+        if settings.shared_cache_path is not None:
+            shared_cache = SharedCache(settings.shared_cache_path)
+            logging.info(f"Shared cache enabled at {settings.shared_cache_path}")
+
+        graph = GraphController(user_client, mail_store=mail_store, folder_cache_ttl=settings.folder_cache_ttl,
+                                query_cache_ttl=settings.query_cache_ttl,
+                                attachment_cache_dir=settings.attachment_cache_dir,
+                                attachment_cache_max_bytes=settings.attachment_cache_max_bytes,
+                                http_client=settings.http_client,
+                                mailbox_id=settings.mailbox_id,
+                                client_factory=settings.create_mailbox_client,
+                                max_accounts=settings.max_accounts,
+                                account_idle_timeout=settings.account_idle_timeout,
+                                shared_cache=shared_cache)
 
         logging.info("Settings initialized: in app_lifespan")
     except Exception as e:
         logging.error(f"Error in app_lifespan: {str(e)}")
         raise e
 
+    _app_context = AppContext(settings=settings, graph=graph)
+    return _app_context
+
+
+async def close_app_context():
+    """Close the process-wide AppContext, if open"""
+    global _app_context
+    if _app_context is None:
+        return
+    context, _app_context = _app_context, None
+    if context.graph.mail_store is not None:
+        context.graph.mail_store.close()
+    await context.graph.aclose()
+    await context.settings.close()
+
+
+# FastMCP decorated tools accept contexts for managing lifecycle automatically when called by bot
+@asynccontextmanager
+async def app_lifespan(server: Optional[FastMCP]) -> AsyncIterator[AppContext]:
+    """Manage application lifecycle with type-safe context"""
+    context = await open_app_context()
     try:
-        yield AppContext(settings=settings, graph=graph)
+        yield context
     finally:
-        #Add any cleanup if needed
-        pass
+        if not _persistent:
+            await close_app_context()
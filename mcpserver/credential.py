@@ -0,0 +1,116 @@
+# mcpserver/credential.py
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from azure.core.credentials import AccessToken, TokenCredential
+
+# azure-identity credentials refresh tokens within 5 minutes of expiry; refreshing at the same point
+# means the wrapped credential actually returns a new token instead of its cached one
+DEFAULT_REFRESH_MARGIN = 300.0
+
+# Cached tokens closer than this to expiry are not handed out
+MIN_TOKEN_VALIDITY = 30.0
+
+# Delay before trying again when a background refresh fails or returns the token it already had
+REFRESH_RETRY_DELAY = 30.0
+
+_TokenKey = Tuple[Tuple[str, ...], Optional[str], bool]
+
+
+class AsyncCachedCredential:
+    """
+    Async credential wrapping a synchronous azure-identity credential (e.g. DeviceCodeCredential).
+
+    Tokens are kept in memory and refreshed in the background shortly before they expire, so requests
+    never wait on token acquisition once the first token exists. Every call into the wrapped credential,
+    including its MSAL cache I/O, runs in a worker thread instead of on the event loop.
+    Concurrent requests for a missing token share one acquisition.
+    """
+
+    def __init__(self, credential: TokenCredential, refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self.credential = credential
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[_TokenKey, AccessToken] = {}
+        self._pending: Dict[_TokenKey, asyncio.Task] = {}
+        self._refresh_tasks: Dict[_TokenKey, asyncio.Task] = {}
+
+    async def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None,
+                        enable_cae: bool = False, **kwargs) -> AccessToken:
+        """
+        Return a cached token for the scopes, acquiring one in a worker thread only if none is valid
+
+        Claims challenges (e.g. from continuous access evaluation) always bypass the cache.
+        """
+        key = (tuple(sorted(scopes)), tenant_id, enable_cae)
+        if claims is None:
+            token = self._tokens.get(key)
+            if token is not None and token.expires_on - time.time() > MIN_TOKEN_VALIDITY:
+                return token
+
+        options = dict(kwargs, claims=claims, tenant_id=tenant_id, enable_cae=enable_cae)
+        if claims is not None:
+            return await self._acquire(key, scopes, options)
+
+        # Single-flight: concurrent callers await the same acquisition
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._acquire(key, scopes, options))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _acquire(self, key: _TokenKey, scopes: Tuple[str, ...], options: dict) -> AccessToken:
+        token = await asyncio.to_thread(self.credential.get_token, *scopes, **options)
+        self._tokens[key] = token
+        self._schedule_refresh(key, scopes, options, token.expires_on - self.refresh_margin - time.time())
+        return token
+
+    def _schedule_refresh(self, key: _TokenKey, scopes: Tuple[str, ...], options: dict, delay: float):
+        previous = self._refresh_tasks.get(key)
+        if previous is not None and previous is not asyncio.current_task():
+            previous.cancel()
+        refresh_options = dict(options, claims=None)
+        self._refresh_tasks[key] = asyncio.ensure_future(self._refresh_later(key, scopes, refresh_options, delay))
+
+    async def _refresh_later(self, key: _TokenKey, scopes: Tuple[str, ...], options: dict, delay: float):
+        await asyncio.sleep(max(delay, 0))
+        current = self._tokens.get(key)
+        try:
+            token = await asyncio.to_thread(self.credential.get_token, *scopes, **options)
+        except Exception as e:
+            # The current token stays in use until it expires; a request after that acquires one itself
+            logging.warning(f"Background token refresh failed: {str(e)}")
+            if current is not None and current.expires_on - time.time() > MIN_TOKEN_VALIDITY:
+                self._schedule_refresh(key, scopes, options, REFRESH_RETRY_DELAY)
+            return
+
+        self._tokens[key] = token
+        if current is not None and token.expires_on <= current.expires_on:
+            # The wrapped credential served its cached token; ask again a little later
+            delay = REFRESH_RETRY_DELAY
+        else:
+            delay = token.expires_on - self.refresh_margin - time.time()
+        if token.expires_on - time.time() > MIN_TOKEN_VALIDITY:
+            self._schedule_refresh(key, scopes, options, delay)
+
+    def clear(self):
+        """Forget cached tokens and stop background refreshes"""
+        for task in list(self._refresh_tasks.values()) + list(self._pending.values()):
+            task.cancel()
+        self._refresh_tasks.clear()
+        self._pending.clear()
+        self._tokens.clear()
+
+    async def close(self):
+        self.clear()
+        close = getattr(self.credential, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
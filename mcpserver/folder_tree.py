@@ -0,0 +1,222 @@
+# mcpserver/folder_tree.py
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mcpserver.shared_cache import SharedCache
+
+
+@dataclass
+class FolderNode:
+    """A mail folder in the normalized folder tree"""
+    id: str
+    display_name: str
+    parent_id: Optional[str] = None
+    path: str = ""  # e.g. "Inbox/Clients/Acme"
+    child_folder_count: int = 0
+    children: List["FolderNode"] = field(default_factory=list)
+
+
+class FolderPathIndex:
+    """Case-insensitive character trie over full folder paths for exact and prefix lookups"""
+
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, path: str, node: FolderNode):
+        trie_node = self._root
+        for char in path.lower():
+            trie_node = trie_node.setdefault(char, {})
+        # None is never a path character, so it marks the end of a stored path
+        trie_node[None] = node
+
+    def _find(self, prefix: str) -> Optional[dict]:
+        trie_node = self._root
+        for char in prefix.lower():
+            trie_node = trie_node.get(char)
+            if trie_node is None:
+                return None
+        return trie_node
+
+    def exact(self, path: str) -> Optional[FolderNode]:
+        trie_node = self._find(path)
+        return trie_node.get(None) if trie_node else None
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[FolderNode]:
+        """Folders whose path starts with prefix, shortest paths first, at most limit results"""
+        start = self._find(prefix)
+        if start is None:
+            return []
+        matches = []
+        # Breadth-first so parents are returned before their subfolders
+        queue = [start]
+        while queue and len(matches) < limit:
+            next_queue = []
+            for trie_node in queue:
+                for char, child in trie_node.items():
+                    if char is None:
+                        matches.append(child)
+                    else:
+                        next_queue.append(child)
+            queue = next_queue
+        return matches[:limit]
+
+
+class FolderTree:
+    """In-memory mail folder hierarchy of any depth, indexed by folder ID, full path and display name"""
+
+    def __init__(self):
+        self.roots: List[FolderNode] = []
+        self.by_id: Dict[str, FolderNode] = {}
+        self.by_path: Dict[str, FolderNode] = {}
+        self.by_name: Dict[str, List[FolderNode]] = {}
+        self.path_index = FolderPathIndex()
+
+    def add(self, folder_id: str, display_name: str, parent: Optional[FolderNode] = None,
+            child_folder_count: int = 0) -> FolderNode:
+        """Add a folder under parent (or as a top-level folder) and return its node"""
+        display_name = display_name or "(No name)"
+        node = FolderNode(
+            id=folder_id,
+            display_name=display_name,
+            parent_id=parent.id if parent else None,
+            path=f"{parent.path}/{display_name}" if parent else display_name,
+            child_folder_count=child_folder_count or 0,
+        )
+        if parent:
+            parent.children.append(node)
+        else:
+            self.roots.append(node)
+        self.by_id[folder_id] = node
+        self.by_path[node.path] = node
+        self.by_name.setdefault(display_name.lower(), []).append(node)
+        self.path_index.insert(node.path, node)
+        return node
+
+    def get(self, folder_id: str) -> Optional[FolderNode]:
+        return self.by_id.get(folder_id)
+
+    def get_by_path(self, path: str) -> Optional[FolderNode]:
+        return self.by_path.get(path.strip("/"))
+
+    def resolve(self, path: str, prefix: bool = False, limit: int = 20) -> List[FolderNode]:
+        """
+        Resolve a folder path such as "Clients/Acme/Invoices" without contacting Graph
+
+        Args:
+            path: Full folder path (case-insensitive), or a bare display name
+            prefix: If True, returns every folder whose path starts with path
+            limit: Maximum number of folders to return
+
+        Returns:
+            Matching folders; an exact path match comes first
+        """
+        path = path.strip().strip("/")
+        exact = self.path_index.exact(path)
+        if not prefix:
+            if exact is not None:
+                return [exact]
+            # Fall back to display name so "Invoices" finds "Clients/Acme/Invoices"
+            return self.by_name.get(path.lower(), [])[:limit]
+
+        matches = self.path_index.prefix(path, limit=limit)
+        if len(matches) < limit:
+            # Subfolders named with the prefix, wherever they sit in the tree
+            seen = {node.id for node in matches}
+            for name, nodes in self.by_name.items():
+                if name.startswith(path.lower()):
+                    matches.extend(node for node in nodes if node.id not in seen)
+        return matches[:limit]
+
+    def walk(self) -> Iterator[Tuple[FolderNode, int]]:
+        """Yield (node, depth) pairs in display order, parents before their children"""
+        stack = [(node, 0) for node in reversed(self.roots)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            stack.extend((child, depth + 1) for child in reversed(node.children))
+
+    def to_hierarchy(self) -> List[dict]:
+        """Nested dicts with id, display_name, parent_folder_id and child_folders at every level"""
+        def to_dict(node: FolderNode) -> dict:
+            return {
+                "id": node.id,
+                "display_name": node.display_name,
+                "parent_folder_id": node.parent_id,
+                "child_folders": [to_dict(child) for child in node.children],
+            }
+        return [to_dict(root) for root in self.roots]
+
+    def path_to_id(self) -> Dict[str, str]:
+        """Full folder path to folder ID mapping; paths are unique even when display names repeat"""
+        return {node.path: node.id for node, _ in self.walk()}
+
+
+class FolderCache:
+    """
+    Folder tree cache with a time-to-live, shared by every MailService of a GraphController.
+    Folder creation writes through to the cached tree; folder-not-found errors invalidate it.
+    With a SharedCache backend the tree is stored there instead, so every server process shares one copy.
+    """
+
+    _BACKEND_KEY = "tree"
+
+    def __init__(self, ttl: float = 300.0, backend: Optional[SharedCache] = None, namespace: str = "me"):
+        self.ttl = ttl
+        self.backend = backend
+        self.namespace = f"folders:{namespace}"
+        self._tree: Optional[FolderTree] = None
+        self._loaded_at = 0.0
+        # Version of the backend tree _tree was read from; a different version means another process replaced it
+        self._version: Optional[str] = None
+        # Well-known name -> folder ID; these never change for a mailbox, so they outlive the tree
+        self.well_known_ids: Dict[str, str] = {}
+        self.lock = asyncio.Lock()  # Held while loading so concurrent callers share one load
+
+    def get(self) -> Optional[FolderTree]:
+        """Return the cached tree, or None if it was never loaded or has expired"""
+        if self.backend is not None:
+            # Only the small version row is read per call; the pickled tree is loaded when it changed
+            meta = self.backend.get_meta(self.namespace, self._BACKEND_KEY)
+            if meta is None:
+                self._tree = None
+                return None
+            if self._tree is None or meta.get("version") != self._version:
+                self._tree = self.backend.get(self.namespace, self._BACKEND_KEY)
+                self._version = meta.get("version")
+            return self._tree
+        if self._tree is None or time.monotonic() - self._loaded_at > self.ttl:
+            return None
+        return self._tree
+
+    def set(self, tree: FolderTree):
+        if self.backend is not None:
+            self._version = uuid.uuid4().hex
+            self.backend.set(self.namespace, self._BACKEND_KEY, tree, self.ttl, meta={"version": self._version})
+        self._tree = tree
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self._tree = None
+        self._version = None
+        if self.backend is not None:
+            self.backend.clear(self.namespace)
+
+    def add_folder(self, folder_id: str, display_name: str, parent_id: Optional[str] = None):
+        """Write a newly created folder through to the cached tree"""
+        tree = self.get()
+        if tree is None:
+            return
+        parent = tree.get(parent_id) if parent_id else None
+        if parent_id and parent is None:
+            # Parent is not in the tree (e.g. a well-known name was used); reload next time
+            self.invalidate()
+            return
+        tree.add(folder_id, display_name, parent)
+        if parent:
+            parent.child_folder_count += 1
+        if self.backend is not None:
+            # Publish the updated tree to the other processes
+            self.set(tree)
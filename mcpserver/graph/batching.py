@@ -0,0 +1,132 @@
+# mcpserver/graph/batching.py
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import List, Optional
+
+from msgraph import GraphServiceClient
+from kiota_abstractions.method import Method
+from kiota_abstractions.request_information import RequestInformation
+from msgraph.generated.models.o_data_errors.o_data_error import ODataError
+
+from mcpserver.throttling import backoff_delay, parse_retry_after
+
+
+# Graph accepts at most 20 requests in one JSON $batch
+BATCH_SIZE = 20
+# Number of $batch requests in flight at once
+DEFAULT_BATCH_CONCURRENCY = 4
+# Times requests throttled inside a $batch are sent again; the $batch call itself succeeds with 200
+BATCH_MAX_RETRIES = 5
+BATCH_RETRY_STATUS_CODES = {429, 503, 504}
+
+
+@dataclass
+class BatchRequest:
+    """A single request inside a JSON $batch; url is relative to the API version, e.g. /me/messages/{id}"""
+    method: str
+    url: str
+    body: Optional[dict] = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a single request from a JSON $batch"""
+    status: int
+    body: Optional[dict] = None
+    retry_after: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def error_message(self) -> Optional[str]:
+        if self.ok:
+            return None
+        if self.body and isinstance(self.body.get("error"), dict):
+            return self.body["error"].get("message") or self.body["error"].get("code")
+        return f"HTTP {self.status}"
+
+
+async def _post_batch(user_client: GraphServiceClient, requests: List[BatchRequest]) -> List[BatchResult]:
+    """Send up to BATCH_SIZE requests as one POST /$batch and return results in request order"""
+    payload = {"requests": []}
+    for index, request in enumerate(requests):
+        item = {"id": str(index), "method": request.method, "url": request.url}
+        if request.body is not None:
+            item["body"] = request.body
+            item["headers"] = {"Content-Type": "application/json"}
+        payload["requests"].append(item)
+
+    request_info = RequestInformation(Method.POST, "{+baseurl}/$batch")
+    request_info.headers.try_add("Accept", "application/json")
+    request_info.set_stream_content(json.dumps(payload).encode("utf-8"), "application/json")
+
+    raw_response = await user_client.request_adapter.send_primitive_async(
+        request_info, "bytes", {"XXX": ODataError})
+    responses = json.loads(raw_response or b"{}").get("responses", [])
+
+    # Responses may come back in any order; match them up by id
+    results = [BatchResult(status=0, body={"error": {"message": "No response in batch"}}) for _ in requests]
+    for response in responses:
+        body = response.get("body")
+        headers = {key.lower(): value for key, value in (response.get("headers") or {}).items()}
+        results[int(response["id"])] = BatchResult(
+            status=int(response.get("status", 0)),
+            body=body if isinstance(body, dict) else None,
+            retry_after=parse_retry_after(headers.get("retry-after"))
+        )
+    return results
+
+
+async def execute_batch(user_client: GraphServiceClient,
+                        requests: List[BatchRequest],
+                        batch_size: int = BATCH_SIZE,
+                        concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> List[BatchResult]:
+    """
+    Run many Graph requests through JSON $batch with bounded concurrency
+
+    Requests throttled inside a $batch (429, 503 or 504) are sent again after their Retry-After, or after jittered
+    exponential backoff, up to BATCH_MAX_RETRIES times.
+
+    Args:
+        user_client: Authenticated GraphServiceClient
+        requests: Requests to execute; independent of each other
+        batch_size: Requests packed into each $batch call (max 20)
+        concurrency: Maximum number of $batch calls in flight
+
+    Returns:
+        One BatchResult per request, in the same order as requests
+    """
+    batch_size = max(1, min(batch_size, BATCH_SIZE))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    chunks = [requests[start:start + batch_size] for start in range(0, len(requests), batch_size)]
+
+    async def run_chunk(chunk: List[BatchRequest]) -> List[BatchResult]:
+        async with semaphore:
+            try:
+                results = await _post_batch(user_client, chunk)
+            except Exception as e:
+                # A failed $batch call fails every request in it, but not the other chunks
+                return [BatchResult(status=0, body={"error": {"message": str(e)}}) for _ in chunk]
+
+            for attempt in range(BATCH_MAX_RETRIES):
+                throttled = [index for index, result in enumerate(results)
+                             if result.status in BATCH_RETRY_STATUS_CODES]
+                if not throttled:
+                    break
+                retry_after = [results[index].retry_after for index in throttled
+                               if results[index].retry_after is not None]
+                await asyncio.sleep(backoff_delay(attempt, max(retry_after) if retry_after else None))
+                try:
+                    retried = await _post_batch(user_client, [chunk[index] for index in throttled])
+                except Exception:
+                    # Keep the throttled results rather than failing requests that already succeeded
+                    break
+                for index, result in zip(throttled, retried):
+                    results[index] = result
+            return results
+
+    chunk_results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return [result for chunk in chunk_results for result in chunk]
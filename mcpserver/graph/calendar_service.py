@@ -12,14 +12,22 @@ from msgraph.generated.models.email_address import EmailAddress
 from msgraph.generated.models.attendee_type import AttendeeType
 from msgraph.generated.models.online_meeting_provider_type import OnlineMeetingProviderType
 from kiota_abstractions.base_request_configuration import RequestConfiguration
+from mcpserver.graph.mailbox import mailbox_builder
 import datetime
 
 
 class CalendarService:
     """Service for calendar-related operations using Microsoft Graph API"""
 
-    def __init__(self, user_client: GraphServiceClient):
+    def __init__(self, user_client: GraphServiceClient, mailbox_id: Optional[str] = None):
         self.user_client = user_client
+        # None targets the signed-in user (/me); otherwise a user ID or UPN (required in app-only mode)
+        self.mailbox_id = mailbox_id
+
+    @property
+    def mailbox(self):
+        """Request builder for the mailbox this service acts on"""
+        return mailbox_builder(self.user_client, self.mailbox_id)
 
     async def list_events(self, count: int = 10):
         """
@@ -46,7 +54,7 @@ class CalendarService:
         # Add timezone preference header
         request_config.headers.add("Prefer", 'outlook.timezone="AUS Eastern Standard Time"')
 
-        events = await self.user_client.me.events.get(request_configuration=request_config)
+        events = await self.mailbox.events.get(request_configuration=request_config)
         return events
 
     async def create_event(self, subject: str, body: str, start_datetime: str,
@@ -117,7 +125,7 @@ class CalendarService:
         request_configuration.headers.add("Prefer", f'outlook.timezone="{time_zone}"')
 
         # Create the event
-        result = await self.user_client.me.events.post(event, request_configuration=request_configuration)
+        result = await self.mailbox.events.post(event, request_configuration=request_configuration)
         return result
 
     async def list_events_by_date_range(self, start_date=None, end_date=None):
@@ -167,7 +175,7 @@ class CalendarService:
         request_config.headers.add("Prefer", 'outlook.timezone="AUS Eastern Standard Time"')
 
         # Use calendar view endpoint
-        events = await self.user_client.me.calendar.calendar_view.get(
+        events = await self.mailbox.calendar.calendar_view.get(
             request_configuration=request_config
         )
 
@@ -248,9 +256,21 @@ class CalendarService:
         request_configuration.headers.add("Prefer", f'outlook.timezone="{time_zone}"')
 
         # Create the event
-        result = await self.user_client.me.events.post(event, request_configuration=request_configuration)
+        result = await self.mailbox.events.post(event, request_configuration=request_configuration)
         return result
 
+    async def get_event(self, event_id: str):
+        """
+        Get a calendar event by ID
+
+        Args:
+            event_id: ID of the event
+
+        Returns:
+            The event
+        """
+        return await self.mailbox.events.by_event_id(event_id).get()
+
     async def delete_event(self, event_id: str, notify_attendees: bool = True):
         """
         Delete a calendar event
@@ -272,5 +292,5 @@ class CalendarService:
             }
 
         # Delete the event with the request configuration
-        await self.user_client.me.events.by_event_id(event_id).delete(request_configuration=request_config)
+        await self.mailbox.events.by_event_id(event_id).delete(request_configuration=request_config)
         return True
\ No newline at end of file
@@ -1,59 +1,221 @@
 from settings import AzureSettings
 from msgraph import GraphServiceClient
+from mcpserver.folder_tree import FolderCache
+from mcpserver.query_cache import QueryCache
+from mcpserver.attachment_cache import AttachmentCache
+from mcpserver.shared_cache import SharedCache
+from mcpserver.graph.mailbox import current_mailbox, mailbox_builder
 from msgraph.generated.users.item.user_item_request_builder import UserItemRequestBuilder
+from collections import OrderedDict
+from typing import Callable, Optional
+import logging
+import time
 
 from kiota_abstractions.base_request_configuration import RequestConfiguration
 
 
-class GraphController:
+class MailboxServices:
     """
-    Central controller for Microsoft Graph API interactions.
-    Manages the authenticated client and provides access to specialized services.
+    Services for one mailbox, created on first access.
+    Each mailbox has its own folder and search caches, since folder IDs and results differ between mailboxes.
     """
 
-    def __init__(self, user_client: GraphServiceClient):
+    def __init__(self, user_client: GraphServiceClient, mailbox_id: Optional[str] = None, mail_store=None,
+                 folder_cache: FolderCache = None, query_cache: QueryCache = None,
+                 attachment_cache: AttachmentCache = None):
         self.user_client = user_client
+        self.mailbox_id = mailbox_id
+        self.mail_store = mail_store
+        self.folder_cache = folder_cache if folder_cache is not None else FolderCache()
+        self.query_cache = query_cache if query_cache is not None else QueryCache()
+        self.attachment_cache = attachment_cache
         self._mail_service = None
         self._calendar_service = None
         self._files_service = None
 
     @property
     def mail(self):
-        """
-        Get the mail service instance.
-        Lazy-loads the service on first access.
-        """
         if self._mail_service is None:
             from mcpserver.graph.mail_service import MailService
-            self._mail_service = MailService(self.user_client)
+            self._mail_service = MailService(self.user_client, store=self.mail_store,
+                                             folder_cache=self.folder_cache, query_cache=self.query_cache,
+                                             attachment_cache=self.attachment_cache, mailbox_id=self.mailbox_id)
         return self._mail_service
 
     @property
     def files(self):
-        """
-        Get the files service instance.
-        Lazy-loads the service on first access.
-        """
         if self._files_service is None:
             from mcpserver.graph.files_service import FilesService
-            self._files_service = FilesService(self.user_client)
+            self._files_service = FilesService(self.user_client, mailbox_id=self.mailbox_id)
         return self._files_service
 
     @property
     def calendar(self):
-        """
-        Get the calendar service instance.
-        Lazy-loads the service on first access.
-        """
         if self._calendar_service is None:
             from mcpserver.graph.calendar_service import CalendarService
-            self._calendar_service = CalendarService(self.user_client)
+            self._calendar_service = CalendarService(self.user_client, mailbox_id=self.mailbox_id)
         return self._calendar_service
 
+
+def account_key(mailbox_id: Optional[str]) -> Optional[str]:
+    # User principal names are case-insensitive
+    return mailbox_id.lower() if mailbox_id else None
+
+
+class AccountPool:
+    """
+    LRU pool of MailboxServices keyed by account (mailbox ID, or None for the signed-in user).
+    Accounts unused for idle_timeout seconds, and the least recently used beyond max_accounts, are dropped
+    together with their client, services and caches.
+    """
+
+    def __init__(self, max_accounts: int = 256, idle_timeout: float = 1800.0):
+        self.max_accounts = max_accounts
+        self.idle_timeout = idle_timeout
+        self._entries: OrderedDict[Optional[str], tuple] = OrderedDict()
+
+    def get(self, mailbox_id: Optional[str], factory: Callable[[], MailboxServices]) -> MailboxServices:
+        key = account_key(mailbox_id)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[1] <= self.idle_timeout:
+            services = entry[0]
+        else:
+            services = factory()
+        self._entries[key] = (services, now)
+        self._entries.move_to_end(key)
+        self._evict(now)
+        return services
+
+    def _evict(self, now: float):
+        # Entries are in last-use order, so idle ones are at the front
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_accounts and now - last_used <= self.idle_timeout:
+                break
+            self._entries.popitem(last=False)
+            logging.info(f"Evicted account {key or 'me'} from the client pool")
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class GraphController:
+    """
+    Central controller for Microsoft Graph API interactions.
+    Manages the authenticated client and provides access to specialized services.
+    Services act on the mailbox of the current tool call (see mcpserver.graph.mailbox.current_mailbox),
+    falling back to mailbox_id, and to the signed-in user (/me) if neither is set.
+    Each mailbox gets its own GraphServiceClient (from client_factory) and services, kept in an AccountPool;
+    all clients share one HTTP transport and one credential.
+    """
+
+    def __init__(self, user_client: GraphServiceClient, mail_store=None, folder_cache_ttl: float = 300.0,
+                 query_cache_ttl: float = 60.0, attachment_cache_dir=None,
+                 attachment_cache_max_bytes: int = 1024 * 1024 * 1024, http_client=None,
+                 mailbox_id: Optional[str] = None,
+                 client_factory: Optional[Callable[[Optional[str]], GraphServiceClient]] = None,
+                 max_accounts: int = 256, account_idle_timeout: float = 1800.0,
+                 shared_cache: Optional[SharedCache] = None):
+        self.user_client = user_client
+        # Pooled httpx client shared by every GraphServiceClient; closed by aclose()
+        self.http_client = http_client
+        self.mail_store = mail_store
+        self.mailbox_id = mailbox_id
+        self.folder_cache_ttl = folder_cache_ttl
+        self.query_cache_ttl = query_cache_ttl
+        # Without a shared cache, folder trees and search pages live in this process's memory
+        self.shared_cache = shared_cache
+        # Folder metadata rarely changes; lookups within a session are served from memory
+        self.folder_cache = self._create_folder_cache(mailbox_id)
+        # Agents repeat identical searches while reasoning; mutations invalidate what they touch
+        self.query_cache = self._create_query_cache(mailbox_id)
+        self.attachment_cache = None
+        if attachment_cache_dir is not None:
+            self.attachment_cache = AttachmentCache(attachment_cache_dir, max_bytes=attachment_cache_max_bytes)
+        # Builds the client for an account; without one, every account uses user_client
+        self.client_factory = client_factory
+        self.accounts = AccountPool(max_accounts=max_accounts, idle_timeout=account_idle_timeout)
+
+    def set_user_client(self, user_client: GraphServiceClient):
+        """
+        Switch to a new authenticated client, e.g. after re-authentication.
+        Services are recreated on next access so none keeps using the old client.
+        """
+        if user_client is self.user_client:
+            return
+        if self.user_client is not None:
+            # The new sign-in may be a different account; cached results must not leak across
+            self.folder_cache.invalidate()
+            self.query_cache.clear()
+        self.user_client = user_client
+        self.accounts.clear()
+
+    def services(self, mailbox_id: Optional[str] = None) -> MailboxServices:
+        """
+        Get the services for a mailbox
+
+        Args:
+            mailbox_id: User ID or UPN; defaults to the current tool call's mailbox, then to self.mailbox_id
+
+        Returns:
+            MailboxServices, created on first use
+        """
+        mailbox_id = mailbox_id or current_mailbox.get() or self.mailbox_id
+        return self.accounts.get(mailbox_id, lambda: self._create_services(mailbox_id))
+
+    def _create_services(self, mailbox_id: Optional[str]) -> MailboxServices:
+        user_client = self.client_factory(mailbox_id) if self.client_factory is not None else self.user_client
+        if account_key(mailbox_id) == account_key(self.mailbox_id):
+            # The default mailbox keeps the controller's caches and the local mail store
+            return MailboxServices(user_client, mailbox_id, mail_store=self.mail_store,
+                                   folder_cache=self.folder_cache, query_cache=self.query_cache,
+                                   attachment_cache=self.attachment_cache)
+        # Every mailbox shares the controller's attachment cache and its byte budget; entries are keyed by mailbox
+        return MailboxServices(user_client, mailbox_id,
+                               folder_cache=self._create_folder_cache(mailbox_id),
+                               query_cache=self._create_query_cache(mailbox_id),
+                               attachment_cache=self.attachment_cache)
+
+    def _create_folder_cache(self, mailbox_id: Optional[str]) -> FolderCache:
+        return FolderCache(ttl=self.folder_cache_ttl, backend=self.shared_cache,
+                           namespace=account_key(mailbox_id) or "me")
+
+    def _create_query_cache(self, mailbox_id: Optional[str]) -> QueryCache:
+        return QueryCache(ttl=self.query_cache_ttl, backend=self.shared_cache,
+                          namespace=account_key(mailbox_id) or "me")
+
+    @property
+    def mail(self):
+        """
+        Get the mail service instance for the current mailbox.
+        Lazy-loads the service on first access.
+        """
+        return self.services().mail
+
+    @property
+    def files(self):
+        """
+        Get the files service instance for the current mailbox.
+        Lazy-loads the service on first access.
+        """
+        return self.services().files
+
+    @property
+    def calendar(self):
+        """
+        Get the calendar service instance for the current mailbox.
+        Lazy-loads the service on first access.
+        """
+        return self.services().calendar
+
     async def get_user(self, all_properties: bool = False):
         # Only request specific properties using $select
         if all_properties:
-            user = await self.user_client.me.get()
+            user = await mailbox_builder(self.user_client, current_mailbox.get() or self.mailbox_id).get()
         else:
             query_params = UserItemRequestBuilder.UserItemRequestBuilderGetQueryParameters(
                 select=['displayName', 'mail', 'userPrincipalName']
@@ -63,6 +225,18 @@ class GraphController:
                 query_parameters=query_params
             )
 
-            user = await self.user_client.me.get(request_configuration=request_config)
+            user = await mailbox_builder(self.user_client, current_mailbox.get() or self.mailbox_id).get(
+                request_configuration=request_config)
         return user
 
+    async def aclose(self):
+        """Close the shared HTTP client and its pooled connections, the shared cache and the attachment index"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        if self.shared_cache is not None:
+            self.shared_cache.close()
+            self.shared_cache = None
+        if self.attachment_cache is not None:
+            self.attachment_cache.close()
+            self.attachment_cache = None
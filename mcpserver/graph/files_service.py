@@ -2,14 +2,118 @@
 from msgraph import GraphServiceClient
 from kiota_abstractions.base_request_configuration import RequestConfiguration
 from msgraph.generated.models.drive_item import DriveItem
+from kiota_abstractions.method import Method
+from mcpserver.graph.streaming import http_client, request_json, stream_response, stream_url, STREAM_CHUNK_SIZE
+from mcpserver.graph.quickxor import QuickXorHash
+from mcpserver.graph.mailbox import mailbox_builder
+from mcpserver.throttling import parse_retry_after, send_with_retry
+from dataclasses import dataclass, field
+from typing import Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+import asyncio
+import hashlib
+import io
 import json
+import logging
+import mimetypes
+import os
+import time
+
+
+# Files up to this size are sent in a single PUT; larger ones use an upload session (Graph limit for PUT is 250 MB)
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+
+# Upload session chunks must be multiples of 320 KiB; 10 MiB keeps memory flat and requests few
+UPLOAD_CHUNK_SIZE = 32 * 320 * 1024
+
+# Consecutive failed chunk uploads tolerated before giving up
+UPLOAD_MAX_RETRIES = 5
+
+# Files transferred at once by directory and multi-file jobs
+DEFAULT_TRANSFER_CONCURRENCY = 4
+
+# Drive item properties needed to compare and download files
+TRANSFER_ITEM_SELECT = "id,name,size,file,folder,@microsoft.graph.downloadUrl"
+# Commas are encoded because request_json paths are URI templates, whose expansion drops literal commas
+TRANSFER_ITEM_QUERY = f"$select={quote(TRANSFER_ITEM_SELECT, safe='@.')}"
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+@dataclass
+class TransferReport:
+    """Outcome of a multi-file upload or download job"""
+    transferred: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    bytes_transferred: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second over the whole job"""
+        return self.bytes_transferred / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"Transferred: {len(self.transferred)} files, {self.bytes_transferred / (1024 * 1024):.1f} MB "
+            f"in {self.elapsed:.1f}s ({self.throughput / (1024 * 1024):.2f} MB/s)",
+            f"Skipped (unchanged): {len(self.skipped)}",
+            f"Failed: {len(self.failed)}",
+        ]
+        for path, error in self.failed:
+            lines.append(f"   {path}: {error}")
+        return "\n".join(lines)
+
+
+def _hash_file(path: str, algorithm: str) -> str:
+    """Hash a local file in the form Graph reports: base64 quickXorHash or upper-case hex SHA"""
+    hasher = QuickXorHash() if algorithm == "quickXorHash" else hashlib.new(
+        "sha256" if algorithm == "sha256Hash" else "sha1")
+    with open(path, "rb") as file:
+        while chunk := file.read(STREAM_CHUNK_SIZE):
+            hasher.update(chunk)
+    if algorithm == "quickXorHash":
+        return hasher.base64_digest()
+    return hasher.hexdigest().upper()
+
+
+async def _matches_remote(local_path: str, remote_item: Optional[dict]) -> bool:
+    """True if the local file has the same size and content hash as the remote drive item"""
+    if not remote_item or "file" not in remote_item:
+        return False
+    if os.path.getsize(local_path) != remote_item.get("size"):
+        return False
+    hashes = remote_item["file"].get("hashes") or {}
+    # Business drives report quickXorHash; personal drives may report SHA hashes
+    for algorithm in ("quickXorHash", "sha256Hash", "sha1Hash"):
+        if hashes.get(algorithm):
+            local_hash = await asyncio.to_thread(_hash_file, local_path, algorithm)
+            # quickXorHash is base64 and case-sensitive; SHA hashes are hex
+            remote_hash = hashes[algorithm] if algorithm == "quickXorHash" else hashes[algorithm].upper()
+            return local_hash == remote_hash
+    return False
+
+
+def _next_expected_offset(next_expected_ranges, default: int) -> int:
+    """First byte Graph still needs, from nextExpectedRanges such as ["26214400-"]"""
+    if not next_expected_ranges:
+        return default
+    return int(next_expected_ranges[0].split("-")[0])
 
 
 class FilesService:
     """Service for OneDrive file-related operations using Microsoft Graph API"""
 
-    def __init__(self, user_client: GraphServiceClient):
+    def __init__(self, user_client: GraphServiceClient, mailbox_id: Optional[str] = None):
         self.user_client = user_client
+        # None targets the signed-in user (/me); otherwise a user ID or UPN (required in app-only mode)
+        self.mailbox_id = mailbox_id
+
+    @property
+    def mailbox(self):
+        """Request builder for the user whose drives and followed sites this service lists"""
+        return mailbox_builder(self.user_client, self.mailbox_id)
 
     async def list_followed_sites(self):
         """
@@ -18,7 +122,7 @@ class FilesService:
         """
         try:
 
-            followed_sites_response = await self.user_client.me.followed_sites.get()
+            followed_sites_response = await self.mailbox.followed_sites.get()
 
             if not followed_sites_response or not followed_sites_response.value:
                 return "No sites are currently being followed by the user."
@@ -171,7 +275,7 @@ class FilesService:
     async def get_site_id_from_user(self, site_index: int = 0):
         try:
 
-            followed_sites_response = await self.user_client.me.followed_sites.get()
+            followed_sites_response = await self.mailbox.followed_sites.get()
 
             if not followed_sites_response or not followed_sites_response.value or len(
                     followed_sites_response.value) <= site_index:
@@ -183,14 +287,14 @@ class FilesService:
 
     async def get_user_drives(self):
         try:
-            drive_list = await self.user_client.me.drives.get()
+            drive_list = await self.mailbox.drives.get()
             return drive_list.value
         except Exception as e:
             return f"Error retrieving user drives: {str(e)}"
 
     async def get_user_drive(self):
         try:
-            drive_list = await self.user_client.me.drive.get()
+            drive_list = await self.mailbox.drive.get()
             return drive_list
         except Exception as e:
             return f"Error retrieving user drive: {str(e)}"
@@ -350,3 +454,345 @@ class FilesService:
             import traceback
             traceback.print_exc()
             return f"Error getting root folder ID for drive '{drive_id}': {str(e)}"
+
+    async def upload_file(self,
+                          drive_id: str,
+                          folder_id: str,
+                          file_name: str,
+                          content: bytes,
+                          conflict_behavior: str = "replace",
+                          progress: Optional[ProgressCallback] = None) -> dict:
+        """
+        Upload in-memory content to a drive folder, using an upload session when it is too large for one PUT
+
+        Args:
+            drive_id: The drive ID
+            folder_id: The folder's item ID
+            file_name: Name for the file; may include subfolders ("reports/2025/q1.xlsx"), which are created
+            content: File content
+            conflict_behavior: "replace", "rename" or "fail" if a file with the same name exists
+            progress: Optional async callback receiving (bytes_uploaded, total_bytes)
+
+        Returns:
+            The created drive item as a dict
+        """
+        return await self._upload(drive_id, folder_id, file_name, io.BytesIO(content), len(content),
+                                  conflict_behavior, progress)
+
+    async def upload_local_file(self,
+                                drive_id: str,
+                                folder_id: str,
+                                local_path: str,
+                                file_name: str = None,
+                                conflict_behavior: str = "replace",
+                                progress: Optional[ProgressCallback] = None) -> dict:
+        """
+        Upload a local file of any size to a drive folder, reading it in fixed-size chunks
+
+        Args:
+            drive_id: The drive ID
+            folder_id: The folder's item ID
+            local_path: Path of the file to upload
+            file_name: Name for the file in the drive (default: the local file name)
+            conflict_behavior: "replace", "rename" or "fail" if a file with the same name exists
+            progress: Optional async callback receiving (bytes_uploaded, total_bytes)
+
+        Returns:
+            The created drive item as a dict
+        """
+        file_name = file_name or os.path.basename(local_path)
+        size = os.path.getsize(local_path)
+        with open(local_path, "rb") as file:
+            return await self._upload(drive_id, folder_id, file_name, file, size, conflict_behavior, progress)
+
+    async def _upload(self, drive_id: str, folder_id: str, file_name: str, file: BinaryIO, size: int,
+                      conflict_behavior: str, progress: Optional[ProgressCallback]) -> dict:
+        item_path = f"/drives/{quote(drive_id, safe='')}/items/{quote(folder_id, safe='')}:/{quote(file_name)}:"
+
+        if size <= SIMPLE_UPLOAD_LIMIT:
+            content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+            item = await request_json(
+                self.user_client,
+                f"{item_path}/content?@microsoft.graph.conflictBehavior={conflict_behavior}",
+                method=Method.PUT,
+                content=file.read(),
+                content_type=content_type
+            )
+            if progress:
+                await progress(size, size)
+            return item
+
+        return await self._upload_with_session(item_path, file, size, conflict_behavior, progress)
+
+    async def _create_upload_session(self, item_path: str, conflict_behavior: str) -> str:
+        session = await request_json(
+            self.user_client,
+            f"{item_path}/createUploadSession",
+            method=Method.POST,
+            body={"item": {"@microsoft.graph.conflictBehavior": conflict_behavior}}
+        )
+        return session["uploadUrl"]
+
+    async def _upload_with_session(self, item_path: str, file: BinaryIO, size: int, conflict_behavior: str,
+                                   progress: Optional[ProgressCallback]) -> dict:
+        """
+        Upload through createUploadSession in UPLOAD_CHUNK_SIZE pieces
+
+        After a failed chunk the session is asked for nextExpectedRanges and the upload resumes from there,
+        so only the missing bytes are sent again. An expired session is replaced by a new one.
+        """
+        upload_url = await self._create_upload_session(item_path, conflict_behavior)
+        # The upload URL is pre-authenticated; Graph rejects it if an Authorization header is added
+        client = http_client(self.user_client)
+        offset = 0
+        failures = 0
+
+        while True:
+            file.seek(offset)
+            chunk = file.read(min(UPLOAD_CHUNK_SIZE, size - offset))
+            chunk_end = offset + len(chunk) - 1
+
+            error = None
+            retry_after = None
+            try:
+                # Throttled and unavailable responses are retried after Retry-After before counting as a failure
+                response = await send_with_retry(client, client.build_request(
+                    "PUT", upload_url, content=chunk, headers={"Content-Range": f"bytes {offset}-{chunk_end}/{size}"}))
+                if response.status_code in (200, 201):
+                    if progress:
+                        await progress(size, size)
+                    return response.json()
+                if response.status_code == 202:
+                    failures = 0
+                    offset = _next_expected_offset(response.json().get("nextExpectedRanges"), chunk_end + 1)
+                    if progress:
+                        await progress(offset, size)
+                    continue
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            except Exception as e:
+                error = str(e)
+
+            failures += 1
+            if failures > UPLOAD_MAX_RETRIES:
+                try:
+                    await client.delete(upload_url)
+                except Exception:
+                    pass
+                raise Exception(f"Upload failed at byte {offset} of {size}: {error}")
+
+            logging.info(f"Chunk upload failed at byte {offset} ({error}); resuming, attempt {failures}")
+            await asyncio.sleep(retry_after if retry_after is not None else min(2 ** failures, 30))
+
+            # Ask the session which bytes it still needs instead of assuming the failed chunk was lost
+            try:
+                status = await client.get(upload_url)
+            except Exception:
+                continue
+            if status.status_code == 404:
+                # Session expired or was cancelled; start over with a new one
+                upload_url = await self._create_upload_session(item_path, conflict_behavior)
+                offset = 0
+            elif status.status_code == 200:
+                offset = _next_expected_offset(status.json().get("nextExpectedRanges"), offset)
+
+    async def _run_transfers(self, jobs: List[Tuple[str, Callable[[], Awaitable[Optional[int]]]]],
+                             concurrency: int, progress: Optional[ProgressCallback]) -> TransferReport:
+        """
+        Run transfer jobs with a bounded worker pool
+
+        Each job returns the number of bytes transferred, or None if it was skipped as unchanged.
+        """
+        report = TransferReport()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        completed = 0
+        started = time.monotonic()
+
+        async def run(name: str, job):
+            nonlocal completed
+            async with semaphore:
+                try:
+                    transferred = await job()
+                    if transferred is None:
+                        report.skipped.append(name)
+                    else:
+                        report.transferred.append(name)
+                        report.bytes_transferred += transferred
+                except Exception as e:
+                    # One failed file does not stop the rest of the job
+                    report.failed.append((name, str(e)))
+            completed += 1
+            if progress:
+                await progress(completed, len(jobs))
+
+        await asyncio.gather(*(run(name, job) for name, job in jobs))
+        report.elapsed = time.monotonic() - started
+        return report
+
+    async def _list_remote_files(self, drive_id: str, folder_id: str, recursive: bool = True) -> Dict[str, dict]:
+        """
+        List the files under a drive folder
+
+        Returns:
+            Relative path ("sub/folder/name.ext") to drive item dict with id, size, file hashes and download URL
+        """
+        files = {}
+        pending = [(folder_id, "")]
+        while pending:
+            item_id, prefix = pending.pop()
+            url = (f"/drives/{quote(drive_id, safe='')}/items/{quote(item_id, safe='')}/children"
+                   f"?{TRANSFER_ITEM_QUERY}&$top=999")
+            while url:
+                page = await request_json(self.user_client, url)
+                for item in page.get("value", []):
+                    path = f"{prefix}{item['name']}"
+                    if "folder" in item:
+                        if recursive:
+                            pending.append((item["id"], f"{path}/"))
+                    else:
+                        files[path] = item
+                url = page.get("@odata.nextLink")
+        return files
+
+    async def upload_files(self,
+                           drive_id: str,
+                           folder_id: str,
+                           local_paths: List[str],
+                           concurrency: int = DEFAULT_TRANSFER_CONCURRENCY,
+                           progress: Optional[ProgressCallback] = None) -> TransferReport:
+        """
+        Upload several local files into one drive folder in parallel
+
+        Args:
+            drive_id: The drive ID
+            folder_id: The folder's item ID
+            local_paths: Paths of the files to upload; each keeps its file name
+            concurrency: Maximum number of files transferred at once
+            progress: Optional async callback receiving (files_completed, total_files)
+
+        Returns:
+            A TransferReport; files whose size and hash already match the remote copy are skipped
+        """
+        pairs = [(local_path, os.path.basename(local_path)) for local_path in local_paths]
+        return await self._upload_pairs(drive_id, folder_id, pairs, recursive=False,
+                                        concurrency=concurrency, progress=progress)
+
+    async def upload_directory(self,
+                               drive_id: str,
+                               folder_id: str,
+                               local_dir: str,
+                               recursive: bool = True,
+                               concurrency: int = DEFAULT_TRANSFER_CONCURRENCY,
+                               progress: Optional[ProgressCallback] = None) -> TransferReport:
+        """
+        Upload a local directory into a drive folder in parallel, mirroring its subfolders
+
+        Args:
+            drive_id: The drive ID
+            folder_id: The folder's item ID
+            local_dir: Directory to upload
+            recursive: If True, includes subdirectories
+            concurrency: Maximum number of files transferred at once
+            progress: Optional async callback receiving (files_completed, total_files)
+
+        Returns:
+            A TransferReport; files whose size and hash already match the remote copy are skipped
+        """
+        pairs = []
+        for root, dirs, file_names in os.walk(local_dir):
+            relative_root = os.path.relpath(root, local_dir)
+            for file_name in sorted(file_names):
+                relative_path = file_name if relative_root == "." else os.path.join(relative_root, file_name)
+                pairs.append((os.path.join(root, file_name), relative_path.replace(os.sep, "/")))
+            if not recursive:
+                break
+        return await self._upload_pairs(drive_id, folder_id, pairs, recursive=recursive,
+                                        concurrency=concurrency, progress=progress)
+
+    async def _upload_pairs(self, drive_id: str, folder_id: str, pairs: List[Tuple[str, str]], recursive: bool,
+                            concurrency: int, progress: Optional[ProgressCallback]) -> TransferReport:
+        # One listing up front replaces a metadata request per file
+        remote_files = await self._list_remote_files(drive_id, folder_id, recursive=recursive)
+
+        def make_job(local_path: str, remote_path: str):
+            async def job():
+                if await _matches_remote(local_path, remote_files.get(remote_path)):
+                    return None
+                size = os.path.getsize(local_path)
+                with open(local_path, "rb") as file:
+                    await self._upload(drive_id, folder_id, remote_path, file, size, "replace", None)
+                return size
+            return job
+
+        jobs = [(remote_path, make_job(local_path, remote_path)) for local_path, remote_path in pairs]
+        return await self._run_transfers(jobs, concurrency, progress)
+
+    async def download_items(self,
+                             drive_id: str,
+                             local_dir: str,
+                             item_ids: List[str] = None,
+                             folder_id: str = None,
+                             concurrency: int = DEFAULT_TRANSFER_CONCURRENCY,
+                             progress: Optional[ProgressCallback] = None) -> TransferReport:
+        """
+        Download drive files, or a whole folder tree, to a local directory in parallel
+
+        Args:
+            drive_id: The drive ID
+            local_dir: Directory to download into
+            item_ids: IDs of files or folders to download (folders are downloaded with their contents)
+            folder_id: ID of a folder whose contents are downloaded (alternative to item_ids)
+            concurrency: Maximum number of files transferred at once
+            progress: Optional async callback receiving (files_completed, total_files)
+
+        Returns:
+            A TransferReport; local files whose size and hash match the remote file are skipped
+        """
+        remote_files = {}
+        if folder_id:
+            remote_files.update(await self._list_remote_files(drive_id, folder_id))
+        for item_id in item_ids or []:
+            item = await request_json(
+                self.user_client,
+                f"/drives/{quote(drive_id, safe='')}/items/{quote(item_id, safe='')}?{TRANSFER_ITEM_QUERY}")
+            if "folder" in item:
+                for path, child in (await self._list_remote_files(drive_id, item["id"])).items():
+                    remote_files[f"{item['name']}/{path}"] = child
+            else:
+                remote_files[item["name"]] = item
+
+        def make_job(remote_path: str, item: dict):
+            async def job():
+                local_path = os.path.join(local_dir, *remote_path.split("/"))
+                if os.path.exists(local_path) and await _matches_remote(local_path, item):
+                    return None
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                return await self._download_to_file(drive_id, item, local_path)
+            return job
+
+        jobs = [(remote_path, make_job(remote_path, item)) for remote_path, item in sorted(remote_files.items())]
+        return await self._run_transfers(jobs, concurrency, progress)
+
+    async def _download_to_file(self, drive_id: str, item: dict, local_path: str) -> int:
+        """Stream a drive file to local_path in chunks; the file only appears once it is complete"""
+        temp_path = f"{local_path}.part"
+        size = 0
+        download_url = item.get("@microsoft.graph.downloadUrl")
+        if download_url:
+            # Pre-authenticated URL straight to storage; no redirect through Graph
+            stream = stream_url(self.user_client, download_url)
+        else:
+            stream = stream_response(
+                self.user_client, f"/drives/{quote(drive_id, safe='')}/items/{quote(item['id'], safe='')}/content")
+        try:
+            async with stream as response:
+                with open(temp_path, "wb") as file:
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        file.write(chunk)
+                        size += len(chunk)
+            os.replace(temp_path, local_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return size
@@ -9,18 +9,133 @@ from msgraph.generated.models.body_type import BodyType
 from msgraph.generated.models.recipient import Recipient
 from msgraph.generated.models.email_address import EmailAddress
 from msgraph.generated.users.item.mail_folders.item.move.move_post_request_body import MovePostRequestBody
+from msgraph.generated.users.item.messages.item.message_item_request_builder import MessageItemRequestBuilder
+from msgraph.generated.users.item.messages.item.reply.reply_post_request_body import ReplyPostRequestBody
+from msgraph.generated.users.item.messages.item.reply_all.reply_all_post_request_body import ReplyAllPostRequestBody
+from msgraph.generated.users.item.messages.item.create_reply.create_reply_post_request_body import CreateReplyPostRequestBody
+from msgraph.generated.users.item.messages.item.create_reply_all.create_reply_all_post_request_body import CreateReplyAllPostRequestBody
+from msgraph.generated.users.item.mail_folders.item.messages.delta.delta_request_builder import DeltaRequestBuilder
+from msgraph.generated.models.message_collection_response import MessageCollectionResponse
+from kiota_abstractions.api_error import APIError
 from mcpserver.mail_query import MailQuery
-from typing import List
+from mcpserver.mail_store import MailStore, HEADER_SELECT
+from mcpserver.graph.pagination import MessagePage, iterate_pages, encode_cursor, decode_cursor
+from msgraph.generated.users.item.mail_folders.mail_folders_request_builder import MailFoldersRequestBuilder
+from msgraph.generated.users.item.mail_folders.item.mail_folder_item_request_builder import MailFolderItemRequestBuilder
+from msgraph.generated.users.item.mail_folders.item.child_folders.child_folders_request_builder import ChildFoldersRequestBuilder
+from mcpserver.folder_tree import FolderTree, FolderCache
+from mcpserver.message_info import MessageHeader
+from mcpserver.query_cache import QueryCache, folder_key, is_well_known_folder
+from mcpserver.attachment_cache import AttachmentCache, CachedAttachment
+from mcpserver.graph.streaming import stream_response, STREAM_CHUNK_SIZE
+from msgraph.generated.users.item.messages.item.attachments.attachments_request_builder import AttachmentsRequestBuilder
+from msgraph.generated.users.item.messages.item.attachments.item.attachment_item_request_builder import AttachmentItemRequestBuilder
+from mcpserver.graph.batching import BatchRequest, execute_batch, DEFAULT_BATCH_CONCURRENCY
+from mcpserver.graph.mailbox import mailbox_builder, mailbox_path
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import quote
+import asyncio
+import dataclasses
+import logging
+
+
+# Message properties fetched for a full message unless the caller asks for fewer
+MESSAGE_FIELDS = ['id', 'subject', 'from', 'toRecipients', 'ccRecipients', 'bccRecipients', 'receivedDateTime',
+                  'isRead', 'hasAttachments', 'importance', 'conversationId', 'changeKey', 'body']
+
+# Attachment metadata; contentBytes is never selected, content is streamed from $value instead
+ATTACHMENT_SELECT = ['id', 'name', 'contentType', 'size', 'isInline']
+
+# Folder properties needed to build the folder tree
+FOLDER_SELECT = ['id', 'displayName', 'parentFolderId', 'childFolderCount']
 
 
 class MailService:
     """Service for mail-related operations using Microsoft Graph API"""
 
-    def __init__(self, user_client: GraphServiceClient):
+    def __init__(self, user_client: GraphServiceClient, store: Optional[MailStore] = None,
+                 folder_cache: Optional[FolderCache] = None, query_cache: Optional[QueryCache] = None,
+                 attachment_cache: Optional[AttachmentCache] = None, mailbox_id: Optional[str] = None):
         self.user_client = user_client
+        # None targets the signed-in user (/me); otherwise a user ID or UPN (required in app-only mode)
+        self.mailbox_id = mailbox_id
+        self.store = store
+        self.folder_cache = folder_cache if folder_cache is not None else FolderCache()
+        self.query_cache = query_cache if query_cache is not None else QueryCache()
+        # Injected by the controller; without one, attachments cannot be downloaded
+        self.attachment_cache = attachment_cache
+        self._sync_locks = {}
+
+    @property
+    def mailbox(self):
+        """Request builder for the mailbox this service acts on"""
+        return mailbox_builder(self.user_client, self.mailbox_id)
+
+    async def sync_folder(self, folder_id: str = 'inbox', force: bool = False):
+        """
+        Pull incremental changes for a folder into the local store using messages/delta
+
+        Args:
+            folder_id: ID or well-known name of the folder to sync
+            force: If True, ignores the store's sync interval
+
+        Returns:
+            The folder's ID, which the store keys the folder's rows by
+        """
+        if self.store is None:
+            return folder_id
+
+        # 'inbox' and the inbox's ID must share one lock and one set of rows
+        folder_id = await self.resolve_folder_id(folder_id)
+        # One delta round per folder at a time; concurrent callers wait and reuse the result
+        lock = self._sync_locks.setdefault(folder_id, asyncio.Lock())
+        async with lock:
+            if not force and not self.store.needs_sync(folder_id):
+                return folder_id
 
+            delta_builder = self.mailbox.mail_folders.by_mail_folder_id(folder_id).messages.delta
+            delta_link = self.store.get_delta_link(folder_id)
+
+            try:
+                if delta_link:
+                    response = await delta_builder.with_url(delta_link).get()
+                else:
+                    response = await delta_builder.get(request_configuration=self._initial_delta_config())
+            except APIError as e:
+                # Expired or invalid sync state: start over with a full sync
+                if e.response_status_code not in (400, 404, 410) or not delta_link:
+                    raise
+                logging.info(f"Delta link for folder {folder_id} rejected, resyncing: {str(e)}")
+                self.store.reset_folder(folder_id)
+                response = await delta_builder.get(request_configuration=self._initial_delta_config())
+
+            while response is not None:
+                self.store.apply_changes(folder_id, response.value)
+                if response.odata_next_link:
+                    response = await delta_builder.with_url(response.odata_next_link).get()
+                else:
+                    self.store.save_delta_link(folder_id, response.odata_delta_link)
+                    break
+        return folder_id
+
+    @staticmethod
+    def _initial_delta_config():
+        query_params = DeltaRequestBuilder.DeltaRequestBuilderGetQueryParameters(
+            select=HEADER_SELECT
+        )
+        request_config = RequestConfiguration(
+            query_parameters=query_params
+        )
+        request_config.headers.add("Prefer", "odata.maxpagesize=200")
+        # Bodies are only kept in the full-text index; plain text is much smaller than HTML
+        request_config.headers.add("Prefer", 'outlook.body-content-type="text"')
+        return request_config
 
     async def get_inbox(self, count: int=50):
+        if self.store is not None:
+            folder_id = await self.sync_folder('inbox')
+            return MessageCollectionResponse(value=self.store.list_messages(folder_id, count))
+
         query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
             select=['from', 'isRead', 'receivedDateTime', 'subject', 'id', 'toRecipients', 'ccRecipients', 'bccRecipients', 'replyTo'],
             top=count,
@@ -31,7 +146,7 @@ class MailService:
             query_parameters= query_params
         )
 
-        messages = await self.user_client.me.mail_folders.by_mail_folder_id('inbox').messages.get(
+        messages = await self.mailbox.mail_folders.by_mail_folder_id('inbox').messages.get(
                 request_configuration=request_config)
         return messages
 
@@ -94,18 +209,31 @@ class MailService:
 
             if save_as_draft:
                 # Save as draft
-                result = await self.user_client.me.messages.post(message)
+                result = await self.mailbox.messages.post(message)
+                await self._invalidate_folders(['drafts'])
                 return result
             else:
                 # Send immediately
                 request_body = SendMailPostRequestBody()
                 request_body.message = message
-                await self.user_client.me.send_mail.post(body=request_body)
+                await self.mailbox.send_mail.post(body=request_body)
+                await self._invalidate_folders(['sentitems'])
                 return message
 
         except Exception as e:
             raise Exception(f"Error creating or sending email: {str(e)}")
 
+    @staticmethod
+    def _build_recipients(addresses: List[str]) -> List[Recipient]:
+        """Convert email addresses into Graph recipients"""
+        recipients = []
+        for address in addresses:
+            recipient = Recipient()
+            recipient.email_address = EmailAddress()
+            recipient.email_address.address = address
+            recipients.append(recipient)
+        return recipients
+
     async def reply_to_email(self,
                              message_id: str,
                              body: str,
@@ -117,6 +245,10 @@ class MailService:
         """
         Reply to an existing email and send immediately
 
+        Uses Graph's reply/replyAll actions, so the original message is never downloaded: Graph
+        fills in the subject, the quoted original and the recipients (honouring replyTo and
+        leaving out the current user on reply-all). Overrides are sent in the same request.
+
         Args:
             message_id: ID of the message to reply to
             body: Body content of the reply
@@ -127,109 +259,55 @@ class MailService:
             subject: Optional custom subject (default: Re: original subject)
 
         Returns:
-            The sent message object
+            True if the reply was sent
         """
         try:
-            # Get the original message
-            original_message = await self.user_client.me.messages.by_message_id(message_id).get()
-            if not original_message:
-                raise Exception(f"Original message with ID {message_id} not found")
-
-            # Handle subject
-            if subject is None:
-                # Check if the original subject already starts with any form of "RE:"
-                original_subject = original_message.subject or ""
-                if original_subject.upper().startswith("RE:") or original_subject.upper().startswith("RE "):
-                    subject = original_subject
-                else:
-                    subject = f"Re: {original_subject}"
-
-            # Create a new message to send as reply
-            message = Message()
-            message.subject = subject
-
-            # Set body
-            message.body = ItemBody()
-            message.body.content_type = BodyType.Html
-            message.body.content = body
-
-            # Set recipients based on reply_all flag and any explicitly provided recipients
-            if to_recipients is None:
-                if reply_all and original_message.to_recipients:
-                    # Include all original recipients
-                    to_recipients = []
-                    # Add original sender (for completeness)
-                    if original_message.from_ and original_message.from_.email_address:
-                        to_recipients.append(original_message.from_.email_address.address)
-
-                    # Add all original To recipients except self
-                    user_info = await self.user_client.me.get()
-                    my_email = user_info.mail
-
-                    for recipient in original_message.to_recipients:
-                        if recipient.email_address and recipient.email_address.address and recipient.email_address.address != my_email:
-                            to_recipients.append(recipient.email_address.address)
-                else:
-                    # Reply only to sender
-                    to_recipients = [original_message.from_.email_address.address]
-
-            # Set CC recipients based on reply_all flag and any explicitly provided CC recipients
-            if cc_recipients is None and reply_all and original_message.cc_recipients:
-                # Include original CC recipients
-                cc_recipients = []
-                for recipient in original_message.cc_recipients:
-                    if recipient.email_address and recipient.email_address.address:
-                        cc_recipients.append(recipient.email_address.address)
-
-            # Set recipients
-            message.to_recipients = []
-            for recipient in to_recipients:
-                to_recipient = Recipient()
-                to_recipient.email_address = EmailAddress()
-                to_recipient.email_address.address = recipient
-                message.to_recipients.append(to_recipient)
-
-            # Set CC recipients if provided
-            if cc_recipients:
-                message.cc_recipients = []
-                for recipient in cc_recipients:
-                    cc_recipient = Recipient()
-                    cc_recipient.email_address = EmailAddress()
-                    cc_recipient.email_address.address = recipient
-                    message.cc_recipients.append(cc_recipient)
-
-            # Set BCC recipients if provided
-            if bcc_recipients:
-                message.bcc_recipients = []
-                for recipient in bcc_recipients:
-                    bcc_recipient = Recipient()
-                    bcc_recipient.email_address = EmailAddress()
-                    bcc_recipient.email_address.address = recipient
-                    message.bcc_recipients.append(bcc_recipient)
-
-            # Send the reply
-            request_body = SendMailPostRequestBody()
-            request_body.message = message
-            await self.user_client.me.send_mail.post(body=request_body)
-            return message
+            # Only the properties being overridden are set; everything else comes from the original
+            message = None
+            if to_recipients is not None or cc_recipients is not None or bcc_recipients is not None or subject is not None:
+                message = Message()
+                if subject is not None:
+                    message.subject = subject
+                if to_recipients is not None:
+                    message.to_recipients = self._build_recipients(to_recipients)
+                if cc_recipients is not None:
+                    message.cc_recipients = self._build_recipients(cc_recipients)
+                if bcc_recipients is not None:
+                    message.bcc_recipients = self._build_recipients(bcc_recipients)
+
+            # The comment is placed above the quoted original (Graph rejects a comment plus message.body)
+            message_builder = self.mailbox.messages.by_message_id(message_id)
+            if reply_all:
+                request_body = ReplyAllPostRequestBody(comment=body, message=message)
+                await message_builder.reply_all.post(request_body)
+            else:
+                request_body = ReplyPostRequestBody(comment=body, message=message)
+                await message_builder.reply.post(request_body)
+            await self._invalidate_folders(['sentitems'])
+            return True
 
         except Exception as e:
             raise Exception(f"Error replying to email: {str(e)}")
 
-    async def create_draft_reply(self, message_id: str):
+    async def create_draft_reply(self, message_id: str, reply_all: bool = False):
         """
         Create a draft reply to an existing email
 
         Args:
             message_id: ID of the message to reply to
+            reply_all: If True, the draft is addressed to all original recipients
 
         Returns:
             The created draft reply message
         """
         try:
-            # Use createReply endpoint to create a draft reply
-            empty_body = {}
-            draft_reply = await self.user_client.me.messages.by_message_id(message_id).create_reply.post(empty_body)
+            # Use createReply/createReplyAll endpoints to create a draft reply
+            message_builder = self.mailbox.messages.by_message_id(message_id)
+            if reply_all:
+                draft_reply = await message_builder.create_reply_all.post(CreateReplyAllPostRequestBody())
+            else:
+                draft_reply = await message_builder.create_reply.post(CreateReplyPostRequestBody())
+            await self._invalidate_folders(['drafts'])
             return draft_reply
         except Exception as e:
             raise Exception(f"Error creating draft reply: {str(e)}")
@@ -293,7 +371,8 @@ class MailService:
                     update_message.bcc_recipients.append(bcc_recipient)
 
             # Update the draft message
-            result = await self.user_client.me.messages.by_message_id(draft_id).patch(update_message)
+            result = await self.mailbox.messages.by_message_id(draft_id).patch(update_message)
+            await self._invalidate_folders(['drafts'], message_ids=[draft_id])
             return result
         except Exception as e:
             raise Exception(f"Error updating draft: {str(e)}")
@@ -310,7 +389,8 @@ class MailService:
         """
         try:
             # Send the draft message
-            await self.user_client.me.messages.by_message_id(draft_id).send.post()
+            await self.mailbox.messages.by_message_id(draft_id).send.post()
+            await self._invalidate_folders(['drafts', 'sentitems'], message_ids=[draft_id])
             return True
         except Exception as e:
             raise Exception(f"Error sending draft: {str(e)}")
@@ -319,83 +399,254 @@ class MailService:
         """Moves a message to a specified folder"""
         request_body = MovePostRequestBody(destination_id=destination_folder_id)
 
-        response = await self.user_client.me.messages.by_message_id(message_id).move.post(request_body)
+        try:
+            response = await self.mailbox.messages.by_message_id(message_id).move.post(request_body)
+        except APIError as e:
+            if e.response_status_code == 404:
+                # The destination may have been deleted or renamed outside this session
+                self.folder_cache.invalidate()
+            raise
+        # The source folder is not known here; pages that contained the message cover it
+        await self._invalidate_folders([destination_folder_id], message_ids=[message_id])
+        if self.store is not None:
+            self.store.remove_message(message_id)
+            self.store.mark_stale(self._known_folder_id(destination_folder_id))
         if response is not None:
             return True
         else:
             return False
 
+    async def move_many(self, moves: List[Tuple[str, str]], concurrency: int = DEFAULT_BATCH_CONCURRENCY):
+        """
+        Move many messages in as few round-trips as possible using JSON $batch
+
+        Args:
+            moves: List of (message_id, destination_folder_id) pairs
+            concurrency: Maximum number of $batch requests in flight
+
+        Returns:
+            List of dicts, one per move in input order, with message_id, folder_id, success,
+            new_message_id (on success) and error (on failure)
+        """
+        requests = [
+            BatchRequest(
+                method="POST",
+                url=f"{mailbox_path(self.mailbox_id)}/messages/{quote(message_id, safe='')}/move",
+                body={"destinationId": folder_id}
+            )
+            for message_id, folder_id in moves
+        ]
+        batch_results = await execute_batch(self.user_client, requests, concurrency=concurrency)
+
+        results = []
+        for (message_id, folder_id), batch_result in zip(moves, batch_results):
+            results.append({
+                "message_id": message_id,
+                "folder_id": folder_id,
+                "success": batch_result.ok,
+                "new_message_id": batch_result.body.get("id") if batch_result.ok and batch_result.body else None,
+                "error": batch_result.error_message,
+            })
+
+        if any(batch_result.status == 404 for batch_result in batch_results):
+            self.folder_cache.invalidate()
+
+        moved = [result for result in results if result["success"]]
+        await self._invalidate_folders({result["folder_id"] for result in moved},
+                                       message_ids=[result["message_id"] for result in moved])
+
+        if self.store is not None:
+            for result in results:
+                if result["success"]:
+                    self.store.remove_message(result["message_id"])
+            for folder_id in {result["folder_id"] for result in results if result["success"]}:
+                self.store.mark_stale(self._known_folder_id(folder_id))
+
+        return results
+
     async def get_folders(self):
-        folder_count = await self.user_client.me.mail_folders.count.get()
+        folder_count = await self.mailbox.mail_folders.count.get()
 
         if folder_count > 10:
-            data = await self.user_client.me.mail_folders.get()
+            data = await self.mailbox.mail_folders.get()
             all_data = []
             all_data.extend(data.value)
             url = data.odata_next_link
             while url:
-                response = await self.user_client.me.mail_folders.with_url(url).get()
+                response = await self.mailbox.mail_folders.with_url(url).get()
                 data = response.value
                 all_data.extend(data)
                 url = response.odata_next_link
 
         else:
-            data = await self.user_client.me.mail_folders.get()
+            data = await self.mailbox.mail_folders.get()
             all_data = []
             all_data.extend(data.value)
 
         return all_data
 
-    async def get_mail_folder_id_dict(self):
-        """Gets the ID of the Inbox folder"""
-        all_data = await self.get_folders()
-        folder_id_dict = {}
-        for folder in all_data:
-            folder_id_dict[folder.display_name] = folder.id
-            try:
-                child_folders = await self.user_client.me.mail_folders.by_mail_folder_id(folder.id).child_folders.get()
-                if child_folders and child_folders.value:
-                    for child in child_folders.value:
-                        folder_id_dict[child.display_name] = child.id
-            except Exception as e:
-                # Some folders might not support child folder operations
-                print("Error getting mail folders: ", e)
-        return folder_id_dict
+    async def _fetch_folder_level(self, request_builder, query_parameters_class):
+        """Fetch every folder from a mailFolders or childFolders collection, expanding one level of children"""
+        query_params = query_parameters_class(
+            select=FOLDER_SELECT,
+            expand=[f"childFolders($select={','.join(FOLDER_SELECT)})"],
+            top=250
+        )
+        request_config = RequestConfiguration(
+            query_parameters=query_params
+        )
+        folders = []
+        async for folder, _ in iterate_pages(request_builder, request_configuration=request_config):
+            folders.append(folder)
+        return folders
 
-    async def get_mail_folder_hierarchy(self):
-        """Gets all mail folders with their hierarchical structure"""
-        # Get top-level folders first
-        all_data = await self.get_folders()
-
-        # For each folder, get its child folders
-        result = []
-        if all_data:
-            for folder in all_data:
-                folder_info = {
-                    "id": folder.id,
-                    "display_name": folder.display_name,
-                    "parent_folder_id": folder.parent_folder_id,
-                    "child_folders": []
-                }
-
-                # Get child folders if they exist
+    async def load_folder_tree(self, concurrency: int = 8) -> FolderTree:
+        """
+        Load the full mail folder hierarchy, at any depth, in as few round-trips as possible
+
+        Each request expands one extra level of children, and only folders that report child
+        folders are visited, so a tree of depth d needs about d/2 rounds of concurrent requests.
+
+        Args:
+            concurrency: Maximum number of child folder requests in flight
+
+        Returns:
+            FolderTree with every folder indexed by ID
+        """
+        tree = FolderTree()
+        pending = []  # Nodes whose children still have to be fetched
+
+        def add_folder(folder, parent):
+            node = tree.add(folder.id, folder.display_name, parent, folder.child_folder_count)
+            expanded = folder.child_folders
+            if expanded is not None and len(expanded) >= node.child_folder_count:
+                for child in expanded:
+                    add_folder(child, node)
+            elif node.child_folder_count > 0:
+                pending.append(node)
+
+        for folder in await self._fetch_folder_level(
+                self.mailbox.mail_folders,
+                MailFoldersRequestBuilder.MailFoldersRequestBuilderGetQueryParameters):
+            add_folder(folder, None)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_children(node):
+            async with semaphore:
                 try:
-                    child_folders = await self.user_client.me.mail_folders.by_mail_folder_id(folder.id).child_folders.get()
-                    if child_folders and child_folders.value:
-                        for child in child_folders.value:
-                            child_info = {
-                                "id": child.id,
-                                "display_name": child.display_name,
-                                "parent_folder_id": child.parent_folder_id
-                            }
-                            folder_info["child_folders"].append(child_info)
+                    return await self._fetch_folder_level(
+                        self.mailbox.mail_folders.by_mail_folder_id(node.id).child_folders,
+                        ChildFoldersRequestBuilder.ChildFoldersRequestBuilderGetQueryParameters)
                 except Exception as e:
                     # Some folders might not support child folder operations
-                    print("Error getting mail folders: ", e)
+                    logging.warning(f"Error getting child folders of {node.path}: {str(e)}")
+                    return []
+
+        while pending:
+            level, pending = pending, []
+            children_per_node = await asyncio.gather(*(fetch_children(node) for node in level))
+            for node, children in zip(level, children_per_node):
+                for child in children:
+                    add_folder(child, node)
+
+        return tree
+
+    async def get_folder_tree(self, force_refresh: bool = False) -> FolderTree:
+        """
+        Get the folder tree from the folder cache, loading it from Graph only when missing or expired
+
+        Args:
+            force_refresh: If True, reloads the tree even if the cached copy is still fresh
+
+        Returns:
+            FolderTree with every folder indexed by ID
+        """
+        tree = None if force_refresh else self.folder_cache.get()
+        if tree is not None:
+            return tree
+
+        async with self.folder_cache.lock:
+            # Another caller may have loaded the tree while we waited
+            tree = None if force_refresh else self.folder_cache.get()
+            if tree is None:
+                tree = await self.load_folder_tree()
+                self.folder_cache.set(tree)
+        return tree
+
+    async def get_mail_folder_id_dict(self):
+        """Gets a dict matching full folder paths (e.g. "Inbox/Clients/Acme") to folder IDs"""
+        tree = await self.get_folder_tree()
+        return tree.path_to_id()
+
+    async def resolve_mail_folder(self, path: str, prefix: bool = False, limit: int = 20):
+        """
+        Resolve a folder path to folders from the cached folder tree
 
-                result.append(folder_info)
+        Args:
+            path: Full folder path such as "Clients/Acme/Invoices", or a display name
+            prefix: If True, returns all folders whose path starts with path
+            limit: Maximum number of folders to return
 
-        return result
+        Returns:
+            List of matching FolderNode objects
+        """
+        tree = await self.get_folder_tree()
+        return tree.resolve(path, prefix=prefix, limit=limit)
+
+    async def get_mail_folder_hierarchy(self):
+        """Gets all mail folders with their hierarchical structure"""
+        tree = await self.get_folder_tree()
+        return tree.to_hierarchy()
+
+    async def resolve_folder_id(self, folder_id: str) -> str:
+        """
+        Resolve a well-known folder name (e.g. 'archive') to the folder's ID
+
+        Args:
+            folder_id: Folder ID or well-known name
+
+        Returns:
+            The folder's ID; IDs are returned unchanged
+        """
+        if not is_well_known_folder(folder_id):
+            return folder_id
+        name = folder_key(folder_id)
+        resolved = self.folder_cache.well_known_ids.get(name)
+        if resolved is None:
+            # Well-known folder IDs never change, so each name costs one request per mailbox
+            query_params = MailFolderItemRequestBuilder.MailFolderItemRequestBuilderGetQueryParameters(select=['id'])
+            folder = await self.mailbox.mail_folders.by_mail_folder_id(name).get(
+                request_configuration=RequestConfiguration(query_parameters=query_params))
+            if folder is None or not folder.id:
+                return folder_id
+            resolved = self.folder_cache.well_known_ids[name] = folder.id
+        return resolved
+
+    def _known_folder_id(self, folder_id: str) -> str:
+        """The folder's ID if it is an ID or an already resolved well-known name, else folder_id unchanged"""
+        return self.folder_cache.well_known_ids.get(folder_key(folder_id), folder_id)
+
+    async def _invalidate_folders(self, folder_ids: Iterable[str], message_ids: Iterable[str] = ()):
+        """Drop cached search pages for folders given by ID or well-known name, under both spellings"""
+        folder_ids = list(folder_ids)
+        known = self.folder_cache.well_known_ids
+        unresolved = [folder_id for folder_id in folder_ids
+                      if is_well_known_folder(folder_id) and folder_key(folder_id) not in known]
+        # A page cached under an ID that belongs to no known well-known folder may be an unresolved folder's
+        unknown_pages = [key for key in self.query_cache.folder_ids() - set(folder_ids)
+                         if not is_well_known_folder(key) and key not in known.values()]
+        if unresolved and unknown_pages:
+            try:
+                for folder_id in unresolved:
+                    await self.resolve_folder_id(folder_id)
+            except Exception as e:
+                # Without the ID those pages cannot be told apart; drop them all rather than serve stale results
+                logging.warning(f"Could not resolve folders {unresolved}, clearing the query cache: {str(e)}")
+                self.query_cache.clear()
+                return
+        resolved = [self._known_folder_id(folder_id) for folder_id in folder_ids]
+        self.query_cache.invalidate(folder_ids=folder_ids + resolved, message_ids=message_ids)
 
     async def get_mail_folder_by_id(self, folder_id: str):
         """Get folder with specified ID
@@ -407,7 +658,18 @@ class MailService:
             Folder details with ID and display name
 
         """
-        response = await self.user_client.me.mail_folders.by_mail_folder_id(folder_id).get()
+        node = (await self.get_folder_tree()).get(folder_id)
+        if node is not None:
+            return node.display_name
+
+        # Well-known names (e.g. 'inbox') and folders created elsewhere are not in the cached tree
+        try:
+            response = await self.mailbox.mail_folders.by_mail_folder_id(folder_id).get()
+        except APIError as e:
+            if e.response_status_code == 404:
+                self.folder_cache.invalidate()
+                return "Folder not found"
+            raise
 
         if response is not None:
             return response.display_name
@@ -415,26 +677,117 @@ class MailService:
             return "Folder not found"
 
     async def get_inbox_count(self):
-        response = await self.user_client.me.mail_folders.by_mail_folder_id('inbox').messages.count.get()
+        if self.store is not None:
+            folder_id = await self.sync_folder('inbox')
+            return self.store.count_messages(folder_id)
+
+        response = await self.mailbox.mail_folders.by_mail_folder_id('inbox').messages.count.get()
         if response is not None:
             response = int(response)
         return response
 
-    async def get_full_mail_by_id(self, message_id: str):
-        """Get http email message response with specified message_id
+    async def get_full_mail_by_id(self, message_id: str, fields: List[str] = None, prefer_text: bool = False):
+        """Get email message with specified message_id, transferring only the requested properties
 
         Args:
             message_id: ID of the message to retrieve
+            fields: Graph property names to fetch (default: MESSAGE_FIELDS); id is always included
+            prefer_text: If True, asks Graph to convert the body to plain text before sending it
 
         Returns:
-            The http response from which one can grab the body with content of the mail message
+            The message from which one can grab the body with content of the mail message
         """
-        response = await self.user_client.me.messages.by_message_id(message_id).get()
-        if response is not None:
-            response = response
+        select = list(fields) if fields else list(MESSAGE_FIELDS)
+        if 'id' not in select:
+            select.append('id')
+
+        query_params = MessageItemRequestBuilder.MessageItemRequestBuilderGetQueryParameters(
+            select=select
+        )
+        request_config = RequestConfiguration(
+            query_parameters=query_params
+        )
+        if prefer_text:
+            request_config.headers.add("Prefer", 'outlook.body-content-type="text"')
+
+        response = await self.mailbox.messages.by_message_id(message_id).get(
+            request_configuration=request_config)
         return response
 
+    async def list_attachments(self, message_id: str):
+        """
+        List the attachments of a message without downloading their content
+
+        Args:
+            message_id: ID of the message
+
+        Returns:
+            List of attachments with id, name, content type, size and whether they are inline
+        """
+        query_params = AttachmentsRequestBuilder.AttachmentsRequestBuilderGetQueryParameters(
+            select=ATTACHMENT_SELECT
+        )
+        request_config = RequestConfiguration(
+            query_parameters=query_params
+        )
+        response = await self.mailbox.messages.by_message_id(message_id).attachments.get(
+            request_configuration=request_config)
+        return response.value if response and response.value else []
+
+    async def download_attachment(self, message_id: str, attachment_id: str) -> CachedAttachment:
+        """
+        Stream an attachment to the local attachment cache in fixed-size chunks
+
+        The raw content comes from attachments/{id}/$value, so memory use does not depend on the
+        attachment size. Repeated downloads of the same attachment are served from disk.
+
+        Args:
+            message_id: ID of the message
+            attachment_id: ID of the attachment
+
+        Returns:
+            The cached attachment with its local path, name, content type, size and SHA-256
+
+        Raises:
+            RuntimeError: If no attachment cache is configured
+        """
+        if self.attachment_cache is None:
+            raise RuntimeError("No attachment cache is configured; set OUTLOOK_MCP_ATTACHMENT_DIR")
+        cached = self.attachment_cache.get(message_id, attachment_id, self.mailbox_id)
+        if cached is not None:
+            return cached
+
+        async with self.attachment_cache.lock(message_id, attachment_id, self.mailbox_id):
+            # Another request may have finished the same download while this one waited
+            cached = self.attachment_cache.get(message_id, attachment_id, self.mailbox_id)
+            if cached is not None:
+                return cached
+
+            query_params = AttachmentItemRequestBuilder.AttachmentItemRequestBuilderGetQueryParameters(
+                select=ATTACHMENT_SELECT
+            )
+            request_config = RequestConfiguration(
+                query_parameters=query_params
+            )
+            attachment = await self.mailbox.messages.by_message_id(message_id).attachments.by_attachment_id(
+                attachment_id).get(request_configuration=request_config)
+
+            name = attachment.name or attachment_id
+            if attachment.odata_type and "itemAttachment" in attachment.odata_type and not name.endswith(".eml"):
+                # Attached Outlook items are returned as MIME
+                name += ".eml"
+
+            path = f"{mailbox_path(self.mailbox_id)}/messages/{quote(message_id, safe='')}/attachments/{quote(attachment_id, safe='')}/$value"
+            async with stream_response(self.user_client, path) as response:
+                return await self.attachment_cache.store(message_id, attachment_id, name, attachment.content_type,
+                                                         response.aiter_bytes(STREAM_CHUNK_SIZE),
+                                                         mailbox_id=self.mailbox_id)
+
     async def get_mail_from_specific_mail_folder(self, folder_id: str='inbox', count: int=50):
+        if self.store is not None:
+            folder_id = await self.sync_folder(folder_id)
+            return MessageCollectionResponse(value=self.store.list_messages(folder_id, count))
+
         query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
             # Only request specific properties
             select=['from', 'isRead', 'receivedDateTime', 'subject', 'id', 'toRecipients', 'ccRecipients', 'bccRecipients', 'replyTo'],
@@ -447,51 +800,156 @@ class MailService:
             query_parameters= query_params
         )
 
-        messages = await self.user_client.me.mail_folders.by_mail_folder_id(folder_id).messages.get(
+        messages = await self.mailbox.mail_folders.by_mail_folder_id(folder_id).messages.get(
                 request_configuration=request_config)
         return messages
 
-    async def search_mail(self, query: MailQuery):
+    async def iter_search_results(self, query: MailQuery, cursor: str = None):
         """
-        Search for emails based on the provided query parameters
+        Lazily yield messages matching a query, following Graph next links only as results are consumed
 
         Args:
             query: A MailQuery object containing search parameters
+            cursor: Opaque cursor returned by a previous search to resume from
 
-        Returns:
-            A collection of messages matching the search criteria
-        """
+        Yields:
+            (message, resume_state) pairs; resume_state is None after the last matching message
 
-        # Build query parameters
-        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
-            select=query.select,
-            top=query.count
-        )
-
-        if query.is_full_text_query():
-            search_string = query.build_search_query()
-            if search_string:
-                query_params.search = f"\"{search_string}\""
-        else:
-            query_params.orderby = query.orderby
-            if query.is_read is not None:
-                query_params.filter = f"isRead eq {str(query.is_read).lower()}"
-
-        request_config = RequestConfiguration(
-            query_parameters=query_params
-        )
+        Raises:
+            ValueError: If the cursor is invalid, or came from the local store and the store can no longer answer
+        """
+        state = decode_cursor(cursor) or {}
+
+        # Serve from the local store when it holds everything the query needs
+        if self.store is not None and "url" not in state and not query.include_nested_folders:
+            query = dataclasses.replace(query, folder_id=await self.sync_folder(query.folder_id))
+            if self.store.can_answer(query):
+                offset = state.get("offset", 0)
+                messages = self.store.search(query, offset=offset)
+                for index, message in enumerate(messages, 1):
+                    # A full page may have more rows behind it; a short one is the end
+                    resume_state = {"offset": offset + index} if len(messages) == query.count else None
+                    yield message, resume_state
+                return
+
+        if "offset" in state:
+            # The local index issued this cursor but can no longer answer the query; Graph would start over at
+            # page 1 and repeat results the caller already has
+            raise ValueError("This cursor came from the local index, which can no longer answer the query. "
+                             "Run the search again without a cursor.")
 
         # Determine the target folder
         if query.include_nested_folders:
             # Search across all folders
-            messages = await self.user_client.me.messages.get(
-                request_configuration=request_config)
+            request_builder = self.mailbox.messages
         else:
             # Search in specific folder
-            messages = await self.user_client.me.mail_folders.by_mail_folder_id(query.folder_id).messages.get(
-                request_configuration=request_config)
+            request_builder = self.mailbox.mail_folders.by_mail_folder_id(query.folder_id).messages
 
-        return messages
+        plan = query.plan()
+        if "url" in state:
+            # Next link already carries the original query; resuming costs a single request
+            pages = iterate_pages(request_builder, url=state["url"], skip=state.get("skip", 0))
+        else:
+            query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
+                select=plan.select,
+                top=query.count,
+                filter=plan.filter,
+                orderby=plan.orderby,
+                expand=plan.expand
+            )
+            if plan.search:
+                query_params.search = f"\"{plan.search}\""
+
+            request_config = RequestConfiguration(
+                query_parameters=query_params
+            )
+            pages = iterate_pages(request_builder, request_configuration=request_config)
+
+        async for message, resume_state in pages:
+            # Conditions Graph cannot evaluate for this route are checked here
+            if plan.accepts(message):
+                yield message, resume_state
+
+    async def iter_search_headers(self, query: MailQuery, cursor: str = None):
+        """
+        Yield up to query.count matching message headers, serving repeated identical searches from the query cache
+
+        Args:
+            query: A MailQuery object containing search parameters
+            cursor: Opaque cursor returned by a previous search to resume from
+
+        Yields:
+            (MessageHeader, resume_state) pairs; resume_state is None after the last matching message
+        """
+        if self.query_cache.ttl > 0 and not query.include_nested_folders:
+            # Pages are keyed by folder ID, so 'archive' and the archive folder's ID share entries
+            query = dataclasses.replace(query, folder_id=await self.resolve_folder_id(query.folder_id))
+        cached = self.query_cache.get(query, cursor)
+        if cached is not None:
+            for row in cached:
+                yield row
+            return
+
+        rows = []
+        results = self.iter_search_results(query, cursor=cursor)
+        try:
+            async for message, resume_state in results:
+                row = (MessageHeader.from_graph(message), resume_state)
+                rows.append(row)
+                yield row
+                if len(rows) >= query.count:
+                    break
+        finally:
+            await results.aclose()
+
+        # Only reached when the page completed; a consumer that stopped early leaves nothing cached
+        self.query_cache.set(query, cursor, rows)
+
+    def explain_search(self, query: MailQuery) -> str:
+        """
+        Describe how a query would be executed without running it
+
+        Args:
+            query: A MailQuery object containing search parameters
+
+        Returns:
+            The chosen route (local index or Graph) with the $search/$filter/$orderby it would send
+        """
+        if self.store is not None and self.store.can_answer(
+                dataclasses.replace(query, folder_id=self._known_folder_id(query.folder_id))):
+            return "Route: local full-text index (folder is synced; no Graph request needed)"
+        explanation = query.plan().explain()
+        if self.store is not None:
+            explanation = "Local index cannot answer this query (folder not synced yet or unsupported field)\n" + explanation
+        return explanation
+
+    async def search_mail(self, query: MailQuery, cursor: str = None) -> MessagePage:
+        """
+        Search for emails based on the provided query parameters
+
+        Args:
+            query: A MailQuery object containing search parameters
+            cursor: Opaque cursor returned by a previous search to fetch the next page
+
+        Returns:
+            A MessagePage with up to query.count messages and a cursor for the next page (None if no more)
+        """
+        page = MessagePage()
+        resume_state = None
+
+        results = self.iter_search_results(query, cursor=cursor)
+        try:
+            async for message, resume_state in results:
+                page.value.append(message)
+                # Stop as soon as the requested number is reached; later pages are never fetched
+                if len(page.value) >= query.count:
+                    break
+        finally:
+            await results.aclose()
+
+        page.cursor = encode_cursor(resume_state)
+        return page
 
 
     async def create_mail_folder(self, display_name: str, parent_folder_id: str = None, is_hidden: bool = False):
@@ -517,12 +975,14 @@ class MailService:
         try:
             # Create as child folder if parent_folder_id is provided
             if parent_folder_id:
-                result = await self.user_client.me.mail_folders.by_mail_folder_id(parent_folder_id).child_folders.post(
+                result = await self.mailbox.mail_folders.by_mail_folder_id(parent_folder_id).child_folders.post(
                     request_body)
             else:
                 # Create as top-level folder
-                result = await self.user_client.me.mail_folders.post(request_body)
+                result = await self.mailbox.mail_folders.post(request_body)
 
+            if result is not None:
+                self.folder_cache.add_folder(result.id, result.display_name, parent_folder_id)
             return result
         except Exception as e:
             raise Exception(f"Error creating mail folder: {str(e)}")
@@ -561,18 +1021,12 @@ class MailService:
             if categories is not None:
                 update_message.categories = categories
 
+            self._validate_mail_properties(importance, inference_classification)
+
             if importance is not None:
-                # Validate importance value
-                valid_importance = ["low", "normal", "high"]
-                if importance.lower() not in valid_importance:
-                    raise ValueError(f"Importance must be one of: {', '.join(valid_importance)}")
                 update_message.importance = importance
 
             if inference_classification is not None:
-                # Validate inference classification value
-                valid_classification = ["focused", "other"]
-                if inference_classification.lower() not in valid_classification:
-                    raise ValueError(f"Inference classification must be one of: {', '.join(valid_classification)}")
                 update_message.inference_classification = inference_classification
 
             if is_delivery_receipt_requested is not None:
@@ -582,7 +1036,104 @@ class MailService:
                 update_message.is_read_receipt_requested = is_read_receipt_requested
 
             # Update the message
-            result = await self.user_client.me.messages.by_message_id(message_id).patch(update_message)
+            result = await self.mailbox.messages.by_message_id(message_id).patch(update_message)
+            self._invalidate_updated_messages([message_id], is_read=is_read, importance=importance)
+            if self.store is not None:
+                self.store.mark_stale()
             return result
         except Exception as e:
-            raise Exception(f"Error updating mail properties: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error updating mail properties: {str(e)}")
+
+    def _invalidate_updated_messages(self, message_ids: Iterable[str], is_read: bool = None, importance: str = None):
+        """Drop cached searches showing the messages, and any search filtering on a property that changed"""
+        query_fields = []
+        if is_read is not None:
+            query_fields.append('is_read')
+        if importance is not None:
+            query_fields.append('importance')
+        self.query_cache.invalidate(message_ids=message_ids, query_fields=query_fields)
+
+    @staticmethod
+    def _validate_mail_properties(importance: str = None, inference_classification: str = None):
+        """Raise ValueError for importance or inference classification values Graph would reject"""
+        if importance is not None:
+            valid_importance = ["low", "normal", "high"]
+            if importance.lower() not in valid_importance:
+                raise ValueError(f"Importance must be one of: {', '.join(valid_importance)}")
+
+        if inference_classification is not None:
+            valid_classification = ["focused", "other"]
+            if inference_classification.lower() not in valid_classification:
+                raise ValueError(f"Inference classification must be one of: {', '.join(valid_classification)}")
+
+    async def update_many_mail_properties(self,
+                                          message_ids: List[str] = None,
+                                          query: MailQuery = None,
+                                          is_read: bool = None,
+                                          categories: List[str] = None,
+                                          importance: str = None,
+                                          inference_classification: str = None,
+                                          is_delivery_receipt_requested: bool = None,
+                                          is_read_receipt_requested: bool = None,
+                                          concurrency: int = DEFAULT_BATCH_CONCURRENCY):
+        """
+        Update mail properties on many messages at once using JSON $batch
+
+        Args:
+            message_ids: IDs of the messages to update
+            query: Alternatively, a MailQuery selecting up to query.count messages to update
+            is_read: Mark the messages as read or unread
+            categories: List of categories to apply to the messages
+            importance: The importance of the messages ('Low', 'Normal', 'High')
+            inference_classification: Classification of messages ('focused' or 'other')
+            is_delivery_receipt_requested: Whether a delivery receipt is requested
+            is_read_receipt_requested: Whether a read receipt is requested
+            concurrency: Maximum number of $batch requests in flight
+
+        Returns:
+            List of dicts, one per message, with message_id, success and error (on failure)
+        """
+        self._validate_mail_properties(importance, inference_classification)
+
+        # Graph property names for the PATCH body; only fields that were provided are sent
+        patch = {
+            "isRead": is_read,
+            "categories": categories,
+            "importance": importance.lower() if importance is not None else None,
+            "inferenceClassification": inference_classification.lower() if inference_classification is not None else None,
+            "isDeliveryReceiptRequested": is_delivery_receipt_requested,
+            "isReadReceiptRequested": is_read_receipt_requested,
+        }
+        patch = {key: value for key, value in patch.items() if value is not None}
+        if not patch:
+            raise ValueError("Provide at least one property to update")
+
+        if message_ids is None:
+            if query is None:
+                raise ValueError("Provide either message_ids or a query")
+            # Only IDs are needed to address the PATCHes
+            query = dataclasses.replace(query, select=["id"])
+            message_ids = []
+            results = self.iter_search_results(query)
+            try:
+                async for message, _ in results:
+                    message_ids.append(message.id)
+                    if len(message_ids) >= query.count:
+                        break
+            finally:
+                await results.aclose()
+
+        requests = [
+            BatchRequest(method="PATCH", url=f"{mailbox_path(self.mailbox_id)}/messages/{quote(message_id, safe='')}", body=patch)
+            for message_id in message_ids
+        ]
+        batch_results = await execute_batch(self.user_client, requests, concurrency=concurrency)
+
+        self._invalidate_updated_messages(message_ids, is_read=is_read, importance=importance)
+        if self.store is not None:
+            self.store.mark_stale()
+
+        return [
+            {"message_id": message_id, "success": batch_result.ok, "error": batch_result.error_message}
+            for message_id, batch_result in zip(message_ids, batch_results)
+        ]
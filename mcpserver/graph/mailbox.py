@@ -0,0 +1,24 @@
+# mcpserver/graph/mailbox.py
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import quote
+
+from msgraph import GraphServiceClient
+
+# Mailbox (user ID or UPN) the current tool call acts on; None means the signed-in user (/me).
+# Set per call by requires_graph_auth, so concurrent calls for different mailboxes do not interfere.
+current_mailbox: ContextVar[Optional[str]] = ContextVar("current_mailbox", default=None)
+
+
+def mailbox_builder(user_client: GraphServiceClient, mailbox_id: Optional[str] = None):
+    """Request builder for a mailbox: me for the signed-in user, users/{id} for any other (or in app-only mode)"""
+    if mailbox_id is None:
+        return user_client.me
+    return user_client.users.by_user_id(mailbox_id)
+
+
+def mailbox_path(mailbox_id: Optional[str] = None) -> str:
+    """URL prefix of a mailbox for raw and batch requests, e.g. /me or /users/{id}"""
+    if mailbox_id is None:
+        return "/me"
+    return f"/users/{quote(mailbox_id, safe='')}"
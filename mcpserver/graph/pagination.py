@@ -0,0 +1,76 @@
+# mcpserver/graph/pagination.py
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+
+@dataclass
+class MessagePage:
+    """A page of results plus an opaque cursor for fetching the next one (None when exhausted)"""
+    value: List[Any] = field(default_factory=list)
+    cursor: Optional[str] = None
+
+
+def encode_cursor(state: Optional[dict]) -> Optional[str]:
+    """Pack resume state into an opaque, URL-safe cursor string"""
+    if not state:
+        return None
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """Unpack a cursor created by encode_cursor; raises ValueError if it was tampered with"""
+    if not cursor:
+        return None
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor. Use the cursor value returned by the previous search unchanged.")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor. Use the cursor value returned by the previous search unchanged.")
+    return state
+
+
+async def iterate_pages(request_builder,
+                        request_configuration=None,
+                        url: str = None,
+                        skip: int = 0) -> AsyncIterator[Tuple[Any, Optional[dict]]]:
+    """
+    Lazily walk a Graph collection, following odata_next_link only when more items are consumed
+
+    Args:
+        request_builder: Collection request builder (e.g. me.messages) used for the first page and with_url
+        request_configuration: Query parameters for the first page
+        url: Resume from this page URL instead of building the first request
+        skip: Number of items already consumed from the page at url
+
+    Yields:
+        (item, resume_state) pairs; resume_state points at the item after this one, None when nothing follows
+    """
+    if url is None:
+        url = request_builder.to_get_request_information(request_configuration).url
+        page = await request_builder.get(request_configuration=request_configuration)
+    else:
+        page = await request_builder.with_url(url).get()
+
+    while page is not None:
+        items = page.value or []
+        next_link = page.odata_next_link
+
+        for index in range(skip, len(items)):
+            # Resume inside this page if items remain, otherwise at the next link
+            if index + 1 < len(items):
+                resume_state = {"url": url, "skip": index + 1}
+            elif next_link:
+                resume_state = {"url": next_link, "skip": 0}
+            else:
+                resume_state = None
+            yield items[index], resume_state
+
+        if not next_link:
+            break
+
+        url, skip = next_link, 0
+        page = await request_builder.with_url(url).get()
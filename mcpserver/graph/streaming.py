@@ -0,0 +1,129 @@
+# mcpserver/graph/streaming.py
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+from msgraph import GraphServiceClient
+from kiota_abstractions.api_error import APIError
+from kiota_abstractions.method import Method
+from kiota_abstractions.request_information import RequestInformation
+from msgraph.generated.models.o_data_errors.o_data_error import ODataError
+
+from mcpserver.throttling import send_with_retry
+
+
+# Read and write size for streamed bodies; memory use stays at roughly one chunk per transfer
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def http_client(user_client: GraphServiceClient) -> httpx.AsyncClient:
+    """The httpx client behind the SDK, for requests that must bypass kiota serialization or authentication
+    (e.g. pre-authenticated upload URLs, which reject an Authorization header)"""
+    return user_client.request_adapter._http_client
+
+
+async def request_json(user_client: GraphServiceClient,
+                       path: str,
+                       method: Method = Method.GET,
+                       body: Optional[dict] = None,
+                       content: Optional[bytes] = None,
+                       content_type: Optional[str] = None) -> dict:
+    """
+    Send an authenticated Graph request for paths the SDK builders cannot express (e.g. drive paths like
+    items/{id}:/{name}:/createUploadSession) and return the JSON response
+
+    Args:
+        user_client: Authenticated GraphServiceClient
+        path: Path relative to the API version with IDs and names already URL-encoded, or an absolute next link
+        method: HTTP method
+        body: JSON body
+        content: Raw body, used instead of body
+        content_type: Content type of the raw body
+
+    Returns:
+        The parsed JSON response, or an empty dict for empty responses
+    """
+    request_info = RequestInformation(method, "{+baseurl}" + path)
+    if path.startswith("https://"):
+        # Absolute URLs such as @odata.nextLink are used as they are
+        request_info.url = path
+    request_info.headers.try_add("Accept", "application/json")
+    if body is not None:
+        request_info.set_stream_content(json.dumps(body).encode("utf-8"), "application/json")
+    elif content is not None:
+        request_info.set_stream_content(content, content_type or "application/octet-stream")
+
+    raw_response = await user_client.request_adapter.send_primitive_async(request_info, "bytes", {"XXX": ODataError})
+    return json.loads(raw_response) if raw_response else {}
+
+
+async def _raise_for_status(response: httpx.Response):
+    if response.status_code < 400:
+        return
+    message = f"HTTP {response.status_code}"
+    try:
+        error = json.loads(await response.aread()).get("error", {})
+        message = error.get("message") or error.get("code") or message
+    except Exception:
+        pass
+    raise APIError(message=message, response_status_code=response.status_code,
+                   response_headers=dict(response.headers))
+
+
+@asynccontextmanager
+async def stream_response(user_client: GraphServiceClient,
+                          path: str,
+                          method: Method = Method.GET,
+                          headers: Optional[dict] = None) -> AsyncIterator[httpx.Response]:
+    """
+    Send an authenticated Graph request and expose the response body as a stream instead of reading it into memory
+
+    The request goes through the client's request adapter, so it is authenticated and passes the same
+    retry/redirect middleware as SDK calls.
+
+    Args:
+        user_client: Authenticated GraphServiceClient
+        path: Path relative to the API version with IDs already URL-encoded, e.g. /me/messages/{id}/$value
+        method: HTTP method
+        headers: Extra request headers
+
+    Yields:
+        The httpx response; read it with aiter_bytes(). Raises APIError for error status codes.
+    """
+    request_adapter = user_client.request_adapter
+    request_info = RequestInformation(method, "{+baseurl}" + path)
+    request_adapter.set_base_url_for_request_information(request_info)
+    for name, value in (headers or {}).items():
+        request_info.headers.try_add(name, value)
+
+    request = await request_adapter.convert_to_native_async(request_info)
+    response = await http_client(user_client).send(request, stream=True)
+    try:
+        await _raise_for_status(response)
+        yield response
+    finally:
+        await response.aclose()
+
+
+@asynccontextmanager
+async def stream_url(user_client: GraphServiceClient, url: str) -> AsyncIterator[httpx.Response]:
+    """
+    Stream a GET from a pre-authenticated URL (e.g. @microsoft.graph.downloadUrl) without adding credentials
+
+    Such requests skip the Graph middleware, so throttled and unavailable responses are retried here.
+
+    Args:
+        user_client: GraphServiceClient whose httpx client (and connection pool) is used
+        url: Absolute pre-authenticated URL
+
+    Yields:
+        The httpx response; read it with aiter_bytes(). Raises APIError for error status codes.
+    """
+    client = http_client(user_client)
+    response = await send_with_retry(client, client.build_request("GET", url), stream=True)
+    try:
+        await _raise_for_status(response)
+        yield response
+    finally:
+        await response.aclose()
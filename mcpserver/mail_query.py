@@ -1,6 +1,122 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Optional, List, Union
-from datetime import datetime
+from datetime import datetime, timezone
+
+
+# PidTagMessageSize; Graph exposes message size only as a MAPI extended property
+SIZE_PROPERTY_ID = "Integer 0x0E08"
+
+# Lower bound used to put the ordering property first in $filter, which Graph requires when both are used
+_MIN_DATETIME = "1900-01-01T00:00:00Z"
+
+# Orderable properties the _MIN_DATETIME placeholder is valid for
+_DATETIME_PROPERTIES = {"receivedDateTime", "sentDateTime", "createdDateTime", "lastModifiedDateTime"}
+
+# $filter property to the MailQuery fields it evaluates (also the post-filters that replace it)
+_FILTER_FIELDS = {
+    "receivedDateTime": ("received_after", "received_before"),
+    "sentDateTime": ("sent_after", "sent_before"),
+    "isRead": ("is_read",),
+    "importance": ("importance",),
+    "hasAttachments": ("has_attachments",),
+}
+
+
+def _odata_datetime(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _utc(value: datetime) -> datetime:
+    # Naive datetimes are sent to Graph as UTC, so they are compared as UTC too
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _in_range(value: Optional[datetime], after: Optional[datetime], before: Optional[datetime]) -> bool:
+    if after is None and before is None:
+        return True
+    if value is None:
+        return False
+    value = _utc(value)
+    return (after is None or value >= _utc(after)) and (before is None or value <= _utc(before))
+
+
+@dataclass
+class QueryPlan:
+    """How a MailQuery is executed against Graph: server-side $filter or $search, plus local post-filters"""
+    query: "MailQuery"
+    route: str  # "$filter" or "$search"
+    search: Optional[str] = None
+    filter: Optional[str] = None
+    orderby: Optional[List[str]] = None
+    expand: Optional[List[str]] = None
+    select: List[str] = field(default_factory=list)
+    post_filters: List[str] = field(default_factory=list)  # MailQuery fields checked on each returned message
+
+    def accepts(self, message) -> bool:
+        """True if a message returned by Graph passes the local post-filters"""
+        query = self.query
+        if "is_read" in self.post_filters and bool(message.is_read) != query.is_read:
+            return False
+        if ("received_after" in self.post_filters or "received_before" in self.post_filters) and not _in_range(
+                message.received_date_time, query.received_after, query.received_before):
+            return False
+        if ("sent_after" in self.post_filters or "sent_before" in self.post_filters) and not _in_range(
+                message.sent_date_time, query.sent_after, query.sent_before):
+            return False
+        if "importance" in self.post_filters:
+            importance = getattr(message.importance, "value", message.importance)
+            if (importance or "").lower() != query.graph_importance():
+                return False
+        if "has_attachments" in self.post_filters and bool(message.has_attachments) != query.has_attachments:
+            return False
+        if "size_min" in self.post_filters or "size_max" in self.post_filters:
+            size = _message_size(message)
+            if size is None:
+                return False
+            if query.size_min is not None and size < query.size_min:
+                return False
+            if query.size_max is not None and size > query.size_max:
+                return False
+        return True
+
+    def explain(self) -> str:
+        """Readable description of the chosen route, for debugging slow or surprising searches"""
+        lines = [f"Route: Graph {self.route}"]
+        if self.search:
+            lines.append(f"$search: {self.search}")
+        if self.filter:
+            lines.append(f"$filter: {self.filter}")
+        if self.orderby:
+            lines.append(f"$orderby: {', '.join(self.orderby)}")
+        else:
+            lines.append("$orderby: none ($search results come back in relevance order)")
+        if self.expand:
+            lines.append(f"$expand: {', '.join(self.expand)}")
+        lines.append(f"$select: {', '.join(self.select)}")
+        if self.post_filters:
+            lines.append(f"Local post-filters: {', '.join(self.post_filters)} "
+                         f"(more pages may be fetched to fill {self.query.count} results)")
+        else:
+            lines.append("Local post-filters: none")
+        return "\n".join(lines)
+
+
+def _message_size(message) -> Optional[int]:
+    # Graph normalizes the id it returns (e.g. "Integer 0xe08"), so compare the property tag numerically
+    size_type, size_tag = SIZE_PROPERTY_ID.split()
+    for prop in message.single_value_extended_properties or []:
+        parts = (prop.id or "").split()
+        if len(parts) != 2 or parts[0].lower() != size_type.lower():
+            continue
+        try:
+            if int(parts[1], 16) == int(size_tag, 16):
+                return int(prop.value)
+        except (TypeError, ValueError):
+            return None
+    return None
+
 
 @dataclass
 class MailQuery:
@@ -25,7 +141,7 @@ class MailQuery:
     attachment_name: Optional[str] = None
 
     # Other properties
-    importance: Optional[str] = None  # "low", "medium", "high"
+    importance: Optional[str] = None  # "low", "normal", "high"
     is_read: Optional[bool] = None
     size_min: Optional[int] = None  # in bytes
     size_max: Optional[int] = None  # in bytes
@@ -44,6 +160,21 @@ class MailQuery:
         if self.select is None:
             self.select = ["from", "isRead", "receivedDateTime", "subject", "id"]
 
+    @classmethod
+    def from_dict(cls, query_dict: dict) -> "MailQuery":
+        """Create a query from a dict such as parsed tool JSON; unknown keys are ignored and
+        date fields accept ISO 8601 strings"""
+        date_fields = {'received_after', 'received_before', 'sent_after', 'sent_before'}
+        kwargs = {}
+        for query_field in fields(cls):
+            if query_field.name not in query_dict:
+                continue
+            value = query_dict[query_field.name]
+            if query_field.name in date_fields and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            kwargs[query_field.name] = value
+        return cls(**kwargs)
+
     def build_search_query(self) -> Optional[str]:
         """Build a $search query string based on the properties set in this query."""
         search_terms = []
@@ -77,10 +208,6 @@ class MailQuery:
                     or_terms = [f"{search_property}:{item}" for item in value]
                     search_terms.append(f"({' OR '.join(or_terms)})")
 
-        # Add is_read to search if it's set
-        if self.is_read is not None:
-            search_terms.append(f"isRead:{str(self.is_read).lower()}")
-
         # Handle date ranges
         if self.received_after or self.received_before:
             if self.received_after and self.received_before:
@@ -122,11 +249,109 @@ class MailQuery:
         return None
 
     def is_full_text_query(self) -> bool:
-        """Returns True if this query should use $search (e.g. subject/body search only)"""
-        return (
-                self.subject or self.body or self.from_email or self.to_email or
-                self.cc_email or self.bcc_email or self.participants or self.recipients or
-                self.attachment_name
-        ) is not None and not (
-                self.is_read or self.received_after or self.sent_after or self.importance
-        )
\ No newline at end of file
+        """Returns True if this query needs $search: text, attachment name and kind have no $filter equivalent"""
+        return any(value is not None for value in (
+            self.subject, self.body, self.from_email, self.to_email, self.cc_email, self.bcc_email,
+            self.participants, self.recipients, self.attachment_name, self.kind
+        ))
+
+    def graph_importance(self) -> Optional[str]:
+        """Importance as Graph spells it ("medium" is an alias for "normal")"""
+        if self.importance is None:
+            return None
+        return 'normal' if self.importance.lower() == 'medium' else self.importance.lower()
+
+    def _filter_clauses(self) -> List[str]:
+        """$filter clauses for the properties Graph can filter on server-side, each starting with its property"""
+        clauses = []
+        if self.received_after is not None:
+            clauses.append(f"receivedDateTime ge {_odata_datetime(self.received_after)}")
+        if self.received_before is not None:
+            clauses.append(f"receivedDateTime le {_odata_datetime(self.received_before)}")
+        if self.sent_after is not None:
+            clauses.append(f"sentDateTime ge {_odata_datetime(self.sent_after)}")
+        if self.sent_before is not None:
+            clauses.append(f"sentDateTime le {_odata_datetime(self.sent_before)}")
+        if self.is_read is not None:
+            clauses.append(f"isRead eq {str(self.is_read).lower()}")
+        if self.importance is not None:
+            clauses.append(f"importance eq '{self.graph_importance()}'")
+        if self.has_attachments is not None:
+            clauses.append(f"hasAttachments eq {str(self.has_attachments).lower()}")
+        return clauses
+
+    def _order_property(self) -> Optional[str]:
+        return self.orderby[0].split()[0] if self.orderby else None
+
+    def _orderby_fits_filter(self) -> bool:
+        """
+        True if $filter and $orderby can be sent together: Graph rejects $orderby properties that are not the
+        first ones in $filter ("InefficientFilter"), and only datetime properties have a placeholder clause
+        """
+        order_property = self._order_property()
+        clauses = self._filter_clauses()
+        if not clauses or order_property is None or order_property in _DATETIME_PROPERTIES:
+            return True
+        return any(clause.startswith(f"{order_property} ") for clause in clauses)
+
+    def build_filter_query(self) -> Optional[str]:
+        """Build a $filter string from the properties Graph can filter on server-side"""
+        clauses = self._filter_clauses()
+        if not clauses:
+            return None
+
+        # Graph rejects $orderby properties that are not the first ones in $filter ("InefficientFilter")
+        order_property = self._order_property()
+        if order_property:
+            leading = [clause for clause in clauses if clause.startswith(f"{order_property} ")]
+            others = [clause for clause in clauses if not clause.startswith(f"{order_property} ")]
+            if not leading and order_property in _DATETIME_PROPERTIES:
+                leading = [f"{order_property} ge {_MIN_DATETIME}"]
+            clauses = leading + others
+
+        return " and ".join(clauses)
+
+    def plan(self) -> QueryPlan:
+        """
+        Compile the query into an execution plan
+
+        $search is used when the query has text fields (Graph cannot combine it with $filter or $orderby), so
+        dates, importance, attachments and size go into the KQL string and is_read is checked locally.
+        Otherwise everything goes into $filter with the requested ordering, unless the ordering property cannot lead
+        the $filter (e.g. subject), in which case the filter conditions are checked locally. Size bounds are always
+        checked locally against the message size extended property.
+        """
+        select = list(self.select)
+        post_filters = []
+        expand = None
+
+        if self.size_min is not None or self.size_max is not None:
+            expand = [f"singleValueExtendedProperties($filter=id eq '{SIZE_PROPERTY_ID}')"]
+
+        if self.is_full_text_query():
+            if self.is_read is not None:
+                post_filters.append("is_read")
+                if "isRead" not in select:
+                    select.append("isRead")
+            # KQL size terms are approximate; the exact bounds are checked locally as well
+            if expand:
+                post_filters.extend(name for name in ("size_min", "size_max") if getattr(self, name) is not None)
+            return QueryPlan(query=self, route="$search", search=self.build_search_query(),
+                             expand=expand, select=select, post_filters=post_filters)
+
+        if expand:
+            post_filters.extend(name for name in ("size_min", "size_max") if getattr(self, name) is not None)
+
+        if not self._orderby_fits_filter():
+            # Ordering by e.g. subject cannot be combined with $filter; keep Graph's ordering across pages and
+            # check the filter conditions locally instead
+            for graph_property, names in _FILTER_FIELDS.items():
+                used = [name for name in names if getattr(self, name) is not None]
+                post_filters.extend(used)
+                if used and graph_property not in select:
+                    select.append(graph_property)
+            return QueryPlan(query=self, route="$filter", orderby=list(self.orderby), expand=expand, select=select,
+                             post_filters=post_filters)
+
+        return QueryPlan(query=self, route="$filter", filter=self.build_filter_query(), orderby=list(self.orderby),
+                         expand=expand, select=select, post_filters=post_filters)
\ No newline at end of file
@@ -0,0 +1,385 @@
+# mcpserver/mail_store.py
+import json
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from msgraph.generated.models.message import Message
+from msgraph.generated.models.recipient import Recipient
+from msgraph.generated.models.email_address import EmailAddress
+from msgraph.generated.models.importance import Importance
+from mcpserver.body_normalizer import normalize_body
+from mcpserver.mail_query import MailQuery, _utc
+
+
+# Properties requested from the delta endpoint; everything the header tools display, plus the body for indexing
+HEADER_SELECT = ['from', 'isRead', 'receivedDateTime', 'sentDateTime', 'subject', 'id', 'toRecipients',
+                 'ccRecipients', 'bccRecipients', 'replyTo', 'hasAttachments', 'importance', 'conversationId',
+                 'body']
+
+# MailQuery fields the store can answer locally; anything else falls back to Graph
+_UNSUPPORTED_QUERY_FIELDS = ['attachment_name', 'size_min', 'size_max']
+
+# Message kinds the store can tell apart (KQL kind: values)
+_SUPPORTED_KINDS = ['email', 'meetings']
+
+# Graph $orderby properties the store can sort by, as SQL over the messages table; Graph sorts importance by rank
+_ORDER_COLUMNS = {
+    'receiveddatetime': 'm.received_date_time',
+    'sentdatetime': 'm.sent_date_time',
+    'subject': 'm.subject COLLATE NOCASE',
+    'from/emailaddress/name': 'm.sender_name COLLATE NOCASE',
+    'from/emailaddress/address': 'm.sender_email COLLATE NOCASE',
+    'importance': "CASE m.importance WHEN 'low' THEN 0 WHEN 'normal' THEN 1 WHEN 'high' THEN 2 END",
+    'isread': 'm.is_read',
+    'hasattachments': 'm.has_attachments',
+}
+
+# Bumped whenever the schema changes; older stores are dropped and resynced since they are only a cache
+_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    folder_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    subject TEXT,
+    sender_name TEXT,
+    sender_email TEXT,
+    to_recipients TEXT,
+    cc_recipients TEXT,
+    bcc_recipients TEXT,
+    reply_to TEXT,
+    received_date_time TEXT,
+    sent_date_time TEXT,
+    is_read INTEGER,
+    has_attachments INTEGER,
+    importance TEXT,
+    conversation_id TEXT,
+    is_meeting INTEGER,
+    PRIMARY KEY (folder_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_received ON messages (folder_id, received_date_time DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    subject, sender, recipients, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    folder_id TEXT PRIMARY KEY,
+    delta_link TEXT,
+    synced_at REAL
+);
+"""
+
+
+def _recipients_to_json(recipients) -> str:
+    """Serialize a list of Graph recipients to a JSON list of [name, address] pairs"""
+    pairs = []
+    for recipient in recipients or []:
+        if recipient.email_address:
+            pairs.append([recipient.email_address.name, recipient.email_address.address])
+    return json.dumps(pairs)
+
+
+def _recipients_to_text(*recipient_lists) -> str:
+    """Flatten recipients to "name address" text for the full-text index"""
+    terms = []
+    for recipients in recipient_lists:
+        for recipient in recipients or []:
+            if recipient.email_address:
+                terms.append(f"{recipient.email_address.name or ''} {recipient.email_address.address or ''}")
+    return " ".join(terms)
+
+
+def _fts_phrase(value: str) -> str:
+    """Quote user text as an FTS5 prefix phrase, so operators and punctuation in it are not interpreted"""
+    return '"' + str(value).replace('"', '""') + '"*'
+
+
+def _sortable_datetime(value: datetime) -> str:
+    """Fixed-width UTC timestamp, so stored values and query bounds compare correctly as text"""
+    return _utc(value).isoformat(timespec="microseconds")
+
+
+def _order_by_sql(orderby: Optional[List[str]]) -> Optional[str]:
+    """ORDER BY terms for a Graph $orderby list, or None if it sorts by a property the store does not keep"""
+    terms = []
+    for term in orderby or []:
+        parts = term.split()
+        if not parts:
+            continue
+        column = _ORDER_COLUMNS.get(parts[0].lower())
+        # Graph sorts ascending unless told otherwise
+        direction = parts[1].upper() if len(parts) > 1 else "ASC"
+        if column is None or len(parts) > 2 or direction not in ("ASC", "DESC"):
+            return None
+        terms.append(f"{column} {direction}")
+    # Newest first breaks ties, and is the order when none is requested
+    terms.append("m.received_date_time DESC")
+    return ", ".join(terms)
+
+
+def _recipients_from_json(value: Optional[str]) -> List[Recipient]:
+    """Rebuild Graph recipients from the JSON stored by _recipients_to_json"""
+    recipients = []
+    for name, address in json.loads(value or "[]"):
+        recipients.append(Recipient(email_address=EmailAddress(name=name, address=address)))
+    return recipients
+
+
+class MailStore:
+    """
+    Local SQLite copy of mail headers, kept current with Graph's messages/delta endpoint.
+    Each folder keeps its own delta link so only incremental changes are pulled between tool calls.
+    Subject, sender, recipients and the normalized body are indexed with FTS5 for ranked offline search.
+    """
+
+    def __init__(self, db_path: Path, sync_interval: float = 30.0):
+        self.db_path = Path(db_path)
+        self.sync_interval = sync_interval
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5.0)
+        self.connection.row_factory = sqlite3.Row
+        # Several server processes may share the store; WAL lets them read while one syncs
+        self.connection.execute("PRAGMA journal_mode=WAL")
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != _SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS messages; DROP TABLE IF EXISTS messages_fts; DROP TABLE IF EXISTS sync_state;")
+            self.connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.connection.executescript(_SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def get_delta_link(self, folder_id: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT delta_link FROM sync_state WHERE folder_id = ?", (folder_id,)).fetchone()
+        return row["delta_link"] if row else None
+
+    def save_delta_link(self, folder_id: str, delta_link: str):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO sync_state (folder_id, delta_link, synced_at) VALUES (?, ?, ?)",
+            (folder_id, delta_link, time.time()))
+        self.connection.commit()
+
+    def is_synced(self, folder_id: str) -> bool:
+        """True once a full delta round has completed for the folder"""
+        return self.get_delta_link(folder_id) is not None
+
+    def needs_sync(self, folder_id: str) -> bool:
+        """True if the folder was never synced or its last sync is older than sync_interval"""
+        row = self.connection.execute(
+            "SELECT synced_at FROM sync_state WHERE folder_id = ?", (folder_id,)).fetchone()
+        if row is None or row["synced_at"] is None:
+            return True
+        return time.time() - row["synced_at"] >= self.sync_interval
+
+    def mark_stale(self, folder_id: str = None):
+        """Force the next read of a folder (or every folder) to pull changes from Graph"""
+        if folder_id is None:
+            self.connection.execute("UPDATE sync_state SET synced_at = 0")
+        else:
+            self.connection.execute("UPDATE sync_state SET synced_at = 0 WHERE folder_id = ?", (folder_id,))
+        self.connection.commit()
+
+    def reset_folder(self, folder_id: str):
+        """Drop local rows and the delta link for a folder, e.g. after the delta token expired"""
+        self.connection.execute(
+            "DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE folder_id = ?)", (folder_id,))
+        self.connection.execute("DELETE FROM messages WHERE folder_id = ?", (folder_id,))
+        self.connection.execute("DELETE FROM sync_state WHERE folder_id = ?", (folder_id,))
+        self.connection.commit()
+
+    def _delete_rows(self, where: str, params: tuple):
+        """Delete messages matching where, together with their full-text index entries"""
+        self.connection.execute(
+            f"DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE {where})", params)
+        self.connection.execute(f"DELETE FROM messages WHERE {where}", params)
+
+    def apply_changes(self, folder_id: str, messages: List[Message]):
+        """Upsert changed messages and delete removed ones from a delta page"""
+        for message in messages or []:
+            if message.additional_data and "@removed" in message.additional_data:
+                self._delete_rows("folder_id = ? AND id = ?", (folder_id, message.id))
+                continue
+
+            sender_name = None
+            sender_email = None
+            if message.from_ and message.from_.email_address:
+                sender_name = message.from_.email_address.name
+                sender_email = message.from_.email_address.address
+
+            # Upsert keeps the rowid stable, so the index entry can be replaced by rowid
+            row = self.connection.execute(
+                """INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (folder_id, id) DO UPDATE SET
+                    subject = excluded.subject, sender_name = excluded.sender_name,
+                    sender_email = excluded.sender_email, to_recipients = excluded.to_recipients,
+                    cc_recipients = excluded.cc_recipients, bcc_recipients = excluded.bcc_recipients,
+                    reply_to = excluded.reply_to, received_date_time = excluded.received_date_time,
+                    sent_date_time = excluded.sent_date_time, is_read = excluded.is_read,
+                    has_attachments = excluded.has_attachments, importance = excluded.importance,
+                    conversation_id = excluded.conversation_id, is_meeting = excluded.is_meeting
+                RETURNING rowid""",
+                (
+                    folder_id,
+                    message.id,
+                    message.subject,
+                    sender_name,
+                    sender_email,
+                    _recipients_to_json(message.to_recipients),
+                    _recipients_to_json(message.cc_recipients),
+                    _recipients_to_json(message.bcc_recipients),
+                    _recipients_to_json(message.reply_to),
+                    _sortable_datetime(message.received_date_time) if message.received_date_time else None,
+                    _sortable_datetime(message.sent_date_time) if message.sent_date_time else None,
+                    int(bool(message.is_read)),
+                    int(bool(message.has_attachments)),
+                    message.importance.value if message.importance else None,
+                    message.conversation_id,
+                    int('eventMessage' in (message.odata_type or '')),
+                )).fetchone()
+
+            body = ""
+            if message.body and message.body.content:
+                content_type = message.body.content_type.value if message.body.content_type else 'text'
+                body = normalize_body(message.body.content, content_type)
+
+            self.connection.execute("DELETE FROM messages_fts WHERE rowid = ?", (row[0],))
+            self.connection.execute(
+                "INSERT INTO messages_fts (rowid, subject, sender, recipients, body) VALUES (?, ?, ?, ?, ?)",
+                (
+                    row[0],
+                    message.subject or "",
+                    f"{sender_name or ''} {sender_email or ''}",
+                    _recipients_to_text(message.to_recipients, message.cc_recipients, message.bcc_recipients),
+                    body,
+                ))
+        self.connection.commit()
+
+    def remove_message(self, message_id: str):
+        """Remove a message from every folder, e.g. after it was moved"""
+        self._delete_rows("id = ?", (message_id,))
+        self.connection.commit()
+
+    def _row_to_message(self, row) -> Message:
+        """Rebuild a Graph Message from a stored row so existing formatters can be reused"""
+        return Message(
+            id=row["id"],
+            subject=row["subject"],
+            from_=Recipient(email_address=EmailAddress(name=row["sender_name"], address=row["sender_email"])),
+            to_recipients=_recipients_from_json(row["to_recipients"]),
+            cc_recipients=_recipients_from_json(row["cc_recipients"]),
+            bcc_recipients=_recipients_from_json(row["bcc_recipients"]),
+            reply_to=_recipients_from_json(row["reply_to"]),
+            received_date_time=datetime.fromisoformat(row["received_date_time"]) if row["received_date_time"] else None,
+            sent_date_time=datetime.fromisoformat(row["sent_date_time"]) if row["sent_date_time"] else None,
+            is_read=bool(row["is_read"]),
+            has_attachments=bool(row["has_attachments"]),
+            importance=Importance(row["importance"]) if row["importance"] else None,
+            conversation_id=row["conversation_id"],
+        )
+
+    def list_messages(self, folder_id: str, count: int = 50) -> List[Message]:
+        rows = self.connection.execute(
+            "SELECT * FROM messages WHERE folder_id = ? ORDER BY received_date_time DESC LIMIT ?",
+            (folder_id, count)).fetchall()
+        return [self._row_to_message(row) for row in rows]
+
+    def count_messages(self, folder_id: str) -> int:
+        row = self.connection.execute(
+            "SELECT COUNT(*) AS total FROM messages WHERE folder_id = ?", (folder_id,)).fetchone()
+        return int(row["total"])
+
+    def can_answer(self, query: MailQuery) -> bool:
+        """True if the query only uses fields the store holds and its folder has been synced"""
+        if query.include_nested_folders or not self.is_synced(query.folder_id):
+            return False
+        if query.kind is not None and query.kind.lower() not in _SUPPORTED_KINDS:
+            return False
+        # $search results are ranked by relevance whatever the ordering; otherwise the ordering must be reproducible
+        if not query.is_full_text_query() and _order_by_sql(query.orderby) is None:
+            return False
+        return all(getattr(query, field_name) is None for field_name in _UNSUPPORTED_QUERY_FIELDS)
+
+    def search(self, query: MailQuery, offset: int = 0) -> List[Message]:
+        """
+        Answer a MailQuery from local rows; callers should check can_answer first
+
+        Text fields are matched against the full-text index and ranked with bm25 (subject weighted highest);
+        queries without text fields are sorted the way Graph applies their $orderby.
+        """
+        clauses = ["m.folder_id = ?"]
+        params = [query.folder_id]
+        match_terms = []
+
+        def add_match(columns: List[str], value):
+            values = value if isinstance(value, list) else [value]
+            column_filter = "{" + " ".join(columns) + "}"
+            match_terms.append("(" + " OR ".join(f"{column_filter} : {_fts_phrase(item)}" for item in values) + ")")
+
+        def add_like(column: str, value):
+            # The index holds all recipients together; to/cc/bcc are told apart on the stored columns
+            values = value if isinstance(value, list) else [value]
+            clauses.append("(" + " OR ".join(f"m.{column} LIKE ?" for _ in values) + ")")
+            params.extend(f"%{item}%" for item in values)
+
+        if query.subject is not None:
+            add_match(["subject"], query.subject)
+        if query.body is not None:
+            add_match(["body"], query.body)
+        if query.from_email is not None:
+            add_match(["sender"], query.from_email)
+        if query.recipients is not None:
+            add_match(["recipients"], query.recipients)
+        if query.participants is not None:
+            add_match(["sender", "recipients"], query.participants)
+        if query.to_email is not None:
+            add_like("to_recipients", query.to_email)
+        if query.cc_email is not None:
+            add_like("cc_recipients", query.cc_email)
+        if query.bcc_email is not None:
+            add_like("bcc_recipients", query.bcc_email)
+
+        if query.received_after is not None:
+            clauses.append("m.received_date_time >= ?")
+            params.append(_sortable_datetime(query.received_after))
+        if query.received_before is not None:
+            clauses.append("m.received_date_time <= ?")
+            params.append(_sortable_datetime(query.received_before))
+        if query.sent_after is not None:
+            clauses.append("m.sent_date_time >= ?")
+            params.append(_sortable_datetime(query.sent_after))
+        if query.sent_before is not None:
+            clauses.append("m.sent_date_time <= ?")
+            params.append(_sortable_datetime(query.sent_before))
+
+        if query.has_attachments is not None:
+            clauses.append("m.has_attachments = ?")
+            params.append(int(query.has_attachments))
+        if query.is_read is not None:
+            clauses.append("m.is_read = ?")
+            params.append(int(query.is_read))
+        if query.importance is not None:
+            clauses.append("m.importance = ?")
+            params.append(query.graph_importance())
+        if query.kind is not None:
+            clauses.append("m.is_meeting = ?")
+            params.append(int(query.kind.lower() == 'meetings'))
+
+        if match_terms:
+            sql = ("SELECT m.* FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+                   f"WHERE messages_fts MATCH ? AND {' AND '.join(clauses)} "
+                   "ORDER BY bm25(messages_fts, 10.0, 4.0, 2.0, 1.0), m.received_date_time DESC LIMIT ? OFFSET ?")
+            params.insert(0, " AND ".join(match_terms))
+        else:
+            sql = (f"SELECT m.* FROM messages m WHERE {' AND '.join(clauses)} "
+                   f"ORDER BY {_order_by_sql(query.orderby)} LIMIT ? OFFSET ?")
+
+        params.extend([query.count, offset])
+        rows = self.connection.execute(sql, params).fetchall()
+        return [self._row_to_message(row) for row in rows]
@@ -1,7 +1,10 @@
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
 from datetime import datetime
 
+from mcpserver.body_normalizer import normalize_message_body
+
 
 @dataclass
 class MessageInfo:
@@ -20,8 +23,13 @@ class MessageInfo:
     importance: str = "normal"
     conversation_id: Optional[str] = None
 
-    def __init__(self, message):
-        """Initialize from a GraphController API message object"""
+    def __init__(self, message, clean_body: bool = False):
+        """Initialize from a GraphController API message object
+
+        Args:
+            message: Graph message
+            clean_body: If True, the body is converted to compact text without quoted history or signatures
+        """
         self.id = message.id
         self.subject = message.subject or "(No subject)"
         self.received_time = message.received_date_time if hasattr(message, 'received_date_time') else None
@@ -29,7 +37,7 @@ class MessageInfo:
         # Extract sender info
         self.sender_name = None
         self.sender_email = None
-        if hasattr(message, 'from') and message.from_ and message.from_.email_address:
+        if hasattr(message, 'from_') and message.from_ and message.from_.email_address:
             self.sender_name = message.from_.email_address.name
             self.sender_email = message.from_.email_address.address
 
@@ -58,7 +66,7 @@ class MessageInfo:
         # Extract body
         self.body = ""
         if hasattr(message, 'body') and message.body:
-            self.body = message.body.content or ""
+            self.body = normalize_message_body(message) if clean_body else (message.body.content or "")
 
         # Other properties
         self.is_read = message.is_read if hasattr(message, 'is_read') else False
@@ -91,8 +99,13 @@ class MessageInfo:
             "conversation_id": self.conversation_id
         }
 
-    def to_string(self):
-        """Format the message as a readable string"""
+    def to_string(self, max_body_length: Optional[int] = None, body_offset: int = 0):
+        """Format the message as a readable string
+
+        Args:
+            max_body_length: Maximum number of body characters to include (default: all)
+            body_offset: Character offset in the body to start from, for continuing a truncated body
+        """
         result = f"Subject: {self.subject}\n"
         result += f"From: {self.sender_name} <{self.sender_email}>\n" if self.sender_name and self.sender_email else ""
         result += f"Received: {self.received_time}\n" if self.received_time else ""
@@ -109,6 +122,112 @@ class MessageInfo:
             result += f"Has Attachments: Yes\n"
 
         result += f"Body:\n"
-        result += self.body
+        body_end = len(self.body) if max_body_length is None else min(len(self.body), body_offset + max_body_length)
+        result += self.body[body_offset:body_end]
+
+        if body_end < len(self.body):
+            result += (f"\n\n[Body truncated: showing characters {body_offset}-{body_end} of {len(self.body)}. "
+                       f"Call again with body_offset={body_end} to read more.]")
+
+        return result
+
+
+# (name, address) pair; identical pairs are shared between headers
+Address = Tuple[Optional[str], Optional[str]]
+
+_T = TypeVar("_T", bound=Hashable)
+
+
+class _InternPool(Generic[_T]):
+    """
+    Shares one copy of equal values, keeping the max_size most recently used so a long-running server does not
+    hold on to every correspondent it has seen; an evicted value is simply stored again on its next use
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._values: "OrderedDict[_T, _T]" = OrderedDict()
+
+    def intern(self, value: _T) -> _T:
+        shared = self._values.get(value)
+        if shared is not None:
+            self._values.move_to_end(value)
+            return shared
+        self._values[value] = value
+        if len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+_address_pool: _InternPool[Address] = _InternPool(max_size=20000)
+_address_list_pool: _InternPool[Tuple[Address, ...]] = _InternPool(max_size=5000)
+
+
+def _intern_address(email_address) -> Optional[Address]:
+    if email_address is None:
+        return None
+    return _address_pool.intern((email_address.name, email_address.address))
+
+
+def _intern_recipients(recipients) -> Tuple[Address, ...]:
+    if not recipients:
+        return ()
+    addresses = tuple(_intern_address(recipient.email_address) for recipient in recipients
+                      if recipient.email_address)
+    # Mailing lists repeat the same recipient list on every message; keep one copy
+    return _address_list_pool.intern(addresses)
+
+
+def format_address(address: Optional[Address]) -> str:
+    if address is None:
+        return "Unknown"
+    return f"{address[0] or 'Unknown'} <{address[1] or 'No email'}>"
+
+
+@dataclass(slots=True)
+class MessageHeader:
+    """
+    Compact header record for list views, caches and analytics.
+    Sender and recipient tuples are interned, so many headers from the same correspondents share memory.
+    """
+    id: str
+    subject: Optional[str] = None
+    sender: Optional[Address] = None
+    to_recipients: Tuple[Address, ...] = ()
+    cc_recipients: Tuple[Address, ...] = ()
+    bcc_recipients: Tuple[Address, ...] = ()
+    reply_to: Tuple[Address, ...] = ()
+    received_date_time: Optional[datetime] = None
+    sent_date_time: Optional[datetime] = None
+    is_read: bool = False
+    has_attachments: bool = False
+    importance: Optional[str] = None
+    conversation_id: Optional[str] = None
 
-        return result
\ No newline at end of file
+    @classmethod
+    def from_graph(cls, message) -> "MessageHeader":
+        """Build a header from a Graph message; properties that were not selected are left empty"""
+        return cls(
+            id=message.id,
+            subject=message.subject,
+            sender=_intern_address(message.from_.email_address) if message.from_ else None,
+            to_recipients=_intern_recipients(message.to_recipients),
+            cc_recipients=_intern_recipients(message.cc_recipients),
+            bcc_recipients=_intern_recipients(message.bcc_recipients),
+            reply_to=_intern_recipients(message.reply_to),
+            received_date_time=message.received_date_time,
+            sent_date_time=message.sent_date_time,
+            is_read=bool(message.is_read),
+            has_attachments=bool(message.has_attachments),
+            importance=message.importance.value if message.importance else None,
+            conversation_id=message.conversation_id,
+        )
+
+    @classmethod
+    def from_graph_page(cls, messages: Iterable) -> List["MessageHeader"]:
+        """Build headers for a whole page (or any iterable) of Graph messages"""
+        from_graph = cls.from_graph
+        return [from_graph(message) for message in messages or []]
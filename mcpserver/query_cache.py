@@ -0,0 +1,173 @@
+# mcpserver/query_cache.py
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from mcpserver.mail_query import MailQuery
+from mcpserver.message_info import MessageHeader
+from mcpserver.shared_cache import SharedCache
+
+
+# Free-text fields compare case-insensitively in both Graph and the local index
+_CASE_INSENSITIVE_FIELDS = {'subject', 'body', 'from_email', 'to_email', 'cc_email', 'bcc_email', 'participants',
+                            'recipients', 'attachment_name', 'importance', 'kind', 'orderby'}
+
+# Graph's well-known folder names are case-insensitive; folder IDs are case-sensitive base64 and kept as they are
+_WELL_KNOWN_FOLDERS = {'archive', 'clutter', 'conflicts', 'conversationhistory', 'deleteditems', 'drafts', 'inbox',
+                       'junkemail', 'localfailures', 'msgfolderroot', 'outbox', 'recoverableitemsdeletions',
+                       'scheduled', 'searchfolders', 'sentitems', 'serverfailures', 'syncissues'}
+
+
+def folder_key(folder_id: str) -> str:
+    """Folder identity for cache keys and invalidation"""
+    folder_id = folder_id.strip()
+    return folder_id.lower() if folder_id.lower() in _WELL_KNOWN_FOLDERS else folder_id
+
+
+def is_well_known_folder(folder_id: str) -> bool:
+    """Whether folder_id is a well-known folder name such as 'inbox' rather than a folder ID"""
+    return folder_id.strip().lower() in _WELL_KNOWN_FOLDERS
+
+
+def _normalize_value(name: str, value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        value = value.strip()
+        if name == 'folder_id':
+            return folder_key(value)
+        return value.lower() if name in _CASE_INSENSITIVE_FIELDS else value
+    if isinstance(value, (list, tuple)):
+        items = [_normalize_value(name, item) for item in value]
+        # Recipient lists are OR'd and select is a set; only orderby depends on element order
+        return items if name == 'orderby' else sorted(set(items), key=str)
+    return value
+
+
+def canonical_query_key(query: MailQuery, cursor: Optional[str] = None) -> str:
+    """Stable key for a query: field order, case, whitespace and list order do not matter"""
+    normalized = {}
+    for query_field in fields(query):
+        value = getattr(query, query_field.name)
+        if isinstance(value, (list, tuple)) and len(value) == 1 and query_field.name not in ('orderby', 'select'):
+            # A one-element recipient list means the same as the bare string
+            value = value[0]
+        normalized[query_field.name] = _normalize_value(query_field.name, value)
+    if isinstance(normalized['orderby'], list):
+        normalized['orderby'] = [" ".join(term.split()) for term in normalized['orderby']]
+    normalized['cursor'] = cursor
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+@dataclass(slots=True)
+class CachedSearch:
+    """Result rows of one search page, stored as compact headers rather than SDK objects"""
+    folder_id: str
+    all_folders: bool
+    query_fields: frozenset
+    rows: List[Tuple[MessageHeader, Optional[dict]]]
+    stored_at: float
+
+
+class QueryCache:
+    """
+    LRU cache of search result pages with a time-to-live, shared by every MailService of a GraphController.
+    Mutations invalidate the folders and messages they touch, so repeated searches while an agent reasons
+    never reach Graph, but never return results made stale by the agent's own changes.
+    With a SharedCache backend, pages and invalidations are shared by every server process.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 256, backend: Optional[SharedCache] = None,
+                 namespace: str = "me"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self.namespace = f"query:{namespace}"
+        self._entries: OrderedDict[str, CachedSearch] = OrderedDict()
+
+    def get(self, query: MailQuery, cursor: Optional[str] = None) -> Optional[List[Tuple[MessageHeader, Optional[dict]]]]:
+        """Return the cached rows for a query page, or None on a miss or expired entry"""
+        if self.ttl <= 0:
+            return None
+        key = canonical_query_key(query, cursor)
+        if self.backend is not None:
+            entry = self.backend.get(self.namespace, key)
+            return entry.rows if entry is not None else None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry.rows
+
+    def set(self, query: MailQuery, cursor: Optional[str], rows: List[Tuple[MessageHeader, Optional[dict]]]):
+        if self.ttl <= 0:
+            return
+        key = canonical_query_key(query, cursor)
+        used_fields = frozenset(query_field.name for query_field in fields(query)
+                                if getattr(query, query_field.name) is not None)
+        entry = CachedSearch(
+            folder_id=folder_key(query.folder_id),
+            all_folders=query.include_nested_folders,
+            query_fields=used_fields,
+            rows=rows,
+            stored_at=time.monotonic(),
+        )
+        if self.backend is not None:
+            # Invalidation scans the metadata, so it never has to unpickle the rows
+            meta = {"folder_id": entry.folder_id, "all_folders": entry.all_folders,
+                    "query_fields": sorted(used_fields), "message_ids": [header.id for header, _ in rows]}
+            self.backend.set(self.namespace, key, entry, self.ttl, meta=meta)
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, folder_ids: Iterable[str] = (), message_ids: Iterable[str] = (),
+                   query_fields: Iterable[str] = ()):
+        """
+        Drop cached pages affected by a mutation
+
+        Args:
+            folder_ids: Folders whose contents changed (IDs or well-known names); cross-folder searches are dropped too
+            message_ids: Messages that changed; any page containing them is dropped
+            query_fields: MailQuery fields whose matching set may have changed (e.g. is_read after marking read)
+        """
+        folder_ids = {folder_key(folder_id) for folder_id in folder_ids if folder_id}
+        message_ids = set(message_ids)
+        query_fields = set(query_fields)
+
+        def affected(folder_id: str, all_folders: bool, entry_fields: Iterable[str], entry_message_ids) -> bool:
+            if folder_ids and (all_folders or folder_id in folder_ids):
+                return True
+            if query_fields.intersection(entry_fields):
+                return True
+            return bool(message_ids) and any(message_id in message_ids for message_id in entry_message_ids)
+
+        if self.backend is not None:
+            self.backend.delete(self.namespace, [
+                key for key, meta in self.backend.entries(self.namespace)
+                if affected(meta["folder_id"], meta["all_folders"], meta["query_fields"], meta["message_ids"])])
+            return
+
+        for key in [key for key, entry in self._entries.items()
+                    if affected(entry.folder_id, entry.all_folders, entry.query_fields,
+                                (header.id for header, _ in entry.rows))]:
+            del self._entries[key]
+
+    def folder_ids(self) -> set:
+        """Folder keys of the cached single-folder pages"""
+        if self.backend is not None:
+            return {meta["folder_id"] for _, meta in self.backend.entries(self.namespace) if not meta["all_folders"]}
+        return {entry.folder_id for entry in self._entries.values() if not entry.all_folders}
+
+    def clear(self):
+        self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear(self.namespace)
@@ -0,0 +1,114 @@
+# mcpserver/rendering.py
+import json
+from typing import Iterable, List, Optional
+
+from mcpserver.calendar_formatting import format_calendar_event
+from mcpserver.message_info import MessageHeader, format_address
+
+
+# verbose: the multi-line layout the tools have always used
+# compact: one pipe-separated row per item, roughly a quarter of the size
+# json: a JSON array, for callers that post-process results
+OUTPUT_FORMATS = ("verbose", "compact", "json")
+
+_HEADER_COLUMNS = "# | Received | Read | From | Subject | Message ID"
+_EVENT_COLUMNS = "# | Start | End | Subject | Location | Event ID"
+
+
+def check_output_format(output_format: str) -> Optional[str]:
+    """Return an error message for an unknown output format, or None if it is valid"""
+    if output_format not in OUTPUT_FORMATS:
+        return f"Error: output_format must be one of {', '.join(OUTPUT_FORMATS)}"
+    return None
+
+
+def _compact_cell(value) -> str:
+    return str(value if value is not None else "").replace("|", "/").replace("\n", " ")
+
+
+def join_rows(rows: List[str], output_format: str, kind: str = "headers", empty_message: str = "") -> str:
+    """Assemble rendered rows into the final output with a single join"""
+    if output_format == "json":
+        return "[" + ",".join(rows) + "]"
+    if not rows:
+        return empty_message
+    if output_format == "compact":
+        columns = _EVENT_COLUMNS if kind == "events" else _HEADER_COLUMNS
+        return columns + "\n" + "\n".join(rows) + "\n"
+    return "".join(rows)
+
+
+def render_header_row(index: int, header: MessageHeader, output_format: str = "verbose") -> str:
+    """Render one message header as a row in the requested format"""
+    if output_format == "compact":
+        received = header.received_date_time.strftime("%Y-%m-%d %H:%M") if header.received_date_time else ""
+        sender = header.sender[1] or header.sender[0] if header.sender else "Unknown"
+        return " | ".join([str(index), received, "Y" if header.is_read else "N",
+                           _compact_cell(sender), _compact_cell(header.subject), header.id])
+
+    if output_format == "json":
+        return json.dumps({
+            "id": header.id,
+            "subject": header.subject,
+            "from": format_address(header.sender) if header.sender else None,
+            "to": [format_address(address) for address in header.to_recipients],
+            "cc": [format_address(address) for address in header.cc_recipients],
+            "received": header.received_date_time.isoformat() if header.received_date_time else None,
+            "is_read": header.is_read,
+            "has_attachments": header.has_attachments,
+            "importance": header.importance,
+        }, separators=(",", ":"))
+
+    lines = [f"{index}. Subject: {header.subject}\n",
+             f"   From: {format_address(header.sender)}\n"]
+    for label, addresses in (("To", header.to_recipients), ("Reply-To", header.reply_to),
+                             ("CC", header.cc_recipients), ("BCC", header.bcc_recipients)):
+        if addresses:
+            lines.append(f"   {label}: {', '.join(format_address(address) for address in addresses)}\n")
+    lines.append(f"   Status: {'Read' if header.is_read else 'Unread'}\n")
+    lines.append(f"   Received: {header.received_date_time}\n")
+    lines.append(f"   Message ID: {header.id}\n\n")
+    return "".join(lines)
+
+
+def render_headers(messages: Iterable, output_format: str = "verbose",
+                   empty_message: str = "No messages found in the folder.") -> str:
+    """Render a page of Graph messages as headers"""
+    rows = [render_header_row(index, header, output_format)
+            for index, header in enumerate(MessageHeader.from_graph_page(messages), 1)]
+    return join_rows(rows, output_format, empty_message=empty_message)
+
+
+def render_event_row(index: int, event, output_format: str = "verbose") -> str:
+    """Render one calendar event as a row in the requested format"""
+    if output_format == "verbose":
+        return f"{index}. {format_calendar_event(event)}\n"
+
+    start = event.start.date_time if event.start else None
+    end = event.end.date_time if event.end else None
+    location = event.location.display_name if event.location else None
+
+    if output_format == "compact":
+        return " | ".join([str(index), _compact_cell(start), _compact_cell(end), _compact_cell(event.subject),
+                           _compact_cell(location), event.id])
+
+    organizer = None
+    if event.organizer and event.organizer.email_address:
+        organizer = format_address((event.organizer.email_address.name, event.organizer.email_address.address))
+    return json.dumps({
+        "id": event.id,
+        "subject": event.subject,
+        "organizer": organizer,
+        "start": start,
+        "end": end,
+        "time_zone": event.start.time_zone if event.start else None,
+        "location": location,
+        "online_meeting_url": event.online_meeting_url if event.is_online_meeting else None,
+        "attendees": len(event.attendees or []),
+    }, separators=(",", ":"))
+
+
+def render_events(events: Iterable, output_format: str = "verbose", empty_message: str = "No events found.") -> str:
+    """Render a page of calendar events"""
+    rows = [render_event_row(index, event, output_format) for index, event in enumerate(events or [], 1)]
+    return join_rows(rows, output_format, kind="events", empty_message=empty_message)
@@ -0,0 +1,101 @@
+# mcpserver/shared_cache.py
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    meta TEXT,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expires_at);
+"""
+
+
+class SharedCache:
+    """
+    Cache entries in a SQLite file in WAL mode, so several server processes (e.g. HTTP workers) see one cache:
+    a folder tree loaded or a search answered by one worker is served by all of them, and an invalidation in
+    one worker takes effect in all of them.
+
+    Values are pickled and only ever read back by this server; entries are grouped by namespace (one per mailbox).
+    """
+
+    def __init__(self, db_path: Path, timeout: float = 5.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=False,
+                                          isolation_level=None)
+        # WAL lets readers in every worker proceed while one worker writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the value for a key, or None if missing or expired"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def get_meta(self, namespace: str, key: str) -> Optional[dict]:
+        """Return the meta stored with a key without unpickling its value ({} if it has none), or None if missing"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT meta FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]) if row[0] else {}
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float, meta: Optional[dict] = None):
+        """
+        Store a value for ttl seconds
+
+        Args:
+            namespace: Entry group, e.g. the mailbox
+            key: Entry key within the namespace
+            value: Picklable value
+            ttl: Seconds until the entry expires
+            meta: JSON-serializable data inspected by entries() without unpickling values, e.g. for invalidation
+        """
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, meta, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                 json.dumps(meta) if meta is not None else None, now + ttl))
+            self.connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def entries(self, namespace: str) -> Iterator[Tuple[str, Optional[dict]]]:
+        """Yield (key, meta) for the unexpired entries of a namespace"""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT key, meta FROM entries WHERE namespace = ? AND expires_at > ?",
+                (namespace, time.time())).fetchall()
+        for key, meta in rows:
+            yield key, json.loads(meta) if meta else None
+
+    def delete(self, namespace: str, keys: Iterable[str]):
+        keys = [(namespace, key) for key in keys]
+        if not keys:
+            return
+        with self._lock:
+            self.connection.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", keys)
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self.connection.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
@@ -0,0 +1,218 @@
+# mcpserver/throttling.py
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import httpx
+from kiota_http.middleware.middleware import BaseMiddleware
+
+# Exchange Online allows 10,000 requests per 10 minutes and 4 concurrent requests per app and mailbox
+MAILBOX_REQUESTS_PER_SECOND = 10000 / 600
+MAILBOX_BURST = 100
+MAILBOX_CONCURRENCY = 4
+
+RETRY_STATUS_CODES = {429, 503, 504}
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Hosts whose requests count against mailbox budgets; pre-authenticated upload and download URLs do not
+GRAPH_HOSTS = {"graph.microsoft.com"}
+
+# Buckets kept for mailboxes seen recently
+_MAX_TRACKED_MAILBOXES = 1024
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry number attempt (starting at 0)
+
+    Retry-After from the server wins; otherwise exponential backoff with full jitter, so clients throttled at
+    the same moment do not retry in lockstep.
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mailbox_from_path(path: str) -> str:
+    """Mailbox a Graph path acts on: the {id} of /users/{id}/..., else the signed-in user"""
+    parts = [part for part in path.split("/") if part]
+    if len(parts) >= 3 and parts[0] == "v1.0":
+        parts = parts[1:]
+    if len(parts) >= 2 and parts[0] == "users" and parts[1] != "me-token-to-replace":
+        return unquote(parts[1]).lower()
+    return "me"
+
+
+def throttling_handler(client: httpx.AsyncClient) -> Optional["ThrottlingHandler"]:
+    """The ThrottlingHandler in a client's Graph middleware pipeline, if it has one"""
+    pipeline = getattr(getattr(client, "_transport", None), "pipeline", None)
+    middleware = getattr(pipeline, "_first_middleware", None)
+    while middleware is not None:
+        if isinstance(middleware, ThrottlingHandler):
+            return middleware
+        middleware = middleware.next
+    return None
+
+
+async def send_with_retry(client: httpx.AsyncClient, request: httpx.Request, stream: bool = False) -> httpx.Response:
+    """
+    Send a request that bypasses the Graph middleware (e.g. to a pre-authenticated download or upload URL),
+    retrying 429, 503 and 504 like ThrottlingHandler does
+
+    Args:
+        client: The shared httpx client
+        request: Request with a buffered body
+        stream: Leave the response body unread, as with client.stream
+
+    Returns:
+        The first response that is not retried
+    """
+    handler = throttling_handler(client)
+    max_retries = handler.max_retries if handler is not None else DEFAULT_MAX_RETRIES
+    attempt = 0
+    while True:
+        response = await client.send(request, stream=stream)
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+            return response
+        delay = backoff_delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+        logging.info(f"{request.url.host} returned {response.status_code} for {request.method}; "
+                     f"retrying in {delay:.1f}s")
+        await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens per second up to capacity; pause() holds every caller back"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    async def acquire(self, cost: float = 1.0):
+        cost = min(cost, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = self.blocked_until - now
+            if wait <= 0:
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait = (cost - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for seconds, e.g. after Graph answered 429 with Retry-After"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class ThrottlingHandler(BaseMiddleware):
+    """
+    Middleware replacing the SDK's RetryHandler.
+
+    Before sending, each Graph request takes tokens from its mailbox's bucket (a $batch takes one per inner
+    request) and a slot of the mailbox's concurrency limit, so bulk operations run at the rate Exchange allows
+    instead of running into 429s. Responses with 429, 503 or 504 are retried after Retry-After, or after
+    jittered exponential backoff, and a 429 pauses the whole mailbox for that time.
+
+    The pipeline only runs for requests built by the SDK's request adapter; raw requests on the shared client
+    (pre-authenticated URLs) use send_with_retry instead.
+    """
+
+    def __init__(self, requests_per_second: float = MAILBOX_REQUESTS_PER_SECOND, burst: float = MAILBOX_BURST,
+                 concurrency: int = MAILBOX_CONCURRENCY, max_retries: int = DEFAULT_MAX_RETRIES):
+        super().__init__()
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._mailboxes: OrderedDict[str, Tuple[TokenBucket, asyncio.Semaphore]] = OrderedDict()
+
+    def _limits(self, mailbox: str) -> Tuple[TokenBucket, asyncio.Semaphore]:
+        limits = self._mailboxes.get(mailbox)
+        if limits is None:
+            limits = (TokenBucket(self.requests_per_second, self.burst), asyncio.Semaphore(self.concurrency))
+            self._mailboxes[mailbox] = limits
+            if len(self._mailboxes) > _MAX_TRACKED_MAILBOXES:
+                self._mailboxes.popitem(last=False)
+        self._mailboxes.move_to_end(mailbox)
+        return limits
+
+    @staticmethod
+    def _budget(request: httpx.Request, body: Optional[bytes]) -> Tuple[str, int]:
+        """Mailbox and number of Exchange requests a Graph request stands for"""
+        path = request.url.path
+        if path.rstrip("/").endswith("$batch") and body:
+            try:
+                inner = json.loads(body).get("requests", [])
+            except ValueError:
+                inner = []
+            if inner:
+                return _mailbox_from_path(urlparse(inner[0].get("url", "")).path), len(inner)
+        return _mailbox_from_path(path), 1
+
+    async def send(self, request: httpx.Request, transport: httpx.AsyncBaseTransport):
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            # Streamed bodies cannot be sent twice
+            body = None
+        retryable = body is not None or request.method in ("GET", "HEAD", "DELETE")
+
+        limits = None
+        cost = 1
+        if request.url.host in GRAPH_HOSTS:
+            mailbox, cost = self._budget(request, body)
+            limits = self._limits(mailbox)
+
+        attempt = 0
+        while True:
+            if limits is not None:
+                bucket, semaphore = limits
+                await bucket.acquire(cost)
+                async with semaphore:
+                    response = await super().send(request, transport)
+            else:
+                response = await super().send(request, transport)
+
+            if response.status_code not in RETRY_STATUS_CODES or not retryable or attempt >= self.max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            delay = backoff_delay(attempt, retry_after)
+            if response.status_code == 429 and limits is not None:
+                limits[0].pause(delay)
+            logging.info(f"Graph returned {response.status_code} for {request.method} {request.url.path}; "
+                         f"retrying in {delay:.1f}s")
+            # Release the discarded response's connection before waiting
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
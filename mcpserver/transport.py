@@ -0,0 +1,87 @@
+# mcpserver/transport.py
+import logging
+from typing import List, Optional
+
+import httpx
+from kiota_authentication_azure.azure_identity_authentication_provider import AzureIdentityAuthenticationProvider
+from kiota_http.kiota_client_factory import KiotaClientFactory
+from kiota_http.middleware import RetryHandler
+from msgraph import GraphRequestAdapter, GraphServiceClient
+from msgraph.graph_request_adapter import options as GRAPH_MIDDLEWARE_OPTIONS
+from msgraph_core import GraphClientFactory
+from msgraph_core._constants import DEFAULT_CONNECTION_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+from msgraph_core.middleware import GraphTelemetryHandler
+from msgraph_core.middleware.options import GraphTelemetryHandlerOption
+
+from mcpserver.throttling import (ThrottlingHandler, DEFAULT_MAX_RETRIES, MAILBOX_BURST, MAILBOX_CONCURRENCY,
+                                  MAILBOX_REQUESTS_PER_SECOND)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+
+def create_http_client(max_connections: int = 100,
+                       max_keepalive_connections: int = 20,
+                       keepalive_expiry: float = 30.0,
+                       http2: bool = True,
+                       mailbox_rate: float = MAILBOX_REQUESTS_PER_SECOND,
+                       mailbox_burst: float = MAILBOX_BURST,
+                       mailbox_concurrency: int = MAILBOX_CONCURRENCY,
+                       max_retries: int = DEFAULT_MAX_RETRIES) -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client shared by every GraphServiceClient and raw Graph request
+
+    Connections (and their TLS sessions) are reused across tool calls and across re-authentication,
+    and with HTTP/2 concurrent requests are multiplexed over one connection per host.
+
+    Args:
+        max_connections: Maximum number of open connections
+        max_keepalive_connections: Maximum number of idle connections kept open
+        keepalive_expiry: Seconds an idle connection is kept open
+        http2: Negotiate HTTP/2 where the server supports it
+        mailbox_rate: Graph requests per second allowed per mailbox
+        mailbox_burst: Requests a mailbox may send at once after being idle
+        mailbox_concurrency: Graph requests in flight per mailbox
+        max_retries: Times a throttled (429) or unavailable (503, 504) request is retried
+
+    Returns:
+        An httpx.AsyncClient with the Graph SDK's default middleware (redirect, compression, telemetry), its
+        RetryHandler replaced by a ThrottlingHandler that also paces requests per mailbox
+    """
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_keepalive_connections,
+                          keepalive_expiry=keepalive_expiry)
+    timeout = httpx.Timeout(DEFAULT_REQUEST_TIMEOUT, connect=DEFAULT_CONNECTION_TIMEOUT)
+    client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2, base_url=GRAPH_BASE_URL)
+    logging.info(f"Created shared HTTP client (http2={http2}, max_connections={max_connections})")
+    throttling = ThrottlingHandler(requests_per_second=mailbox_rate, burst=mailbox_burst,
+                                   concurrency=mailbox_concurrency, max_retries=max_retries)
+    # The SDK's own options rewrite /users/me-token-to-replace to /me and tag telemetry with the SDK version
+    middleware = [throttling if isinstance(handler, RetryHandler) else handler
+                  for handler in KiotaClientFactory.get_default_middleware(GRAPH_MIDDLEWARE_OPTIONS)]
+    telemetry_option = GRAPH_MIDDLEWARE_OPTIONS.get(GraphTelemetryHandlerOption().get_key())
+    middleware.append(GraphTelemetryHandler(options=telemetry_option) if telemetry_option
+                      else GraphTelemetryHandler())
+    return GraphClientFactory.create_with_custom_middleware(middleware, client=client)
+
+
+def create_graph_client(credential,
+                        scopes: Optional[List[str]] = None,
+                        http_client: Optional[httpx.AsyncClient] = None) -> GraphServiceClient:
+    """
+    Create a GraphServiceClient for a credential, sending its requests through http_client
+
+    Args:
+        credential: Azure identity credential
+        scopes: Graph scopes to request tokens for
+        http_client: Shared client from create_http_client; without it the SDK creates its own transport
+
+    Returns:
+        GraphServiceClient
+    """
+    if http_client is None:
+        return GraphServiceClient(credentials=credential, scopes=scopes)
+    if scopes:
+        auth_provider = AzureIdentityAuthenticationProvider(credential, scopes=scopes)
+    else:
+        auth_provider = AzureIdentityAuthenticationProvider(credential)
+    return GraphServiceClient(request_adapter=GraphRequestAdapter(auth_provider, client=http_client))
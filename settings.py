@@ -1,13 +1,26 @@
+import asyncio
 import os
-from azure.identity import DeviceCodeCredential, TokenCachePersistenceOptions, AuthenticationRecord
+from azure.identity import (DeviceCodeCredential, TokenCachePersistenceOptions, AuthenticationRecord,
+                            ClientSecretCredential, CertificateCredential)
 from msgraph import GraphServiceClient
+from mcpserver.transport import create_graph_client
+from mcpserver.credential import AsyncCachedCredential
 import logging
+import tempfile
 from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Seconds a tool call waits for Azure to issue a device code before giving up
+AUTH_PROMPT_TIMEOUT = 30.0
+
+# Application permissions are granted to the app registration as a whole and requested with .default
+APP_ONLY_SCOPES = ["https://graph.microsoft.com/.default"]
+
+AUTH_MODES = ("device_code", "app")
+
 class AzureSettings:
     """
     Manages authentication with Azure GraphController API
@@ -15,14 +28,31 @@ class AzureSettings:
     Stores authentication record in auth_cache directory (creates directory if needed)
     Claude Desktop can't trigger interactive authentication challenges (e.g. in browser)
     Azure's DeviceCodeCredential allows authentication challenge (url, code) via text that Claude can serve to user
+    With AZURE_AUTH_MODE=app the server authenticates as the application itself (client secret or certificate),
+    needs no user interaction, and acts on any mailbox the app has been granted, addressed as users/{id}
     """
     def __init__(self):
         # Load configuration from environment variables
         self.client_id = os.getenv("AZURE_CLIENT_ID")
         self.tenant_id = os.getenv("AZURE_TENANT_ID")
         self.client_secret = os.getenv("AZURE_CLIENT_SECRET")
+        self.client_certificate_path = os.getenv("AZURE_CLIENT_CERTIFICATE_PATH")
+        self.client_certificate_password = os.getenv("AZURE_CLIENT_CERTIFICATE_PASSWORD")
+        self.auth_mode = os.getenv("AZURE_AUTH_MODE", "device_code").lower()
+        # Mailbox (user ID or UPN) tools act on when a call does not name one; required in app mode
+        self.mailbox_id = os.getenv("AZURE_MAILBOX_ID") or None
+        # Mailboxes a request may select with the X-Mailbox header (lowercase); none unless configured
+        self.allowed_mailboxes = frozenset(
+            mailbox.strip().lower() for mailbox in os.getenv("AZURE_ALLOWED_MAILBOXES", "").split(",") if mailbox.strip())
         self.scopes = self._get_scopes()
 
+        if self.auth_mode not in AUTH_MODES:
+            raise ValueError(f"AZURE_AUTH_MODE must be one of {', '.join(AUTH_MODES)}")
+        if self.app_only:
+            if not self.client_secret and not self.client_certificate_path:
+                raise ValueError("AZURE_AUTH_MODE=app requires AZURE_CLIENT_SECRET or AZURE_CLIENT_CERTIFICATE_PATH in .env")
+            self.scopes = APP_ONLY_SCOPES
+
         # Create .env file with these values if it doesn't exist
         if not self.client_id or not self.tenant_id or not self.scopes:
             raise ValueError("Missing one of AZURE_CLIENT_ID, AZURE_TENANT_ID, or AZURE_GRAPH_SCOPES in .env")
@@ -36,12 +66,88 @@ class AzureSettings:
         self.auth_cache_dir = Path(__file__).parent / "auth_cache"
         self.auth_record_path = self.auth_cache_dir / "auth_record.json"
 
-        # Authentication state
+        # Optional local mail store, kept in sync with Graph delta queries
+        self.local_store_enabled = os.getenv("OUTLOOK_MCP_LOCAL_STORE", "false").lower() in ("1", "true", "yes")
+        self.local_store_path = self.auth_cache_dir / "mail_store.db"
+        self.local_store_sync_interval = float(os.getenv("OUTLOOK_MCP_STORE_SYNC_INTERVAL", "30"))
+
+        # Seconds the mail folder tree is cached before it is reloaded from Graph
+        self.folder_cache_ttl = float(os.getenv("OUTLOOK_MCP_FOLDER_CACHE_TTL", "300"))
+
+        # Seconds identical mail searches are served from memory; 0 disables the query cache
+        self.query_cache_ttl = float(os.getenv("OUTLOOK_MCP_QUERY_CACHE_TTL", "60"))
+
+        # Downloaded attachments are kept content-addressed in a bounded directory
+        self.attachment_cache_dir = Path(os.getenv("OUTLOOK_MCP_ATTACHMENT_DIR",
+                                                   Path(tempfile.gettempdir()) / "outlook_mcp_attachments"))
+        self.attachment_cache_max_bytes = int(float(os.getenv("OUTLOOK_MCP_ATTACHMENT_CACHE_MB", "1024")) * 1024 * 1024)
+
+        # Connection pool shared by all Graph traffic; http2 can be turned off for proxies that mishandle it
+        self.http_max_connections = int(os.getenv("OUTLOOK_MCP_HTTP_MAX_CONNECTIONS", "100"))
+        self.http_max_keepalive = int(os.getenv("OUTLOOK_MCP_HTTP_MAX_KEEPALIVE", "20"))
+        self.http_keepalive_expiry = float(os.getenv("OUTLOOK_MCP_HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http2_enabled = os.getenv("OUTLOOK_MCP_HTTP2", "true").lower() in ("1", "true", "yes")
+
+        # Graph budget per mailbox, sized to Exchange's limits of 10,000 requests per 10 minutes and 4 concurrent
+        # requests; HTTP workers are separate processes, so each gets its share
+        workers = max(1, int(os.getenv("OUTLOOK_MCP_WORKERS", "1")))
+        self.mailbox_rate = float(os.getenv("OUTLOOK_MCP_MAILBOX_REQUESTS_PER_10MIN", "10000")) / 600 / workers
+        self.mailbox_burst = float(os.getenv("OUTLOOK_MCP_MAILBOX_BURST", "100")) / workers
+        mailbox_concurrency = int(os.getenv("OUTLOOK_MCP_MAILBOX_CONCURRENCY", "4"))
+        self.mailbox_concurrency = max(1, mailbox_concurrency // workers)
+        if workers > mailbox_concurrency:
+            # Every worker needs at least one slot, so together they can exceed the per-mailbox limit
+            logging.warning(f"{workers} workers allow up to {workers} concurrent requests per mailbox, more than "
+                            f"OUTLOOK_MCP_MAILBOX_CONCURRENCY={mailbox_concurrency}; Graph may answer the excess "
+                            f"with 429 (retried). Use at most {mailbox_concurrency} workers to stay within it")
+        self.max_retries = int(os.getenv("OUTLOOK_MCP_MAX_RETRIES", "5"))
+
+        # SQLite file (WAL) holding folder trees and search pages for all server processes; unset keeps them in memory
+        shared_cache = os.getenv("OUTLOOK_MCP_SHARED_CACHE", "").strip()
+        if shared_cache.lower() in ("1", "true", "yes"):
+            self.shared_cache_path = self.auth_cache_dir / "shared_cache.db"
+        elif shared_cache.lower() in ("", "0", "false", "no"):
+            self.shared_cache_path = None
+        else:
+            self.shared_cache_path = Path(shared_cache)
+
+        # Accounts (mailboxes) whose clients and services stay in memory, and seconds an idle one is kept
+        self.max_accounts = int(os.getenv("OUTLOOK_MCP_MAX_ACCOUNTS", "256"))
+        self.account_idle_timeout = float(os.getenv("OUTLOOK_MCP_ACCOUNT_IDLE_TIMEOUT", "1800"))
+
+        # Authentication state; Graph clients use async_credential, which wraps credential
         self.credential = None
+        self.async_credential = None
+        # The pending device code flow, shared by every caller until it finishes
+        self._auth_flow: Optional[asyncio.Task] = None
+        self._auth_prompted: Optional[asyncio.Event] = None
+        self._auth_info = {"url": None, "code": None}
         self.user_client = None
+        # Shared httpx client owned by GraphController; set in app_lifespan before any client is created
+        self.http_client = None
         logging.info("AzureSettings initialized")
         # Configure cache options
 
+    @property
+    def app_only(self) -> bool:
+        """True when authenticating as the application rather than as a signed-in user"""
+        return self.auth_mode == "app"
+
+    def _create_app_credential(self):
+        """Client credential for app-only mode; a certificate takes precedence over a secret"""
+        if self.client_certificate_path:
+            return CertificateCredential(
+                tenant_id=self.tenant_id,
+                client_id=self.client_id,
+                certificate_path=self.client_certificate_path,
+                password=self.client_certificate_password
+            )
+        return ClientSecretCredential(
+            tenant_id=self.tenant_id,
+            client_id=self.client_id,
+            client_secret=self.client_secret
+        )
+
     def _get_scopes(self):
         """Ensures scopes from environment variable are valid and split into a list of strings"""
         raw_scopes = os.getenv("AZURE_GRAPH_SCOPES", "")
@@ -50,6 +156,35 @@ class AzureSettings:
         scopes = raw_scopes.strip().split()
         return scopes
 
+    def _install_credential(self, credential) -> GraphServiceClient:
+        """
+        Build a GraphServiceClient for credential and swap credential and client in together,
+        so no caller ever sees a client without its credential
+        """
+        # Token acquisition never blocks the event loop
+        async_credential = AsyncCachedCredential(credential)
+        user_client = create_graph_client(async_credential, self.scopes, self.http_client)
+        previous = self.async_credential
+        self.credential, self.async_credential, self.user_client = credential, async_credential, user_client
+        if previous is not None:
+            previous.clear()
+        return user_client
+
+    def create_mailbox_client(self, mailbox_id: Optional[str] = None) -> GraphServiceClient:
+        """
+        Create a GraphServiceClient for one account of the controller's pool
+
+        It shares the current credential (and so its token cache) and the HTTP transport with every other client.
+        """
+        if self.async_credential is None:
+            return self.user_client
+        return create_graph_client(self.async_credential, self.scopes, self.http_client)
+
+    async def close(self):
+        """Stop background token refreshes and release the credential"""
+        if self.async_credential is not None:
+            await self.async_credential.close()
+
     def get_client_from_silent_auth(self):
         """Fetch existing credential, return None if not found
         """
@@ -67,90 +202,90 @@ class AzureSettings:
 
 
             # Create credential with the authentication record (silent auth)
-            self.credential = DeviceCodeCredential(
+            credential = DeviceCodeCredential(
                 client_id=self.client_id,
                 tenant_id=self.tenant_id,
                 cache_persistence_options=self.cache_options,
                 authentication_record=auth_record
             )
 
-
-            self.user_client = GraphServiceClient(
-                credentials=self.credential,
-                scopes=self.scopes
-            )
+            self._install_credential(credential)
             logging.info("Loaded existing authentication record")
             return self.user_client
         except Exception as e:
             logging.error(f"Error loading existing authentication record: {str(e)}")
             return None
 
-    def get_auth_instructions(self):
-        """Return authentication instructions from Azure, to bot, for the user to auth in browser"""
-        logging.info("Starting interactive authentication")
-        auth_info = {"url": None, "code": None}
+    async def get_auth_instructions(self) -> Optional[str]:
+        """
+        Start the device code flow, or join the one already pending, and return its instructions for the user
 
-        # Takes the auth_info dict from the outer scope so, when called by authenticate, we can access the dict values
-        def prompt_callback(url, code, expiration=None, *args, **kwargs):
-            auth_info["url"] = url
-            auth_info["code"] = code
-            logging.info(f"Got device code: URL={url}, code={code}, expires={expiration}")
-            return None
+        Only one flow runs at a time: concurrent callers wait on the same flow's prompt instead of each
+        starting their own. The flow keeps running in the background until the user completes it in the
+        browser, then swaps in the new client.
 
-        # Create the credential
-        self.credential = DeviceCodeCredential(
-            client_id=self.client_id,
-            tenant_id=self.tenant_id,
-            cache_persistence_options=self.cache_options,
-            prompt_callback=prompt_callback
-        )
+        Returns:
+            Instructions with the URL and code, or None if authentication has already completed
+        """
+        if self._auth_flow is None or self._auth_flow.done():
+            logging.info("Starting interactive authentication")
+            self._auth_info = {"url": None, "code": None}
+            self._auth_prompted = asyncio.Event()
+            self._auth_flow = asyncio.create_task(self._run_device_code_flow(self._auth_prompted))
+        else:
+            logging.info("Joining pending interactive authentication")
 
-        # Just trigger the callback - don't wait for auth to complete
-        import threading
-
-        # The callback will execute immediately in the thread, giving us access to auth flow strings
-        # Main thread: returns auth instructions to bot
-        # Auth thread: waits for user to complete auth in browser, saves auth record, creates client
-        # If success, user can retry their request without having to reauthenticate
-        def auth_thread():
-            try:
-                # This will call prompt_callback immediately and then block waiting for auth
-                auth_record = self.credential.authenticate(scopes=self.scopes)
-
-                # If we get here, user completed auth - save the record
-                with open(self.auth_record_path, "w") as file:
-                    file.write(auth_record.serialize())
-                logging.info(f"Authentication succeeded, record saved to {self.auth_record_path}")
-
-                # Create the client
-                self.user_client = GraphServiceClient(
-                    credentials=self.credential,
-                    scopes=self.scopes
-                )
-            except Exception as e:
-                logging.info(f"Auth thread: {str(e)}")
-
-        # Start in background thread
-        t = threading.Thread(target=auth_thread)
-        t.daemon = True
-        t.start()
-
-        # Wait briefly for callback
-        import time
-        time.sleep(2)
+        flow = self._auth_flow
+        prompted = asyncio.create_task(self._auth_prompted.wait())
+        await asyncio.wait({prompted, flow}, timeout=AUTH_PROMPT_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+        prompted.cancel()
+
+        if flow.done() and not flow.cancelled() and flow.exception() is None:
+            # The credential found a usable token without prompting
+            return None
 
         # Return auth instructions
-        if auth_info["url"] and auth_info["code"]:
+        if self._auth_info["url"] and self._auth_info["code"]:
             return f"""
     Please authenticate this application in browser.
 
-    1. Visit this URL: {auth_info['url']}
-    2. Enter the code: {auth_info['code']}
+    1. Visit this URL: {self._auth_info['url']}
+    2. Enter the code: {self._auth_info['code']}
 
     After authenticating, please retry your request.
     """
-        else:
-            return "Failed to get authentication code. Please try again."
+        if flow.done() and not flow.cancelled():
+            return f"Authentication failed: {str(flow.exception())}. Please try again."
+        return "Failed to get authentication code. Please try again."
+
+    async def _run_device_code_flow(self, prompted: asyncio.Event):
+        """Run DeviceCodeCredential.authenticate in a worker thread, then save the record and install the client"""
+        loop = asyncio.get_running_loop()
+
+        # Called from the worker thread as soon as Azure issues the code
+        def prompt_callback(url, code, expiration=None, *args, **kwargs):
+            self._auth_info["url"] = url
+            self._auth_info["code"] = code
+            logging.info(f"Got device code: URL={url}, code={code}, expires={expiration}")
+            loop.call_soon_threadsafe(prompted.set)
+
+        credential = DeviceCodeCredential(
+            client_id=self.client_id,
+            tenant_id=self.tenant_id,
+            cache_persistence_options=self.cache_options,
+            prompt_callback=prompt_callback
+        )
+
+        try:
+            # Blocks until the user completes auth in the browser or the code expires
+            auth_record = await asyncio.to_thread(credential.authenticate, scopes=self.scopes)
+            await asyncio.to_thread(self.auth_record_path.write_text, auth_record.serialize())
+            logging.info(f"Authentication succeeded, record saved to {self.auth_record_path}")
+        except Exception as e:
+            logging.info(f"Device code flow: {str(e)}")
+            raise
+
+        self._install_credential(credential)
 
     def get_user_client(self) -> Optional[GraphServiceClient]:
         """Get an authenticated GraphServiceClient if available"""
@@ -159,6 +294,11 @@ class AzureSettings:
             logging.info("GraphServiceClient already set")
             return self.user_client
 
+        if self.app_only:
+            # One application token serves every mailbox; no auth record or user interaction involved
+            logging.info("Creating app-only GraphServiceClient")
+            return self._install_credential(self._create_app_credential())
+
         if self.get_client_from_silent_auth():
             logging.info("Loading existing authenticated GraphServiceClient")
             return self.user_client
@@ -0,0 +1,18 @@
+import httpx
+import pytest
+from kiota_abstractions.authentication import AnonymousAuthenticationProvider
+from msgraph import GraphRequestAdapter, GraphServiceClient
+from msgraph.graph_request_adapter import options
+from msgraph_core import GraphClientFactory
+
+
+@pytest.fixture
+def graph_client():
+    """Factory for GraphServiceClients whose requests are answered by handler instead of Graph"""
+    def create(handler) -> GraphServiceClient:
+        http_client = GraphClientFactory.create_with_default_middleware(options=options)
+        # SDK requests go through the middleware pipeline; raw requests go straight to the transport
+        http_client._transport.pipeline._transport = http_client._transport.transport = httpx.MockTransport(handler)
+        return GraphServiceClient(request_adapter=GraphRequestAdapter(AnonymousAuthenticationProvider(),
+                                                                      client=http_client))
+    return create
@@ -0,0 +1,100 @@
+import asyncio
+
+from mcpserver.graph import controller as controller_module
+from mcpserver.graph.controller import AccountPool, GraphController
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_least_recently_used_accounts_are_evicted_beyond_the_limit():
+    pool = AccountPool(max_accounts=2)
+    created = []
+
+    def get(mailbox_id):
+        return pool.get(mailbox_id, lambda: created.append(mailbox_id) or object())
+
+    a = get("a@contoso.com")
+    get("b@contoso.com")
+    assert get("A@Contoso.com") is a
+    get("c@contoso.com")
+
+    assert len(pool) == 2
+    get("b@contoso.com")
+    assert created == ["a@contoso.com", "b@contoso.com", "c@contoso.com", "b@contoso.com"]
+
+
+def test_idle_accounts_are_dropped(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(controller_module.time, "monotonic", clock.monotonic)
+    pool = AccountPool(idle_timeout=60)
+    first = pool.get("a@contoso.com", object)
+    pool.get("b@contoso.com", object)
+
+    clock.now += 30
+    pool.get("b@contoso.com", object)
+    clock.now += 45
+
+    # a was last used 75 seconds ago; b only 45
+    pool.get("c@contoso.com", object)
+    assert len(pool) == 2
+    assert pool.get("a@contoso.com", object) is not first
+
+
+def test_each_account_gets_its_own_client_from_the_factory():
+    clients = []
+
+    def client_factory(mailbox_id):
+        clients.append(mailbox_id)
+        return f"client for {mailbox_id}"
+
+    controller = GraphController("signed-in", mailbox_id="me@contoso.com", client_factory=client_factory)
+
+    shared = controller.services("shared@contoso.com")
+    default = controller.services()
+
+    assert shared.user_client == "client for shared@contoso.com"
+    assert default.user_client == "client for me@contoso.com"
+    assert default.folder_cache is controller.folder_cache
+    assert controller.services("Shared@Contoso.com") is shared
+    assert clients == ["shared@contoso.com", "me@contoso.com"]
+
+
+def test_reauthentication_clears_the_pool():
+    controller = GraphController("old")
+    controller.services("shared@contoso.com")
+    controller.services()
+
+    controller.set_user_client("new")
+
+    assert len(controller.accounts) == 0
+    assert controller.services().user_client == "new"
+
+
+def test_mailboxes_share_one_attachment_cache_and_budget(tmp_path):
+    controller = GraphController("client", attachment_cache_dir=tmp_path, attachment_cache_max_bytes=10)
+    default = controller.services().mail
+    shared = controller.services("shared@contoso.com").mail
+
+    async def chunks(content):
+        yield content
+
+    cache = controller.attachment_cache
+    assert default.attachment_cache is shared.attachment_cache is cache
+    asyncio.run(cache.store("m1", "a1", "old.bin", None, chunks(b"x" * 8)))
+    asyncio.run(cache.store("m1", "a1", "new.bin", None, chunks(b"y" * 8), mailbox_id="Shared@Contoso.com"))
+
+    # The same IDs in another mailbox are a different entry, and both mailboxes count against one budget
+    assert cache.get("m1", "a1") is None
+    assert cache.get("m1", "a1", "shared@contoso.com").name == "new.bin"
+
+    # Dropping pooled accounts leaves the controller's cache open
+    controller.set_user_client("new client")
+    assert cache.get("m1", "a1", "shared@contoso.com") is not None
+    asyncio.run(controller.aclose())
+    assert controller.attachment_cache is None
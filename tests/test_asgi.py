@@ -0,0 +1,40 @@
+import pytest
+from starlette.testclient import TestClient
+
+from mcpserver.asgi import create_app, transport_security
+
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize",
+              "params": {"protocolVersion": "2025-03-26", "capabilities": {},
+                         "clientInfo": {"name": "test", "version": "1"}}}
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+
+def test_non_loopback_bind_requires_token():
+    with pytest.raises(ValueError):
+        create_app(host="0.0.0.0")
+
+
+def test_transport_security_keeps_rebinding_protection():
+    settings = transport_security("0.0.0.0", ["mcp.contoso.com"])
+
+    assert settings.enable_dns_rebinding_protection
+    assert "mcp.contoso.com:*" in settings.allowed_hosts
+    assert "https://mcp.contoso.com" in settings.allowed_origins
+    assert "0.0.0.0" not in settings.allowed_hosts
+
+
+def test_requests_need_bearer_token():
+    app = create_app(host="0.0.0.0", auth_token="secret", allowed_hosts=["mcp.contoso.com"])
+    with TestClient(app, base_url="http://mcp.contoso.com") as client:
+        assert client.post("/mcp/", json=INITIALIZE, headers=HEADERS).status_code == 401
+        wrong = client.post("/mcp/", json=INITIALIZE, headers={**HEADERS, "Authorization": "Bearer nope"})
+        assert wrong.status_code == 401
+        ok = client.post("/mcp/", json=INITIALIZE, headers={**HEADERS, "Authorization": "Bearer secret"})
+        assert ok.status_code == 200
+
+
+def test_unknown_host_header_is_rejected():
+    app = create_app(host="0.0.0.0", auth_token="secret", allowed_hosts=["mcp.contoso.com"])
+    with TestClient(app, base_url="http://evil.example") as client:
+        response = client.post("/mcp/", json=INITIALIZE, headers={**HEADERS, "Authorization": "Bearer secret"})
+        assert response.status_code == 421
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+from pathlib import Path
+
+import httpx
+import pytest
+
+from mcpserver.attachment_cache import AttachmentCache
+from mcpserver.graph.mail_service import MailService
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def store(cache, message_id, attachment_id, name, *parts):
+    return asyncio.run(cache.store(message_id, attachment_id, name, "application/pdf", chunks(*parts)))
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    cache = AttachmentCache(tmp_path)
+    first = store(cache, "m1", "a1", "Report.PDF", b"hello ", b"world")
+    second = store(cache, "m2", "a2", "copy.pdf", b"hello world")
+
+    assert first.path == second.path == str(tmp_path / f"{hashlib.sha256(b'hello world').hexdigest()}.pdf")
+    assert first.size == 11
+    assert Path(first.path).read_bytes() == b"hello world"
+    assert cache.get("m2", "a2").sha256 == first.sha256
+    assert cache.get("m1", "missing") is None
+    assert not list(tmp_path.glob(".download-*"))
+
+
+def test_index_is_shared_between_instances(tmp_path):
+    store(AttachmentCache(tmp_path), "m1", "a1", "a.txt", b"content")
+
+    assert AttachmentCache(tmp_path).get("m1", "a1").name == "a.txt"
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = AttachmentCache(tmp_path, max_bytes=10)
+    old = store(cache, "m1", "a1", "old.txt", b"aaaa")
+    recent = store(cache, "m2", "a2", "recent.txt", b"bbbb")
+    cache.get("m1", "a1")
+    store(cache, "m3", "a3", "new.txt", b"cccc")
+
+    assert cache.get("m2", "a2") is None
+    assert not Path(recent.path).exists()
+    assert cache.get("m1", "a1").path == old.path
+
+
+def test_file_larger_than_the_cache_is_kept(tmp_path):
+    cache = AttachmentCache(tmp_path, max_bytes=2)
+    entry = store(cache, "m1", "a1", "big.bin", b"0123456789")
+
+    assert Path(entry.path).exists()
+    assert cache.get("m1", "a1") is not None
+
+
+def test_download_streams_value_once_for_concurrent_callers(graph_client, tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith("/$value"):
+            return httpx.Response(200, content=b"%PDF-1.7 body")
+        return httpx.Response(200, json={"@odata.type": "#microsoft.graph.fileAttachment", "id": "a1",
+                                         "name": "invoice.pdf", "contentType": "application/pdf", "size": 13})
+
+    service = MailService(graph_client(handler), attachment_cache=AttachmentCache(tmp_path))
+
+    async def download():
+        return await asyncio.gather(*(service.download_attachment("m1", "a1") for _ in range(3)))
+
+    results = asyncio.run(download())
+
+    assert {result.path for result in results} == {results[0].path}
+    assert Path(results[0].path).read_bytes() == b"%PDF-1.7 body"
+    assert results[0].name == "invoice.pdf"
+    assert len(requests) == 2
+    assert requests[1].endswith("/me/messages/m1/attachments/a1/$value")
+
+    asyncio.run(service.download_attachment("m1", "a1"))
+    assert len(requests) == 2
+
+
+def test_item_attachment_is_saved_as_eml(graph_client, tmp_path):
+    def handler(request):
+        if request.url.path.endswith("/$value"):
+            return httpx.Response(200, content=b"MIME-Version: 1.0\r\n")
+        return httpx.Response(200, json={"@odata.type": "#microsoft.graph.itemAttachment", "id": "a1",
+                                         "name": "Meeting notes"})
+
+    service = MailService(graph_client(handler), attachment_cache=AttachmentCache(tmp_path))
+    entry = asyncio.run(service.download_attachment("m1", "a1"))
+
+    assert entry.name == "Meeting notes.eml"
+    assert entry.path.endswith(".eml")
+
+
+def test_eviction_accounts_for_entries_stored_by_other_processes(tmp_path):
+    first = AttachmentCache(tmp_path, max_bytes=10)
+    second = AttachmentCache(tmp_path, max_bytes=10)
+
+    old = store(first, "m1", "a1", "old.bin", b"x" * 8)
+    new = store(second, "m2", "a2", "new.bin", b"y" * 8)
+
+    assert first.get("m1", "a1") is None
+    assert not Path(old.path).exists()
+    assert first.get("m2", "a2").path == new.path
+
+
+def test_service_without_a_cache_refuses_downloads_without_touching_disk(graph_client):
+    requests = []
+    service = MailService(graph_client(lambda request: requests.append(request) or httpx.Response(200)))
+
+    with pytest.raises(RuntimeError, match="OUTLOOK_MCP_ATTACHMENT_DIR"):
+        asyncio.run(service.download_attachment("m1", "a1"))
+    assert service.attachment_cache is None
+    assert requests == []
+
+
+def test_download_locks_are_dropped_once_released(tmp_path):
+    cache = AttachmentCache(tmp_path)
+    order = []
+
+    async def hold(attachment_id, delay):
+        async with cache.lock("m1", attachment_id):
+            order.append(attachment_id)
+            await asyncio.sleep(delay)
+
+    async def run():
+        first = asyncio.create_task(hold("a1", 0.01))
+        await asyncio.sleep(0)
+        # A second request for the same attachment waits on the same lock
+        await asyncio.gather(first, hold("a1", 0), hold("a2", 0))
+        return dict(cache._locks)
+
+    assert asyncio.run(run()) == {}
+    assert order == ["a1", "a2", "a1"]
@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from mcpserver.graph.mail_service import MailService
+from mcpserver.mail_query import MailQuery
+
+
+def batch_handler(batches, respond):
+    """Answer each POST /$batch with respond(inner_request), listing responses in reverse order"""
+    def handler(request):
+        assert request.url.path.endswith("/$batch")
+        inner = json.loads(request.content)["requests"]
+        batches.append(inner)
+        responses = [dict(respond(item), id=item["id"]) for item in reversed(inner)]
+        return httpx.Response(200, json={"responses": [response for response in responses if response["status"]]})
+    return handler
+
+
+def moved(item):
+    message_id = item["url"].split("/")[3]
+    if message_id == "missing":
+        return {"status": 404, "body": {"error": {"code": "ErrorItemNotFound", "message": "Item not found"}}}
+    if message_id == "dropped":
+        return {"status": 0}
+    return {"status": 201, "body": {"id": f"new-{message_id}"}}
+
+
+def test_move_many_packs_requests_into_batches_of_twenty(graph_client):
+    batches = []
+    service = MailService(graph_client(batch_handler(batches, moved)))
+    moves = [(f"m{index}", "archive") for index in range(45)]
+
+    results = asyncio.run(service.move_many(moves))
+
+    assert sorted(len(batch) for batch in batches) == [5, 20, 20]
+    assert all(item["method"] == "POST" and item["body"] == {"destinationId": "archive"}
+               for batch in batches for item in batch)
+    assert [result["message_id"] for result in results] == [message_id for message_id, _ in moves]
+    assert all(result["success"] for result in results)
+    assert results[7]["new_message_id"] == "new-m7"
+
+
+def test_move_many_maps_partial_failures_to_their_moves(graph_client):
+    service = MailService(graph_client(batch_handler([], moved)))
+
+    results = asyncio.run(service.move_many([("a", "f1"), ("missing", "f1"), ("b", "f2"), ("dropped", "f2")]))
+
+    assert [result["success"] for result in results] == [True, False, True, False]
+    assert results[0]["new_message_id"] == "new-a"
+    assert results[1]["error"] == "Item not found"
+    assert results[2]["new_message_id"] == "new-b"
+    assert results[3]["error"] == "No response in batch"
+
+
+def test_failed_batch_call_only_fails_its_own_chunk(graph_client):
+    calls = []
+
+    def handler(request):
+        inner = json.loads(request.content)["requests"]
+        calls.append(inner)
+        if any(item["url"].startswith("/me/messages/bad") for item in inner):
+            return httpx.Response(400, json={"error": {"code": "BadRequest", "message": "Invalid batch"}})
+        return httpx.Response(200, json={"responses": [{"id": item["id"], "status": 201, "body": {"id": "x"}}
+                                                       for item in inner]})
+
+    service = MailService(graph_client(handler))
+    moves = [("bad", "f")] + [(f"m{index}", "f") for index in range(20)]
+
+    results = asyncio.run(service.move_many(moves))
+
+    assert len(calls) == 2
+    assert [result["success"] for result in results] == [False] * 20 + [True]
+
+
+def test_update_many_sends_only_provided_properties(graph_client):
+    batches = []
+    service = MailService(graph_client(batch_handler(batches, lambda item: {"status": 200, "body": {}})))
+
+    results = asyncio.run(service.update_many_mail_properties(message_ids=["a", "b/c"], is_read=True,
+                                                              importance="High"))
+
+    assert [result["success"] for result in results] == [True, True]
+    assert [item["url"] for item in batches[0]] == ["/me/messages/a", "/me/messages/b%2Fc"]
+    assert all(item["method"] == "PATCH" and item["body"] == {"isRead": True, "importance": "high"}
+               for item in batches[0])
+
+
+def test_update_many_selects_messages_with_a_query(graph_client):
+    searches = []
+    batches = []
+    answer_batch = batch_handler(batches, lambda item: {"status": 200, "body": {}})
+
+    def handler(request):
+        if request.method == "GET":
+            searches.append(request.url)
+            return httpx.Response(200, json={"value": [{"id": "x"}, {"id": "y"}, {"id": "z"}]})
+        return answer_batch(request)
+
+    service = MailService(graph_client(handler))
+    query = MailQuery.from_dict({"is_read": False, "count": 2})
+
+    results = asyncio.run(service.update_many_mail_properties(query=query, is_read=True))
+
+    assert searches[0].params["$select"] == "id"
+    assert [result["message_id"] for result in results] == ["x", "y"]
+    assert [item["url"] for item in batches[0]] == ["/me/messages/x", "/me/messages/y"]
+
+
+def test_update_many_rejects_invalid_requests(graph_client):
+    service = MailService(graph_client(lambda request: httpx.Response(500)))
+
+    with pytest.raises(ValueError, match="Importance"):
+        asyncio.run(service.update_many_mail_properties(message_ids=["a"], importance="urgent"))
+    with pytest.raises(ValueError, match="at least one property"):
+        asyncio.run(service.update_many_mail_properties(message_ids=["a"]))
+    with pytest.raises(ValueError, match="message_ids or a query"):
+        asyncio.run(service.update_many_mail_properties(is_read=True))
@@ -0,0 +1,75 @@
+from msgraph.generated.models.body_type import BodyType
+from msgraph.generated.models.item_body import ItemBody
+from msgraph.generated.models.message import Message
+
+from mcpserver.body_normalizer import html_to_text, normalize_body, normalize_message_body
+
+
+def test_html_body_drops_markup_styles_and_outlook_history():
+    html = ("<html><head><style>p {color: red}</style></head><body>"
+            "<p>Hi   team,</p><p>See <b>notes</b><img src='cid:logo'></p><ul><li>one</li><li>two</li></ul>"
+            "<div id='divRplyFwdMsg'><b>From:</b> Bob</div><p>old thread</p></body></html>")
+
+    assert html_to_text(html) == "Hi team,\n\nSee notes\n\n- one\n\n- two"
+
+
+def test_html_body_drops_gmail_quotes_and_blockquotes():
+    assert html_to_text("<div>New</div><div class='gmail_quote'>On Mon, Bob wrote:</div>") == "New"
+    assert html_to_text("<p>Reply</p><blockquote><p>quoted</p></blockquote><p>After</p>") == "Reply\n\nAfter"
+    assert "quoted" in html_to_text("<blockquote>quoted</blockquote>", strip_quotes=False)
+
+
+def test_text_body_stops_at_quote_headers_and_signatures():
+    text = "Sounds good.\n> earlier line\nThanks\n--\nAda\nOn Mon, 1 Jan 2025, Bob wrote:\nold"
+    assert normalize_body(text, "text") == "Sounds good.\nThanks"
+
+    outlook = "Approved.\n\nFrom: Bob <bob@example.com>\nSent: Monday\nSubject: Budget\nold"
+    assert normalize_body(outlook, "text") == "Approved."
+
+
+def test_normalized_body_is_cached_per_change_key():
+    message = Message(id="m1", change_key="v1", body=ItemBody(content_type=BodyType.Html, content="<p>First</p>"))
+    assert normalize_message_body(message) == "First"
+
+    # Same changeKey: the cached text is reused even though the content object differs
+    message.body = ItemBody(content_type=BodyType.Html, content="<p>Changed</p>")
+    assert normalize_message_body(message) == "First"
+
+    message.change_key = "v2"
+    assert normalize_message_body(message) == "Changed"
+
+
+def test_self_closing_tag_in_quote_does_not_leak_quoted_text():
+    html = '<p>New reply</p><blockquote>quoted line 1<br/>quoted secret line 2</blockquote><p>tail</p>'
+
+    text = html_to_text(html)
+
+    assert 'quoted' not in text
+    assert text.startswith('New reply')
+    assert text.endswith('tail')
+
+
+def test_unclosed_tag_in_quote_does_not_drop_rest_of_message():
+    html = '<p>Hi</p><blockquote><p>quoted</blockquote><p>New text after'
+
+    text = html_to_text(html)
+
+    assert 'quoted' not in text
+    assert 'Hi' in text
+    assert 'New text after' in text
+
+
+def test_nested_quotes_are_skipped_until_outer_end():
+    html = '<p>Top</p><blockquote>a<blockquote>b</blockquote>c</blockquote><p>Bottom</p>'
+
+    text = html_to_text(html)
+
+    assert text.split() == ['Top', 'Bottom']
+
+
+def test_self_closing_tags_outside_quotes_still_render():
+    assert html_to_text('line 1<br/>line 2') == 'line 1\nline 2'
+
+
+def test_self_closed_blockquote_does_not_hide_rest_of_message():
+    assert 'after' in html_to_text('before<blockquote/><p>after</p>')
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+from azure.core.credentials import AccessToken
+
+from mcpserver.credential import AsyncCachedCredential
+
+
+class CountingCredential:
+    """Synchronous credential that hands out numbered tokens, slowly, and records the calling thread"""
+    def __init__(self, lifetime=3600, delay=0.05, fail_after=None):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.fail_after = fail_after
+        self.calls = []
+        self.threads = set()
+        self.closed = False
+
+    def get_token(self, *scopes, claims=None, **kwargs):
+        self.threads.add(threading.get_ident())
+        self.calls.append((scopes, claims))
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            raise RuntimeError("token endpoint unavailable")
+        time.sleep(self.delay)
+        return AccessToken(f"token-{len(self.calls)}", int(time.time() + self.lifetime))
+
+    def close(self):
+        self.closed = True
+
+
+def test_concurrent_requests_share_one_acquisition_off_the_event_loop():
+    credential = CountingCredential()
+
+    async def run():
+        async with AsyncCachedCredential(credential) as cached:
+            tokens = await asyncio.gather(*(cached.get_token("Mail.Read", "User.Read") for _ in range(10)))
+            # Scope order does not matter and a valid token is served from memory
+            again = await cached.get_token("User.Read", "Mail.Read")
+            return tokens, again
+
+    tokens, again = asyncio.run(run())
+
+    assert {token.token for token in tokens} == {"token-1"}
+    assert again.token == "token-1"
+    assert len(credential.calls) == 1
+    assert threading.get_ident() not in credential.threads
+    assert credential.closed
+
+
+def test_claims_challenge_bypasses_the_cache():
+    credential = CountingCredential(delay=0)
+
+    async def run():
+        async with AsyncCachedCredential(credential) as cached:
+            await cached.get_token("Mail.Read")
+            return await cached.get_token("Mail.Read", claims='{"access_token":{}}')
+
+    token = asyncio.run(run())
+
+    assert token.token == "token-2"
+    assert credential.calls[1] == (("Mail.Read",), '{"access_token":{}}')
+
+
+def test_token_is_refreshed_in_the_background_before_expiry():
+    # With a margin longer than the lifetime the refresh is due immediately
+    credential = CountingCredential(lifetime=120, delay=0)
+
+    async def run():
+        async with AsyncCachedCredential(credential, refresh_margin=120) as cached:
+            first = await cached.get_token("Mail.Read")
+            for _ in range(100):
+                second = await cached.get_token("Mail.Read")
+                if second.token != first.token:
+                    break
+                await asyncio.sleep(0.01)
+            return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first.token == "token-1"
+    assert second.token != "token-1"
+
+
+def test_failed_background_refresh_keeps_the_current_token():
+    credential = CountingCredential(lifetime=120, delay=0, fail_after=1)
+
+    async def run():
+        async with AsyncCachedCredential(credential, refresh_margin=120) as cached:
+            await cached.get_token("Mail.Read")
+            for _ in range(50):
+                if len(credential.calls) > 1:
+                    break
+                await asyncio.sleep(0.01)
+            return await cached.get_token("Mail.Read")
+
+    assert asyncio.run(run()).token == "token-1"
+    assert len(credential.calls) == 2
+
+
+def test_clear_stops_background_refreshes():
+    credential = CountingCredential(delay=0)
+
+    async def run():
+        cached = AsyncCachedCredential(credential)
+        await cached.get_token("Mail.Read")
+        tasks = list(cached._refresh_tasks.values())
+        cached.clear()
+        await asyncio.sleep(0)
+        return tasks, cached
+
+    tasks, cached = asyncio.run(run())
+
+    assert tasks and all(task.cancelled() for task in tasks)
+    assert cached._tokens == {}
@@ -0,0 +1,170 @@
+import asyncio
+import base64
+import hashlib
+
+import httpx
+
+from mcpserver.graph.files_service import FilesService
+from mcpserver.graph.quickxor import QuickXorHash
+
+
+def reference_quickxor(data: bytes) -> str:
+    """Byte-at-a-time QuickXorHash as described in the OneDrive documentation"""
+    state = 0
+    for index, byte in enumerate(data):
+        shift = (index * 11) % 160
+        shifted = byte << shift
+        state ^= (shifted & ((1 << 160) - 1)) ^ (shifted >> 160)
+    digest = bytearray(state.to_bytes(20, "little"))
+    for index, byte in enumerate(len(data).to_bytes(8, "little")):
+        digest[12 + index] ^= byte
+    return base64.b64encode(bytes(digest)).decode("ascii")
+
+
+def test_quickxor_matches_reference_across_chunk_boundaries():
+    data = bytes(range(256)) * 7 + b"tail"
+    hasher = QuickXorHash()
+    for start in range(0, len(data), 333):
+        hasher.update(data[start:start + 333])
+
+    assert hasher.base64_digest() == reference_quickxor(data)
+    assert QuickXorHash().base64_digest() == base64.b64encode(bytes(20)).decode("ascii")
+
+
+def children(*items):
+    return httpx.Response(200, json={"value": list(items)})
+
+
+def test_upload_directory_skips_unchanged_files_and_mirrors_subfolders(graph_client, tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "same.txt").write_bytes(b"unchanged")
+    (tmp_path / "changed.txt").write_bytes(b"new content")
+    (tmp_path / "sub" / "nested.txt").write_bytes(b"nested")
+    uploads = []
+
+    def handler(request):
+        if request.method == "GET" and request.url.path.endswith("/items/root/children"):
+            return children(
+                {"id": "1", "name": "same.txt", "size": 9,
+                 "file": {"hashes": {"quickXorHash": reference_quickxor(b"unchanged")}}},
+                {"id": "2", "name": "changed.txt", "size": 11,
+                 "file": {"hashes": {"sha1Hash": hashlib.sha1(b"old content").hexdigest()}}},
+                {"id": "3", "name": "sub", "folder": {}})
+        if request.method == "GET":
+            return children()
+        uploads.append((request.url.path.split(":/")[1].removesuffix(":/content"), request.content))
+        return httpx.Response(201, json={"id": "new"})
+
+    progress = []
+
+    async def report_progress(done, total):
+        progress.append((done, total))
+
+    report = asyncio.run(FilesService(graph_client(handler)).upload_directory(
+        "d1", "root", str(tmp_path), progress=report_progress))
+
+    assert report.skipped == ["same.txt"]
+    assert sorted(report.transferred) == ["changed.txt", "sub/nested.txt"]
+    assert sorted(uploads) == [("changed.txt", b"new content"), ("sub/nested.txt", b"nested")]
+    assert report.bytes_transferred == 17
+    assert progress[-1] == (3, 3)
+
+
+def test_upload_files_reports_failures_without_stopping(graph_client, tmp_path):
+    paths = []
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_bytes(name.encode())
+        paths.append(str(tmp_path / name))
+
+    def handler(request):
+        if request.method == "GET":
+            return children()
+        if "b.txt" in request.url.path:
+            return httpx.Response(507, json={"error": {"code": "quotaLimitReached", "message": "Drive is full"}})
+        return httpx.Response(201, json={"id": "new"})
+
+    report = asyncio.run(FilesService(graph_client(handler)).upload_files("d1", "root", paths))
+
+    assert sorted(report.transferred) == ["a.txt", "c.txt"]
+    assert [path for path, _ in report.failed] == ["b.txt"]
+    assert "Failed: 1" in report.summary()
+
+
+def test_transfers_are_bounded_by_concurrency(graph_client, tmp_path):
+    paths = []
+    for index in range(6):
+        (tmp_path / f"{index}.txt").write_bytes(b"x")
+        paths.append(str(tmp_path / f"{index}.txt"))
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        if request.method == "GET":
+            return children()
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(201, json={"id": "new"})
+
+    report = asyncio.run(FilesService(graph_client(handler)).upload_files("d1", "root", paths, concurrency=2))
+
+    assert len(report.transferred) == 6
+    assert peak == 2
+
+
+def test_download_folder_streams_download_urls_and_skips_matching_files(graph_client, tmp_path):
+    (tmp_path / "same.txt").write_bytes(b"unchanged")
+
+    def handler(request):
+        if request.url.host == "storage.example.com":
+            return httpx.Response(200, content=b"fresh " + request.url.path.encode())
+        if request.url.path.endswith("/items/folder/children"):
+            return children(
+                {"id": "1", "name": "same.txt", "size": 9,
+                 "file": {"hashes": {"sha256Hash": hashlib.sha256(b"unchanged").hexdigest()}}},
+                {"id": "2", "name": "new.txt", "size": 10, "file": {},
+                 "@microsoft.graph.downloadUrl": "https://storage.example.com/new"},
+                {"id": "3", "name": "docs", "folder": {}})
+        return children({"id": "4", "name": "deep.txt", "size": 10, "file": {},
+                         "@microsoft.graph.downloadUrl": "https://storage.example.com/deep"})
+
+    report = asyncio.run(FilesService(graph_client(handler)).download_items("d1", str(tmp_path), folder_id="folder"))
+
+    assert report.skipped == ["same.txt"]
+    assert sorted(report.transferred) == ["docs/deep.txt", "new.txt"]
+    assert (tmp_path / "new.txt").read_bytes() == b"fresh /new"
+    assert (tmp_path / "docs" / "deep.txt").read_bytes() == b"fresh /deep"
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_list_remote_files_keeps_select_commas(graph_client):
+    urls = []
+
+    def handler(request):
+        urls.append(request.url)
+        return children({"id": "1", "name": "a.txt", "size": 1, "file": {}})
+
+    files = asyncio.run(FilesService(graph_client(handler))._list_remote_files("drive", "folder"))
+
+    assert list(files) == ["a.txt"]
+    assert urls[0].params["$select"] == "id,name,size,file,folder,@microsoft.graph.downloadUrl"
+    assert urls[0].params["$top"] == "999"
+
+
+def test_download_items_by_id_keeps_select_commas(graph_client, tmp_path):
+    urls = []
+
+    def handler(request):
+        urls.append(request.url)
+        if request.url.path.endswith("/content"):
+            return httpx.Response(200, content=b"data")
+        return httpx.Response(200, json={"id": "1", "name": "a.txt", "size": 4, "file": {}})
+
+    report = asyncio.run(FilesService(graph_client(handler)).download_items("drive", str(tmp_path), item_ids=["1"]))
+
+    assert urls[0].params["$select"] == "id,name,size,file,folder,@microsoft.graph.downloadUrl"
+    assert (tmp_path / "a.txt").read_bytes() == b"data"
+    assert report.failed == []
+    assert report.transferred == ["a.txt"]
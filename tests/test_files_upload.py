@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from mcpserver.graph import files_service
+from mcpserver.graph.files_service import FilesService
+
+UPLOAD_URL = "https://upload.example.com/session/1"
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(files_service, "SIMPLE_UPLOAD_LIMIT", 4)
+    monkeypatch.setattr(files_service, "UPLOAD_CHUNK_SIZE", 4)
+
+    async def no_sleep(_):
+        pass
+    monkeypatch.setattr(files_service.asyncio, "sleep", no_sleep)
+
+
+def upload(service, content, **kwargs):
+    progress = []
+
+    async def report(done, total):
+        progress.append((done, total))
+
+    item = asyncio.run(service.upload_file("d1", "f1", "notes.txt", content, progress=report, **kwargs))
+    return item, progress
+
+
+def test_small_file_is_sent_in_one_put(graph_client):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(201, json={"id": "item1", "name": "notes.txt"})
+
+    item, progress = upload(FilesService(graph_client(handler)), b"tiny")
+
+    assert item["id"] == "item1"
+    assert progress == [(4, 4)]
+    assert len(requests) == 1
+    assert requests[0].method == "PUT"
+    assert requests[0].url.path.endswith("/drives/d1/items/f1:/notes.txt:/content")
+    assert requests[0].headers["Content-Type"] == "text/plain"
+    assert requests[0].content == b"tiny"
+
+
+def test_large_file_is_uploaded_in_chunks(graph_client):
+    chunks = []
+
+    def handler(request):
+        if request.url.path.endswith("/createUploadSession"):
+            assert json.loads(request.content) == {"item": {"@microsoft.graph.conflictBehavior": "rename"}}
+            return httpx.Response(200, json={"uploadUrl": UPLOAD_URL})
+        assert str(request.url) == UPLOAD_URL
+        assert "Authorization" not in request.headers
+        chunks.append((request.headers["Content-Range"], request.content))
+        if request.headers["Content-Range"].endswith("-9/10"):
+            return httpx.Response(201, json={"id": "item1"})
+        end = int(request.headers["Content-Range"].split("-")[1].split("/")[0])
+        return httpx.Response(202, json={"nextExpectedRanges": [f"{end + 1}-"]})
+
+    item, progress = upload(FilesService(graph_client(handler)), b"0123456789", conflict_behavior="rename")
+
+    assert item == {"id": "item1"}
+    assert chunks == [("bytes 0-3/10", b"0123"), ("bytes 4-7/10", b"4567"), ("bytes 8-9/10", b"89")]
+    assert progress == [(4, 10), (8, 10), (10, 10)]
+
+
+def test_failed_chunk_resumes_from_next_expected_range(graph_client):
+    ranges = []
+    failed = []
+
+    def handler(request):
+        if request.url.path.endswith("/createUploadSession"):
+            return httpx.Response(200, json={"uploadUrl": UPLOAD_URL})
+        if request.method == "GET":
+            # The session received the first two bytes of the failed chunk
+            return httpx.Response(200, json={"nextExpectedRanges": ["6-"]})
+        content_range = request.headers["Content-Range"]
+        ranges.append(content_range)
+        if content_range == "bytes 4-7/10" and not failed:
+            failed.append(content_range)
+            return httpx.Response(500)
+        if content_range.endswith("-9/10"):
+            return httpx.Response(201, json={"id": "item1"})
+        end = int(content_range.split("-")[1].split("/")[0])
+        return httpx.Response(202, json={"nextExpectedRanges": [f"{end + 1}-"]})
+
+    item, _ = upload(FilesService(graph_client(handler)), b"0123456789")
+
+    assert item == {"id": "item1"}
+    assert ranges == ["bytes 0-3/10", "bytes 4-7/10", "bytes 6-9/10"]
+
+
+def test_expired_session_is_replaced(graph_client):
+    sessions = []
+    ranges = []
+
+    def handler(request):
+        if request.url.path.endswith("/createUploadSession"):
+            sessions.append(request)
+            return httpx.Response(200, json={"uploadUrl": f"{UPLOAD_URL}{len(sessions)}"})
+        if request.method == "GET":
+            return httpx.Response(404)
+        ranges.append((str(request.url), request.headers["Content-Range"]))
+        if str(request.url).endswith("1"):
+            return httpx.Response(404)
+        return httpx.Response(201, json={"id": "item1"})
+
+    item, _ = upload(FilesService(graph_client(handler)), b"01234")
+
+    assert item == {"id": "item1"}
+    assert len(sessions) == 2
+    assert ranges == [(f"{UPLOAD_URL}1", "bytes 0-3/5"), (f"{UPLOAD_URL}2", "bytes 0-3/5")]
+
+
+def test_session_is_cancelled_after_repeated_failures(graph_client):
+    deleted = []
+
+    def handler(request):
+        if request.url.path.endswith("/createUploadSession"):
+            return httpx.Response(200, json={"uploadUrl": UPLOAD_URL})
+        if request.method == "DELETE":
+            deleted.append(str(request.url))
+            return httpx.Response(204)
+        if request.method == "GET":
+            return httpx.Response(200, json={"nextExpectedRanges": ["0-"]})
+        return httpx.Response(503, text="unavailable")
+
+    with pytest.raises(Exception, match="Upload failed at byte 0 of 10: HTTP 503"):
+        upload(FilesService(graph_client(handler)), b"0123456789")
+    assert deleted == [UPLOAD_URL]
+
+
+def test_local_file_is_read_from_disk(graph_client, tmp_path):
+    uploaded = []
+
+    def handler(request):
+        if request.url.path.endswith("/createUploadSession"):
+            return httpx.Response(200, json={"uploadUrl": UPLOAD_URL})
+        uploaded.append(request.content)
+        if request.headers["Content-Range"].endswith("-5/6"):
+            return httpx.Response(201, json={"id": "item1"})
+        return httpx.Response(202, json={"nextExpectedRanges": ["4-"]})
+
+    local_file = tmp_path / "data.bin"
+    local_file.write_bytes(b"abcdef")
+    item = asyncio.run(FilesService(graph_client(handler)).upload_local_file("d1", "f1", str(local_file)))
+
+    assert item == {"id": "item1"}
+    assert uploaded == [b"abcd", b"ef"]
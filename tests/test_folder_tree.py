@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import pytest
+
+from mcpserver.folder_tree import FolderCache, FolderTree
+from mcpserver.graph.mail_service import MailService
+from mcpserver.shared_cache import SharedCache
+
+
+def folder(folder_id, name, child_count=0, children=None):
+    data = {"id": folder_id, "displayName": name, "childFolderCount": child_count}
+    if children is not None:
+        data["childFolders"] = children
+    return data
+
+
+def test_load_folder_tree_reaches_any_depth_with_expanded_levels(graph_client):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        if request.url.path.endswith("/mailFolders/clients/childFolders"):
+            return httpx.Response(200, json={"value": [
+                folder("acme", "Acme", 1, [folder("deals", "Deals")])]})
+        return httpx.Response(200, json={"value": [
+            folder("inbox", "Inbox", 1, [folder("clients", "Clients", 1)]),
+            folder("sent", "Sent Items", 0, [])]})
+
+    tree = asyncio.run(MailService(graph_client(handler)).load_folder_tree())
+
+    assert [(node.path, depth) for node, depth in tree.walk()] == [
+        ("Inbox", 0), ("Inbox/Clients", 1), ("Inbox/Clients/Acme", 2), ("Inbox/Clients/Acme/Deals", 3),
+        ("Sent Items", 0)]
+    # Two levels per request: the top-level call and one call for Clients
+    assert len(paths) == 2
+    assert tree.get("deals").parent_id == "acme"
+    assert tree.path_to_id()["Inbox/Clients/Acme/Deals"] == "deals"
+
+
+def test_failed_child_level_keeps_the_rest_of_the_tree(graph_client):
+    def handler(request):
+        if request.url.path.endswith("/childFolders"):
+            return httpx.Response(403, json={"error": {"code": "ErrorAccessDenied", "message": "denied"}})
+        return httpx.Response(200, json={"value": [folder("inbox", "Inbox", 2, [])]})
+
+    tree = asyncio.run(MailService(graph_client(handler)).load_folder_tree())
+
+    assert tree.to_hierarchy() == [{"id": "inbox", "display_name": "Inbox", "parent_folder_id": None,
+                                    "child_folders": []}]
+
+
+def top_level_handler(paths):
+    def handler(request):
+        paths.append((request.method, request.url.path))
+        if request.method == "POST" and request.url.path.endswith("/childFolders"):
+            return httpx.Response(201, json=folder("reports", "Reports"))
+        if request.method == "POST" and request.url.path.endswith("/move"):
+            return httpx.Response(404, json={"error": {"code": "ErrorItemNotFound", "message": "gone"}})
+        return httpx.Response(200, json={"value": [folder("inbox", "Inbox", 0, [])]})
+    return handler
+
+
+def test_folder_tree_is_cached_and_shared_by_concurrent_callers(graph_client):
+    paths = []
+    service = MailService(graph_client(top_level_handler(paths)), folder_cache=FolderCache(ttl=60))
+
+    async def run():
+        await asyncio.gather(*(service.get_folder_tree() for _ in range(5)))
+        return await service.get_mail_folder_id_dict()
+
+    assert asyncio.run(run()) == {"Inbox": "inbox"}
+    assert len(paths) == 1
+
+
+def test_expired_folder_tree_is_reloaded(graph_client):
+    paths = []
+    service = MailService(graph_client(top_level_handler(paths)), folder_cache=FolderCache(ttl=-1))
+
+    asyncio.run(service.get_folder_tree())
+    asyncio.run(service.get_folder_tree())
+
+    assert len(paths) == 2
+
+
+def test_created_folder_is_written_through_and_404_invalidates(graph_client):
+    paths = []
+    cache = FolderCache(ttl=60)
+    service = MailService(graph_client(top_level_handler(paths)), folder_cache=cache)
+
+    asyncio.run(service.get_folder_tree())
+    asyncio.run(service.create_mail_folder("Reports", parent_folder_id="inbox"))
+
+    assert cache.get().get_by_path("Inbox/Reports").id == "reports"
+    assert asyncio.run(service.get_mail_folder_by_id("reports")) == "Reports"
+    assert [method for method, _ in paths] == ["GET", "POST"]
+
+    with pytest.raises(Exception):
+        asyncio.run(service.move_mail_to_folder("message", "deleted-folder"))
+    assert cache.get() is None
+
+
+def sample_tree():
+    tree = FolderTree()
+    clients = tree.add("clients", "Clients")
+    acme = tree.add("acme", "Acme", clients)
+    tree.add("acme-archive", "Archive", acme)
+    tree.add("acme-invoices", "Invoices", acme)
+    tree.add("archive", "Archive")
+    tree.add("beta", "Beta Corp", clients)
+    return tree
+
+
+def test_resolve_exact_path_is_case_insensitive_and_falls_back_to_name():
+    tree = sample_tree()
+
+    assert [node.id for node in tree.resolve("/clients/ACME/invoices")] == ["acme-invoices"]
+    assert sorted(node.id for node in tree.resolve("Archive")) == ["archive"]
+    assert sorted(node.id for node in tree.resolve("invoices")) == ["acme-invoices"]
+    assert tree.resolve("Clients/Nobody") == []
+
+
+def test_resolve_prefix_returns_parents_first_and_respects_limit():
+    tree = sample_tree()
+
+    assert [node.path for node in tree.resolve("Clients/", prefix=True)] == [
+        "Clients", "Clients/Acme", "Clients/Beta Corp", "Clients/Acme/Archive", "Clients/Acme/Invoices"]
+    assert len(tree.resolve("Clients", prefix=True, limit=2)) == 2
+    # Duplicate display names keep separate paths
+    assert tree.path_to_id()["Archive"] == "archive"
+    assert tree.path_to_id()["Clients/Acme/Archive"] == "acme-archive"
+
+def tree_with(*names):
+    tree = FolderTree()
+    for index, name in enumerate(names):
+        tree.add(f"id{index}", name)
+    return tree
+
+
+def test_backend_tree_is_unpickled_only_when_it_changes(tmp_path, monkeypatch):
+    backend = SharedCache(tmp_path / "cache.db")
+    cache = FolderCache(backend=backend)
+    cache.set(tree_with("Inbox"))
+
+    loads = []
+    original_get = backend.get
+    monkeypatch.setattr(backend, "get", lambda *args: loads.append(args) or original_get(*args))
+
+    first = cache.get()
+    assert cache.get() is first
+    assert loads == []
+
+
+def test_tree_replaced_by_another_process_is_reloaded(tmp_path):
+    worker_a = FolderCache(backend=SharedCache(tmp_path / "cache.db"))
+    worker_b = FolderCache(backend=SharedCache(tmp_path / "cache.db"))
+    worker_a.set(tree_with("Inbox"))
+    assert worker_b.get().get("id0").display_name == "Inbox"
+
+    worker_a.add_folder("new", "Invoices")
+
+    assert worker_b.get().get("new").display_name == "Invoices"
+
+
+def test_invalidation_in_another_process_is_seen(tmp_path):
+    worker_a = FolderCache(backend=SharedCache(tmp_path / "cache.db"))
+    worker_b = FolderCache(backend=SharedCache(tmp_path / "cache.db"))
+    worker_a.set(tree_with("Inbox"))
+    assert worker_b.get() is not None
+
+    worker_a.invalidate()
+
+    assert worker_b.get() is None
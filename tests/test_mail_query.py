@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from msgraph.generated.models.message import Message
+from msgraph.generated.models.single_value_legacy_extended_property import SingleValueLegacyExtendedProperty
+
+from mcpserver.mail_query import MailQuery
+
+
+def test_from_dict_parses_dates_and_ignores_unknown_keys():
+    query = MailQuery.from_dict({"subject": "report", "received_after": "2025-01-01T00:00:00",
+                                 "count": 5, "unknown": True})
+
+    assert query.subject == "report"
+    assert query.received_after == datetime(2025, 1, 1)
+    assert query.count == 5
+    assert query.folder_id == "inbox"
+
+
+def test_filter_route_puts_the_ordering_property_first():
+    plan = MailQuery(is_read=False, importance="medium", received_after=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                     orderby=["receivedDateTime DESC"]).plan()
+
+    assert plan.route == "$filter"
+    assert plan.filter == ("receivedDateTime ge 2025-01-01T00:00:00Z and isRead eq false "
+                           "and importance eq 'normal'")
+    assert plan.orderby == ["receivedDateTime DESC"]
+    assert plan.post_filters == []
+
+
+def test_filter_without_the_ordering_property_gets_a_leading_range():
+    plan = MailQuery(has_attachments=True).plan()
+
+    assert plan.filter == "receivedDateTime ge 1900-01-01T00:00:00Z and hasAttachments eq true"
+
+
+def test_search_route_checks_is_read_locally():
+    plan = MailQuery(subject="budget", is_read=True).plan()
+
+    assert plan.route == "$search"
+    assert plan.search == "subject:budget"
+    assert plan.filter is None and plan.orderby is None
+    assert plan.post_filters == ["is_read"]
+    assert "isRead" in plan.select
+    assert plan.accepts(Message(is_read=True))
+    assert not plan.accepts(Message(is_read=False))
+
+
+def test_size_bounds_are_checked_against_the_extended_property():
+    plan = MailQuery(size_min=1000).plan()
+
+    def sized(value):
+        return Message(single_value_extended_properties=[
+            SingleValueLegacyExtendedProperty(id="Integer 0xe08", value=str(value))])
+
+    assert plan.expand == ["singleValueExtendedProperties($filter=id eq 'Integer 0x0E08')"]
+    assert plan.accepts(sized(5000))
+    assert not plan.accepts(sized(10))
+    assert not plan.accepts(Message())
+    assert "Local post-filters: size_min" in plan.explain()
+
+
+def message(**properties):
+    defaults = dict(is_read=False, received_date_time=None, sent_date_time=None, importance=None,
+                    has_attachments=False, single_value_extended_properties=None)
+    return SimpleNamespace(**{**defaults, **properties})
+
+
+def test_datetime_orderby_gets_placeholder_clause_first():
+    query = MailQuery(importance="high", orderby=["receivedDateTime DESC"])
+
+    assert query.build_filter_query() == "receivedDateTime ge 1900-01-01T00:00:00Z and importance eq 'high'"
+
+
+def test_orderby_property_in_filter_is_moved_first():
+    query = MailQuery(is_read=False, importance="high", orderby=["importance DESC"])
+
+    assert query.build_filter_query() == "importance eq 'high' and isRead eq false"
+
+
+def test_non_datetime_orderby_gets_no_placeholder():
+    query = MailQuery(importance="high", orderby=["subject ASC"])
+
+    assert "subject ge" not in (query.build_filter_query() or "")
+
+
+def test_non_datetime_orderby_checks_filter_locally():
+    query = MailQuery(importance="high", received_after=datetime(2024, 1, 1), orderby=["subject ASC"])
+
+    plan = query.plan()
+
+    assert plan.filter is None
+    assert plan.orderby == ["subject ASC"]
+    assert set(plan.post_filters) == {"importance", "received_after"}
+    assert "importance" in plan.select
+    recent = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    assert plan.accepts(message(importance=SimpleNamespace(value="high"), received_date_time=recent))
+    assert not plan.accepts(message(importance=SimpleNamespace(value="low"), received_date_time=recent))
+    assert not plan.accepts(message(importance=SimpleNamespace(value="high"),
+                                    received_date_time=datetime(2023, 6, 1, tzinfo=timezone.utc)))
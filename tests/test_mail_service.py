@@ -0,0 +1,146 @@
+import asyncio
+
+import httpx
+import pytest
+
+from mcpserver.attachment_cache import AttachmentCache
+from mcpserver.graph.mail_service import MESSAGE_FIELDS, MailService
+from mcpserver.graph.pagination import decode_cursor, encode_cursor
+from mcpserver.mail_query import MailQuery
+from mcpserver.mail_store import MailStore
+
+MESSAGES_URL = "https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages"
+
+
+def message(message_id, received="2025-01-01T00:00:00Z"):
+    return {"id": message_id, "subject": f"message {message_id}", "receivedDateTime": received}
+
+
+def search(service, query, cursor=None):
+    page = asyncio.run(service.search_mail(query, cursor=cursor))
+    return [item.id for item in page.value], page.cursor
+
+
+def test_search_cursor_resumes_inside_and_across_graph_pages(graph_client):
+    urls = []
+
+    def handler(request):
+        urls.append(str(request.url))
+        if "skiptoken" in str(request.url):
+            return httpx.Response(200, json={"value": [message("4"), message("5")]})
+        return httpx.Response(200, json={"value": [message("1"), message("2"), message("3")],
+                                         "@odata.nextLink": f"{MESSAGES_URL}?$skiptoken=page2"})
+
+    service = MailService(graph_client(handler))
+    query = MailQuery(is_read=False, count=2)
+
+    ids, cursor = search(service, query)
+    assert ids == ["1", "2"]
+    assert len(urls) == 1
+    assert decode_cursor(cursor)["skip"] == 2
+
+    ids, cursor = search(service, query, cursor)
+    assert ids == ["3", "4"]
+    # Resuming re-reads the stored page and follows its next link only when more items are needed
+    assert httpx.URL(urls[1]).params == httpx.URL(urls[0]).params
+    assert httpx.URL(urls[1]).path.endswith("/me/mailFolders/inbox/messages")
+    assert "skiptoken=page2" in urls[2]
+    assert len(urls) == 3
+
+    ids, cursor = search(service, query, cursor)
+    assert ids == ["5"]
+    assert cursor is None
+
+
+def test_search_cursor_pages_through_local_store(tmp_path, graph_client):
+    def handler(request):
+        return httpx.Response(200, json={
+            "value": [message(str(day), f"2025-01-0{day}T00:00:00Z") for day in range(1, 4)],
+            "@odata.deltaLink": f"{MESSAGES_URL}/delta?$deltatoken=done"})
+
+    store = MailStore(tmp_path / "mail_store.db", sync_interval=3600)
+    service = MailService(graph_client(handler), store=store)
+    query = MailQuery(count=2)
+
+    ids, cursor = search(service, query)
+    assert ids == ["3", "2"]
+    assert decode_cursor(cursor) == {"offset": 2}
+
+    ids, cursor = search(service, query, cursor)
+    assert ids == ["1"]
+    assert cursor is None
+
+
+def test_tampered_cursor_is_rejected(graph_client):
+    service = MailService(graph_client(lambda request: httpx.Response(200, json={"value": []})))
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        search(service, MailQuery(), cursor="not a cursor")
+
+
+def test_full_message_fetches_only_requested_fields_as_text(graph_client):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"id": "m1", "subject": "Plan", "body": {"contentType": "text",
+                                                                                 "content": "Hello"}})
+
+    service = MailService(graph_client(handler))
+    mail = asyncio.run(service.get_full_mail_by_id("m1", fields=["subject", "body"], prefer_text=True))
+
+    assert mail.subject == "Plan"
+    assert requests[0].url.params["$select"] == "subject,body,id"
+    assert requests[0].headers["Prefer"] == 'outlook.body-content-type="text"'
+
+
+def test_full_message_defaults_to_message_fields(graph_client):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"id": "m1"})
+
+    asyncio.run(MailService(graph_client(handler)).get_full_mail_by_id("m1"))
+
+    assert requests[0].url.params["$select"].split(",") == MESSAGE_FIELDS
+    assert "Prefer" not in requests[0].headers
+
+
+def test_search_skips_messages_that_fail_local_post_filters(graph_client):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url)
+        return httpx.Response(200, json={"value": [dict(message("1"), isRead=True), dict(message("2"), isRead=False),
+                                                   dict(message("3"), isRead=True)]})
+
+    ids, cursor = search(MailService(graph_client(handler)), MailQuery(subject="plan", is_read=True, count=5))
+
+    assert ids == ["1", "3"]
+    assert requests[0].params["$search"] == '"subject:plan"'
+    assert "$filter" not in requests[0].params
+
+
+class StaleStore:
+    """Local store that no longer holds what the query needs"""
+
+    def needs_sync(self, folder_id):
+        return False
+
+    def can_answer(self, query):
+        return False
+
+
+def test_local_store_cursor_is_rejected_when_store_cannot_answer(tmp_path):
+    service = MailService(user_client=None, store=StaleStore(), attachment_cache=AttachmentCache(tmp_path))
+
+    async def first_result():
+        results = service.iter_search_results(MailQuery(folder_id="AAMkAGI="), cursor=encode_cursor({"offset": 50}))
+        try:
+            return await results.__anext__()
+        finally:
+            await results.aclose()
+
+    with pytest.raises(ValueError, match="local index"):
+        asyncio.run(first_result())
@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from msgraph.generated.models.body_type import BodyType
+from msgraph.generated.models.email_address import EmailAddress
+from msgraph.generated.models.importance import Importance
+from msgraph.generated.models.item_body import ItemBody
+from msgraph.generated.models.message import Message
+from msgraph.generated.models.recipient import Recipient
+
+from mcpserver.graph.mail_service import MailService
+from mcpserver.mail_query import MailQuery
+from mcpserver.mail_store import MailStore
+
+DELTA_URL = "https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages/delta"
+
+
+def message(message_id, subject, received="2025-01-01T00:00:00Z"):
+    return {"id": message_id, "subject": subject, "receivedDateTime": received,
+            "from": {"emailAddress": {"name": "Ada", "address": "ada@example.com"}}}
+
+
+def inbox_ids(service):
+    response = asyncio.run(service.get_inbox())
+    return sorted(item.id for item in response.value)
+
+
+def test_delta_sync_resumes_from_saved_delta_link(tmp_path, graph_client):
+    urls = []
+
+    def handler(request):
+        urls.append(str(request.url))
+        if request.url.path.endswith("/mailFolders/inbox"):
+            return httpx.Response(200, json={"id": "INBOX-ID"})
+        if "deltatoken=first" in str(request.url):
+            return httpx.Response(200, json={
+                "value": [{"id": "1", "@removed": {"reason": "deleted"}}, message("3", "third")],
+                "@odata.deltaLink": f"{DELTA_URL}?$deltatoken=second"})
+        if "skiptoken" in str(request.url):
+            return httpx.Response(200, json={"value": [message("2", "second")],
+                                             "@odata.deltaLink": f"{DELTA_URL}?$deltatoken=first"})
+        return httpx.Response(200, json={"value": [message("1", "first")],
+                                         "@odata.nextLink": f"{DELTA_URL}?$skiptoken=page2"})
+
+    store = MailStore(tmp_path / "mail_store.db", sync_interval=0)
+    service = MailService(graph_client(handler), store=store)
+
+    assert inbox_ids(service) == ["1", "2"]
+    assert store.get_delta_link("INBOX-ID").endswith("deltatoken=first")
+
+    assert inbox_ids(service) == ["2", "3"]
+    assert "deltatoken=first" in urls[-1]
+    # The well-known name is looked up once, then the two delta pages and the resumed round
+    assert len(urls) == 4
+    assert store.get_delta_link("INBOX-ID").endswith("deltatoken=second")
+
+
+def test_well_known_name_and_folder_id_share_one_sync(tmp_path, graph_client):
+    urls = []
+
+    def handler(request):
+        urls.append(request.url.path)
+        if request.url.path.endswith("/mailFolders/inbox"):
+            return httpx.Response(200, json={"id": "INBOX-ID"})
+        return httpx.Response(200, json={"value": [message("1", "first")],
+                                         "@odata.deltaLink": f"{DELTA_URL}?$deltatoken=first"})
+
+    store = MailStore(tmp_path / "mail_store.db", sync_interval=3600)
+    service = MailService(graph_client(handler), store=store)
+
+    async def sync_both():
+        await asyncio.gather(service.sync_folder("Inbox"), service.sync_folder("INBOX-ID"))
+        return await service.sync_folder("inbox")
+
+    assert asyncio.run(sync_both()) == "INBOX-ID"
+    # Concurrent syncs under either spelling share one lookup and one delta round
+    assert len(urls) == 2
+    assert urls[1].endswith("/mailFolders/INBOX-ID/messages/delta()")
+    assert [item.id for item in store.list_messages("INBOX-ID")] == ["1"]
+    assert store.list_messages("inbox") == []
+
+
+def test_expired_delta_link_falls_back_to_full_sync(tmp_path, graph_client):
+    def handler(request):
+        if "deltatoken=expired" in str(request.url):
+            return httpx.Response(410, json={"error": {"code": "SyncStateNotFound", "message": "expired"}})
+        return httpx.Response(200, json={"value": [message("5", "fresh")],
+                                         "@odata.deltaLink": f"{DELTA_URL}?$deltatoken=new"})
+
+    store = MailStore(tmp_path / "mail_store.db", sync_interval=0)
+    store.save_delta_link("inbox", f"{DELTA_URL}?$deltatoken=expired")
+    asyncio.run(MailService(graph_client(handler), store=store).sync_folder("inbox"))
+
+    assert [item.id for item in store.list_messages("inbox")] == ["5"]
+    assert store.get_delta_link("inbox").endswith("deltatoken=new")
+
+
+def indexed_message(message_id, subject, body, received, is_read=False, odata_type="#microsoft.graph.message",
+                    importance=None):
+    return Message(id=message_id, subject=subject, is_read=is_read, odata_type=odata_type, importance=importance,
+                   received_date_time=datetime.fromisoformat(received),
+                   from_=Recipient(email_address=EmailAddress(name="Ada", address="ada@example.com")),
+                   body=ItemBody(content_type=BodyType.Text, content=body))
+
+
+def synced_store(tmp_path):
+    store = MailStore(tmp_path / "mail_store.db")
+    store.apply_changes("inbox", [
+        indexed_message("1", "Quarterly budget", "numbers attached", "2025-01-01T00:00:00+00:00",
+                        importance=Importance.High),
+        indexed_message("2", "Lunch", "the budget for lunch is fine", "2025-01-03T00:00:00+00:00", is_read=True),
+        indexed_message("3", "Offsite", "agenda only", "2025-01-02T00:00:00+00:00", importance=Importance.Normal),
+        indexed_message("4", "Budget review", "invite", "2025-01-04T00:00:00+00:00",
+                        odata_type="#microsoft.graph.eventMessageRequest"),
+    ])
+    store.save_delta_link("inbox", f"{DELTA_URL}?$deltatoken=done")
+    return store
+
+
+def search_ids(store, **criteria):
+    return [item.id for item in store.search(MailQuery(**criteria))]
+
+
+def test_full_text_search_matches_words_prefixes_and_kinds(tmp_path):
+    store = synced_store(tmp_path)
+
+    assert search_ids(store, body="budget") == ["2"]
+    assert sorted(search_ids(store, subject="budg")) == ["1", "4"]
+    assert search_ids(store, subject="budget", kind="email") == ["1"]
+    assert search_ids(store, subject="budget", kind="meetings") == ["4"]
+    assert len(search_ids(store, participants="ada@example")) == 4
+
+
+def test_filters_apply_together_with_text_terms(tmp_path):
+    store = synced_store(tmp_path)
+
+    assert search_ids(store, subject="lunch", is_read=False) == []
+    assert search_ids(store, body="budget", is_read=True) == ["2"]
+    assert search_ids(store, is_read=False) == ["4", "3", "1"]
+
+
+def test_date_bounds_compare_as_utc_like_graph(tmp_path):
+    store = synced_store(tmp_path)
+    # 2025-01-02T01:00 at UTC+2 is 2025-01-01T23:00 UTC; naive bounds are UTC, as in the Graph $filter
+    plus_two = timezone(timedelta(hours=2))
+
+    assert search_ids(store, received_after=datetime(2025, 1, 2, 1, tzinfo=plus_two)) == ["4", "2", "3"]
+    assert search_ids(store, received_before=datetime(2025, 1, 2)) == ["3", "1"]
+
+
+def test_medium_importance_matches_normal_like_graph(tmp_path):
+    store = synced_store(tmp_path)
+
+    assert search_ids(store, importance="medium") == ["3"]
+    assert search_ids(store, importance="High") == ["1"]
+
+
+def test_ordering_follows_orderby(tmp_path):
+    store = synced_store(tmp_path)
+
+    assert search_ids(store, orderby=["subject"]) == ["4", "2", "3", "1"]
+    assert search_ids(store, orderby=["importance desc"])[:2] == ["1", "3"]
+    assert search_ids(store, orderby=["receivedDateTime ASC"]) == ["1", "3", "2", "4"]
+    assert search_ids(store, is_read=False, orderby=["sentDateTime DESC", "subject asc"]) == ["4", "3", "1"]
+
+
+def test_ordering_by_a_property_outside_the_store_goes_to_graph(tmp_path):
+    store = synced_store(tmp_path)
+
+    assert not store.can_answer(MailQuery(orderby=["flag/flagStatus"]))
+    # $search ignores the ordering, so full-text queries stay local
+    assert store.can_answer(MailQuery(subject="budget", orderby=["flag/flagStatus"]))
+
+
+def test_removed_messages_leave_the_index(tmp_path):
+    store = synced_store(tmp_path)
+
+    store.remove_message("1")
+    store.apply_changes("inbox", [Message(id="2", additional_data={"@removed": {"reason": "deleted"}})])
+
+    assert search_ids(store, subject="budget") == ["4"]
+    assert search_ids(store, body="budget") == []
+    assert store.connection.execute("SELECT COUNT(*) FROM messages_fts").fetchone()[0] == 2
+
+
+def test_queries_on_fields_outside_the_store_go_to_graph(tmp_path):
+    store = synced_store(tmp_path)
+
+    assert store.can_answer(MailQuery(body="budget"))
+    assert not store.can_answer(MailQuery(attachment_name="report.pdf"))
+    assert not store.can_answer(MailQuery(kind="notes"))
+    assert not store.can_answer(MailQuery(folder_id="archive"))
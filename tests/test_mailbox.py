@@ -0,0 +1,113 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from mcpserver.auth_wrapper import requested_mailbox, requires_graph_auth
+from mcpserver.graph.controller import GraphController
+from mcpserver.graph.mail_service import MailService
+from mcpserver.graph.mailbox import current_mailbox, mailbox_path
+
+
+def test_mailbox_path_encodes_user_ids():
+    assert mailbox_path() == "/me"
+    assert mailbox_path("alice@contoso.com") == "/users/alice%40contoso.com"
+
+
+def test_service_with_mailbox_addresses_users_instead_of_me(graph_client):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/$batch"):
+            batch = json.loads(request.content)
+            return httpx.Response(200, json={"responses": [
+                {"id": item["id"], "status": 201, "body": {"id": "moved"}} for item in batch["requests"]]})
+        return httpx.Response(200, json={"value": []})
+
+    service = MailService(graph_client(handler), mailbox_id="alice@contoso.com")
+    asyncio.run(service.get_inbox(count=5))
+    asyncio.run(service.move_many([("m1", "archive")]))
+
+    assert requests[0].url.path.endswith("/users/alice@contoso.com/mailFolders/inbox/messages")
+    assert json.loads(requests[1].content)["requests"][0]["url"] == "/users/alice%40contoso.com/messages/m1/move"
+
+
+def test_each_mailbox_gets_its_own_services_and_caches():
+    controller = GraphController(object())
+    default = controller.services()
+
+    assert controller.mail is default.mail
+    assert default.folder_cache is controller.folder_cache
+
+    token = current_mailbox.set("shared@contoso.com")
+    try:
+        shared = controller.services()
+        assert controller.mail is shared.mail
+    finally:
+        current_mailbox.reset(token)
+
+    assert shared is not default
+    assert shared.mail.mailbox_id == "shared@contoso.com"
+    assert shared.folder_cache is not controller.folder_cache
+    assert shared.query_cache is not controller.query_cache
+    assert controller.services("shared@contoso.com") is shared
+
+
+def auth_context(mailbox_id=None, app_only=False, headers=None, allowed=()):
+    auth_settings = SimpleNamespace(mailbox_id=mailbox_id, app_only=app_only, allowed_mailboxes=frozenset(allowed),
+                                    get_user_client=lambda: "client")
+    graph = GraphController("client")
+    lifespan_context = SimpleNamespace(settings=auth_settings, graph=graph)
+    request = SimpleNamespace(headers=headers) if headers is not None else None
+    return SimpleNamespace(request_context=SimpleNamespace(lifespan_context=lifespan_context, request=request))
+
+
+@requires_graph_auth
+async def current_mailbox_tool(ctx):
+    return ctx.request_context.lifespan_context.graph.mail.mailbox_id
+
+
+def test_tool_calls_act_on_the_configured_mailbox():
+    assert asyncio.run(current_mailbox_tool(auth_context("team@contoso.com"))) == "team@contoso.com"
+    assert asyncio.run(current_mailbox_tool(auth_context())) is None
+    assert current_mailbox.get() is None
+
+
+def test_app_only_requires_a_mailbox():
+    result = asyncio.run(current_mailbox_tool(auth_context(app_only=True)))
+
+    assert result.startswith("Error: No mailbox selected")
+
+
+
+def test_without_header_uses_default():
+    assert requested_mailbox(auth_context(headers={}), "me@contoso.com") == "me@contoso.com"
+    assert requested_mailbox(auth_context(), "me@contoso.com") == "me@contoso.com"
+
+
+def test_header_may_select_allowed_mailbox():
+    ctx = auth_context(headers={"X-Mailbox": "Shared@Contoso.com"})
+    assert requested_mailbox(ctx, "me@contoso.com", {"shared@contoso.com"}) == "Shared@Contoso.com"
+    assert requested_mailbox(auth_context(headers={"X-Mailbox": "ME@contoso.com"}), "me@contoso.com") == \
+        "ME@contoso.com"
+
+
+def test_header_naming_other_mailbox_is_rejected():
+    with pytest.raises(PermissionError):
+        requested_mailbox(auth_context(headers={"X-Mailbox": "ceo@contoso.com"}), "me@contoso.com",
+                          {"shared@contoso.com"})
+    with pytest.raises(PermissionError):
+        requested_mailbox(auth_context(headers={"X-Mailbox": "ceo@contoso.com"}), None)
+
+
+def test_tool_call_for_a_mailbox_outside_the_allow_list_is_refused():
+    allowed = auth_context("me@contoso.com", app_only=True, headers={"X-Mailbox": "shared@contoso.com"},
+                           allowed={"shared@contoso.com"})
+    refused = auth_context("me@contoso.com", app_only=True, headers={"X-Mailbox": "ceo@contoso.com"},
+                           allowed={"shared@contoso.com"})
+
+    assert asyncio.run(current_mailbox_tool(allowed)) == "shared@contoso.com"
+    assert asyncio.run(current_mailbox_tool(refused)) == "Error: Mailbox ceo@contoso.com is not in AZURE_ALLOWED_MAILBOXES"
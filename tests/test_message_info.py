@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+from msgraph.generated.models.email_address import EmailAddress
+from msgraph.generated.models.item_body import ItemBody
+from msgraph.generated.models.message import Message
+from msgraph.generated.models.recipient import Recipient
+
+from mcpserver import message_info
+from mcpserver.message_info import MessageHeader, MessageInfo, _InternPool, format_address
+
+
+def full_message(body):
+    return Message(id="m1", subject="Plan", body=ItemBody(content=body),
+                   from_=Recipient(email_address=EmailAddress(name="Ada", address="ada@example.com")))
+
+
+def test_to_string_shows_sender_and_a_body_window():
+    text = MessageInfo(full_message("abcdefghij")).to_string(max_body_length=4, body_offset=2)
+
+    assert "From: Ada <ada@example.com>" in text
+    assert "Body:\ncdef\n" in text
+    assert "showing characters 2-6 of 10" in text
+    assert "body_offset=6" in text
+
+
+def test_to_string_without_limit_has_no_continuation_note():
+    text = MessageInfo(full_message("short")).to_string()
+
+    assert text.endswith("Body:\nshort")
+
+
+def header_message(message_id, sender, to):
+    return Message(id=message_id, subject=f"subject {message_id}",
+                   from_=Recipient(email_address=EmailAddress(name=sender, address=f"{sender.lower()}@example.com")),
+                   to_recipients=[Recipient(email_address=EmailAddress(name=name, address=f"{name}@example.com"))
+                                  for name in to])
+
+
+def test_headers_from_the_same_correspondents_share_tuples():
+    headers = MessageHeader.from_graph_page([header_message("1", "Ada", ["team", "ops"]),
+                                             header_message("2", "Ada", ["team", "ops"])])
+
+    assert headers[0].sender == ("Ada", "ada@example.com")
+    assert headers[0].sender is headers[1].sender
+    assert headers[0].to_recipients is headers[1].to_recipients
+    assert not hasattr(headers[0], "__dict__")
+
+
+def test_unselected_properties_stay_empty():
+    header = MessageHeader.from_graph(Message(id="m1"))
+
+    assert header.sender is None
+    assert header.to_recipients == ()
+    assert header.importance is None
+    assert format_address(header.sender) == "Unknown"
+    assert format_address((None, "x@example.com")) == "Unknown <x@example.com>"
+
+
+def graph_message(sender):
+    address = SimpleNamespace(name=sender.title(), address=f"{sender}@contoso.com")
+    return SimpleNamespace(id=sender, subject="s", from_=SimpleNamespace(email_address=address),
+                           to_recipients=[SimpleNamespace(email_address=address)], cc_recipients=None,
+                           bcc_recipients=None, reply_to=None, received_date_time=None, sent_date_time=None,
+                           is_read=False, has_attachments=False, importance=None, conversation_id=None)
+
+
+def test_equal_addresses_are_shared():
+    first = MessageHeader.from_graph(graph_message("alice"))
+    second = MessageHeader.from_graph(graph_message("alice"))
+
+    assert first.sender is second.sender
+    assert first.to_recipients is second.to_recipients
+
+
+def test_pool_is_bounded(monkeypatch):
+    monkeypatch.setattr(message_info, "_address_pool", _InternPool(max_size=3))
+
+    for index in range(10):
+        MessageHeader.from_graph(graph_message(f"user{index}"))
+
+    assert len(message_info._address_pool) == 3
+
+
+def test_recently_used_values_survive_eviction():
+    pool = _InternPool(max_size=2)
+    kept = pool.intern(("a", "a@contoso.com"))
+    pool.intern(("b", "b@contoso.com"))
+    pool.intern(("a", "a@contoso.com"))
+    pool.intern(("c", "c@contoso.com"))
+
+    assert pool.intern(("a", "a@contoso.com")) is kept
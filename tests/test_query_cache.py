@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+
+from mcpserver.graph.mail_service import MailService
+from mcpserver.mail_query import MailQuery
+from mcpserver.message_info import MessageHeader
+from mcpserver.query_cache import QueryCache, canonical_query_key
+
+
+def test_key_ignores_case_whitespace_and_recipient_order():
+    assert canonical_query_key(MailQuery(subject=" Budget ", to_email=["b@x.com", "A@x.com"])) == \
+        canonical_query_key(MailQuery(to_email=["a@x.com", "b@x.com"], subject="budget"))
+    assert canonical_query_key(MailQuery(to_email=["a@x.com"])) == canonical_query_key(MailQuery(to_email="a@x.com"))
+    assert canonical_query_key(MailQuery(subject="budget")) != canonical_query_key(MailQuery(subject="budget"),
+                                                                                 cursor="next")
+
+
+def counting_service(graph_client, cache):
+    requests = []
+
+    def handler(request):
+        if "/mailFolders/" in request.url.path and not request.url.path.endswith("/messages"):
+            # Well-known name lookup; answered with a made-up ID
+            name = request.url.path.rsplit("/", 1)[-1]
+            requests.append(f"resolve {name}")
+            return httpx.Response(200, json={"id": f"{name.upper()}-ID"})
+        requests.append(request.method)
+        if request.method == "POST":
+            return httpx.Response(201, json={"id": "moved"})
+        if request.method == "PATCH":
+            return httpx.Response(200, json={"id": "m1"})
+        return httpx.Response(200, json={"value": [{"id": "m1", "subject": "Budget"}, {"id": "m2"}]})
+
+    return MailService(graph_client(handler), query_cache=cache), requests
+
+
+def headers(service, query):
+    async def collect():
+        return [header.id async for header, _ in service.iter_search_headers(query)]
+    return asyncio.run(collect())
+
+
+def test_repeated_search_is_served_from_the_cache(graph_client):
+    service, requests = counting_service(graph_client, QueryCache(ttl=60))
+
+    assert headers(service, MailQuery(is_read=False, count=2)) == ["m1", "m2"]
+    assert headers(service, MailQuery(count=2, is_read=False)) == ["m1", "m2"]
+    assert requests == ["resolve inbox", "GET"]
+
+
+def test_mutations_invalidate_affected_pages(graph_client):
+    service, requests = counting_service(graph_client, QueryCache(ttl=60))
+    unread = MailQuery(is_read=False, count=2)
+    archived = MailQuery(folder_id="archive", count=2)
+
+    headers(service, unread)
+    headers(service, archived)
+    asyncio.run(service.update_mail_properties("m1", is_read=True))
+    headers(service, unread)
+    assert requests == ["resolve inbox", "GET", "resolve archive", "GET", "PATCH", "GET"]
+
+    asyncio.run(service.move_mail_to_folder("m9", "archive"))
+    headers(service, archived)
+    assert requests[-2:] == ["POST", "GET"]
+
+
+def test_moving_by_id_invalidates_pages_listed_by_well_known_name(graph_client):
+    service, requests = counting_service(graph_client, QueryCache(ttl=60))
+    archived = MailQuery(folder_id="Archive", count=2)
+
+    headers(service, archived)
+    asyncio.run(service.move_mail_to_folder("m9", "ARCHIVE-ID"))
+    headers(service, archived)
+
+    assert requests == ["resolve archive", "GET", "POST", "GET"]
+
+
+def test_moving_by_well_known_name_invalidates_pages_listed_by_id(graph_client):
+    service, requests = counting_service(graph_client, QueryCache(ttl=60))
+    by_id = MailQuery(folder_id="ARCHIVE-ID", count=2)
+
+    headers(service, by_id)
+    asyncio.run(service.move_mail_to_folder("m9", "archive"))
+    headers(service, by_id)
+
+    assert requests == ["GET", "POST", "resolve archive", "GET"]
+
+
+def test_invalidation_without_cached_pages_needs_no_lookup(graph_client):
+    service, requests = counting_service(graph_client, QueryCache(ttl=60))
+
+    asyncio.run(service.move_mail_to_folder("m9", "archive"))
+
+    assert requests == ["POST"]
+
+
+def test_incomplete_pages_and_disabled_cache_are_not_stored(graph_client):
+    service, requests = counting_service(graph_client, QueryCache(ttl=60))
+
+    async def first_only():
+        results = service.iter_search_headers(MailQuery(count=2))
+        await results.__anext__()
+        await results.aclose()
+
+    asyncio.run(first_only())
+    headers(service, MailQuery(count=2))
+    assert requests == ["resolve inbox", "GET", "GET"]
+
+    service, requests = counting_service(graph_client, QueryCache(ttl=0))
+    headers(service, MailQuery(count=2))
+    headers(service, MailQuery(count=2))
+    assert requests == ["GET", "GET"]
+
+
+def test_folder_ids_differing_in_case_get_separate_keys():
+    assert canonical_query_key(MailQuery(folder_id="AAMkAGI=")) != canonical_query_key(MailQuery(folder_id="AAMKAGI="))
+
+
+def test_well_known_folder_names_ignore_case():
+    assert canonical_query_key(MailQuery(folder_id="Inbox")) == canonical_query_key(MailQuery(folder_id="inbox"))
+
+
+def test_invalidation_matches_folder_ids_exactly():
+    cache = QueryCache(ttl=60)
+    upper, lower = MailQuery(folder_id="AAMkAGI="), MailQuery(folder_id="AAMKAGI=")
+    cache.set(upper, None, [(MessageHeader(id="1"), None)])
+    cache.set(lower, None, [(MessageHeader(id="2"), None)])
+
+    cache.invalidate(folder_ids=["AAMKAGI="])
+
+    assert cache.get(upper, None) is not None
+    assert cache.get(lower, None) is None
+
+
+def test_invalidation_of_well_known_name_ignores_case():
+    cache = QueryCache(ttl=60)
+    query = MailQuery(folder_id="Drafts")
+    cache.set(query, None, [(MessageHeader(id="1"), None)])
+
+    cache.invalidate(folder_ids=["drafts"])
+
+    assert cache.get(query, None) is None
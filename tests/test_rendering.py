@@ -0,0 +1,55 @@
+import json
+from datetime import datetime, timezone
+
+from msgraph.generated.models.date_time_time_zone import DateTimeTimeZone
+from msgraph.generated.models.email_address import EmailAddress
+from msgraph.generated.models.event import Event
+from msgraph.generated.models.location import Location
+from msgraph.generated.models.message import Message
+from msgraph.generated.models.recipient import Recipient
+
+from mcpserver.rendering import check_output_format, render_events, render_headers
+
+
+def messages():
+    return [Message(id="m1", subject="Budget | Q3", is_read=True,
+                    received_date_time=datetime(2025, 3, 1, 9, 30, tzinfo=timezone.utc),
+                    from_=Recipient(email_address=EmailAddress(name="Ada", address="ada@example.com")),
+                    to_recipients=[Recipient(email_address=EmailAddress(name="Bob", address="bob@example.com"))]),
+            Message(id="m2", subject="Lunch")]
+
+
+def test_compact_headers_are_one_row_per_message():
+    assert render_headers(messages(), "compact") == (
+        "# | Received | Read | From | Subject | Message ID\n"
+        "1 | 2025-03-01 09:30 | Y | ada@example.com | Budget / Q3 | m1\n"
+        "2 |  | N | Unknown | Lunch | m2\n")
+
+
+def test_json_headers_parse_back():
+    rows = json.loads(render_headers(messages(), "json"))
+
+    assert [row["id"] for row in rows] == ["m1", "m2"]
+    assert rows[0]["from"] == "Ada <ada@example.com>"
+    assert rows[0]["to"] == ["Bob <bob@example.com>"]
+    assert rows[0]["received"] == "2025-03-01T09:30:00+00:00"
+    assert json.loads(render_headers([], "json")) == []
+
+
+def test_verbose_headers_keep_the_original_layout():
+    text = render_headers(messages()[:1])
+
+    assert text.startswith("1. Subject: Budget | Q3\n   From: Ada <ada@example.com>\n   To: Bob <bob@example.com>\n")
+    assert text.endswith("   Message ID: m1\n\n")
+    assert render_headers([]) == "No messages found in the folder."
+
+
+def test_compact_events_and_unknown_formats():
+    event = Event(id="e1", subject="Standup", location=Location(display_name="Room 1"),
+                  start=DateTimeTimeZone(date_time="2025-03-01T09:00:00", time_zone="UTC"),
+                  end=DateTimeTimeZone(date_time="2025-03-01T09:15:00", time_zone="UTC"))
+
+    assert render_events([event], "compact").splitlines()[1] == (
+        "1 | 2025-03-01T09:00:00 | 2025-03-01T09:15:00 | Standup | Room 1 | e1")
+    assert check_output_format("compact") is None
+    assert check_output_format("xml").startswith("Error: output_format must be one of")
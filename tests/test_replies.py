@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import httpx
+
+from mcpserver.graph.mail_service import MailService
+
+
+def recording_handler(requests):
+    def handler(request):
+        requests.append((request.method, request.url.path, json.loads(request.content or b"null")))
+        if request.url.path.endswith(("/createReply", "/createReplyAll")):
+            return httpx.Response(201, json={"id": "draft"})
+        return httpx.Response(202)
+    return handler
+
+
+def test_reply_is_a_single_reply_action(graph_client):
+    requests = []
+    service = MailService(graph_client(recording_handler(requests)))
+
+    assert asyncio.run(service.reply_to_email("m1", "<p>Thanks</p>")) is True
+
+    assert len(requests) == 1
+    method, path, body = requests[0]
+    assert method == "POST"
+    assert path.endswith("/me/messages/m1/reply")
+    assert body["Comment"] == "<p>Thanks</p>"
+    assert "Message" not in body
+
+
+def test_reply_all_sends_only_the_overrides(graph_client):
+    requests = []
+    service = MailService(graph_client(recording_handler(requests)))
+
+    asyncio.run(service.reply_to_email("m1", "Noted", reply_all=True, cc_recipients=["lead@example.com"],
+                                       subject="Re: plan"))
+
+    assert len(requests) == 1
+    _, path, body = requests[0]
+    assert path.endswith("/me/messages/m1/replyAll")
+    assert body["Message"]["subject"] == "Re: plan"
+    assert body["Message"]["ccRecipients"] == [{"emailAddress": {"address": "lead@example.com"}}]
+    assert "toRecipients" not in body["Message"]
+
+
+def test_draft_reply_all_uses_create_reply_all(graph_client):
+    requests = []
+    service = MailService(graph_client(recording_handler(requests)))
+
+    draft = asyncio.run(service.create_draft_reply("m1", reply_all=True))
+
+    assert draft.id == "draft"
+    assert len(requests) == 1
+    assert requests[0][1].endswith("/me/messages/m1/createReplyAll")
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+
+import settings as settings_module
+from mcpserver.folder_tree import FolderTree
+from mcpserver.graph.controller import GraphController
+from mcpserver.mail_query import MailQuery
+from settings import AzureSettings
+
+
+class FakeDeviceCodeCredential:
+    """Stands in for DeviceCodeCredential: prompts at once, then blocks until the test signs in"""
+    instances = []
+
+    def __init__(self, prompt_callback=None, **kwargs):
+        self.prompt_callback = prompt_callback
+        self.signed_in = threading.Event()
+        self.error = None
+        FakeDeviceCodeCredential.instances.append(self)
+
+    def authenticate(self, scopes=None):
+        self.prompt_callback("https://microsoft.com/devicelogin", f"CODE{len(self.instances)}", None)
+        self.signed_in.wait(5)
+        if self.error:
+            raise self.error
+        return FakeRecord()
+
+
+class FakeRecord:
+    def serialize(self):
+        return '{"username": "me@example.com"}'
+
+
+@pytest.fixture
+def azure_settings(monkeypatch, tmp_path):
+    monkeypatch.setenv("AZURE_CLIENT_ID", "client")
+    monkeypatch.setenv("AZURE_TENANT_ID", "tenant")
+    monkeypatch.setenv("AZURE_GRAPH_SCOPES", "Mail.Read")
+    monkeypatch.setattr(settings_module, "DeviceCodeCredential", FakeDeviceCodeCredential)
+    FakeDeviceCodeCredential.instances = []
+    azure_settings = AzureSettings()
+    azure_settings.auth_record_path = tmp_path / "auth_record.json"
+    return azure_settings
+
+
+def test_concurrent_callers_share_one_device_code_flow(azure_settings):
+    async def run():
+        messages = await asyncio.gather(*(azure_settings.get_auth_instructions() for _ in range(5)))
+        assert azure_settings.user_client is None
+        FakeDeviceCodeCredential.instances[0].signed_in.set()
+        await azure_settings._auth_flow
+        return messages
+
+    messages = asyncio.run(run())
+
+    assert len(FakeDeviceCodeCredential.instances) == 1
+    assert len(set(messages)) == 1
+    assert "Enter the code: CODE1" in messages[0]
+    assert azure_settings.user_client is not None
+    assert azure_settings.credential is FakeDeviceCodeCredential.instances[0]
+    assert azure_settings.auth_record_path.read_text() == '{"username": "me@example.com"}'
+
+
+def test_failed_flow_is_reported_and_a_new_one_can_start(azure_settings):
+    async def run():
+        await azure_settings.get_auth_instructions()
+        first = FakeDeviceCodeCredential.instances[0]
+        first.error = RuntimeError("code expired")
+        first.signed_in.set()
+        with pytest.raises(RuntimeError):
+            await azure_settings._auth_flow
+        message = await azure_settings.get_auth_instructions()
+        FakeDeviceCodeCredential.instances[1].signed_in.set()
+        await azure_settings._auth_flow
+        return message
+
+    message = asyncio.run(run())
+
+    assert "Enter the code: CODE2" in message
+    assert len(FakeDeviceCodeCredential.instances) == 2
+
+
+def test_set_user_client_recreates_services_and_drops_cached_results():
+    controller = GraphController(object())
+    mail = controller.mail
+    controller.folder_cache.set(FolderTree())
+    controller.query_cache.set(MailQuery(subject="budget"), None, [])
+
+    controller.set_user_client(controller.user_client)
+    assert controller.mail is mail
+
+    new_client = object()
+    controller.set_user_client(new_client)
+
+    assert controller.mail is not mail
+    assert controller.mail.user_client is new_client
+    assert controller.folder_cache.get() is None
+    assert controller.query_cache.get(MailQuery(subject="budget")) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("", None), ("false", None), ("0", None), ("No", None),
+    ("true", "auth_cache/shared_cache.db"), ("/var/cache/outlook.db", "/var/cache/outlook.db"),
+])
+def test_shared_cache_setting(azure_settings, monkeypatch, value, expected):
+    monkeypatch.setenv("OUTLOOK_MCP_SHARED_CACHE", value)
+
+    path = AzureSettings().shared_cache_path
+
+    if expected is None:
+        assert path is None
+    else:
+        assert path.as_posix().endswith(expected)
@@ -0,0 +1,47 @@
+import time
+
+from mcpserver.mail_query import MailQuery
+from mcpserver.message_info import MessageHeader
+from mcpserver.query_cache import QueryCache
+from mcpserver.shared_cache import SharedCache
+
+
+def test_entries_expire_and_keep_namespaces_apart(tmp_path, monkeypatch):
+    cache = SharedCache(tmp_path / "cache.db")
+    cache.set("a", "key", {"value": 1}, ttl=60, meta={"version": 2})
+    cache.set("b", "key", {"value": 2}, ttl=60)
+
+    assert cache.get("a", "key") == {"value": 1}
+    assert cache.get_meta("a", "key") == {"version": 2}
+    assert cache.get_meta("b", "key") == {}
+    assert list(cache.entries("a")) == [("key", {"version": 2})]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("a", "key") is None
+    assert cache.get_meta("a", "key") is None
+
+
+def test_search_pages_and_invalidations_are_shared_between_processes(tmp_path):
+    worker_a = QueryCache(backend=SharedCache(tmp_path / "cache.db"))
+    worker_b = QueryCache(backend=SharedCache(tmp_path / "cache.db"))
+    inbox = MailQuery(subject="budget")
+    archive = MailQuery(subject="budget", folder_id="archive")
+    worker_a.set(inbox, None, [(MessageHeader(id="m1"), None)])
+    worker_a.set(archive, None, [(MessageHeader(id="m2"), None)])
+
+    assert [header.id for header, _ in worker_b.get(inbox)] == ["m1"]
+
+    worker_b.invalidate(folder_ids=["Inbox"])
+
+    assert worker_a.get(inbox) is None
+    assert worker_a.get(archive) is not None
+    worker_b.invalidate(message_ids=["m2"])
+    assert worker_a.get(archive) is None
+
+
+def test_mailboxes_do_not_share_search_pages(tmp_path):
+    backend = SharedCache(tmp_path / "cache.db")
+    QueryCache(backend=backend, namespace="a@contoso.com").set(MailQuery(), None, [])
+
+    assert QueryCache(backend=backend, namespace="b@contoso.com").get(MailQuery()) is None
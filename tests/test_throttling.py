@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+
+import httpx
+from azure.core.credentials import AccessToken
+
+from mcpserver import throttling
+from mcpserver.graph.batching import BatchRequest, execute_batch
+from mcpserver.graph.streaming import stream_response, stream_url
+from mcpserver.transport import create_graph_client, create_http_client
+
+
+class StaticCredential:
+    def get_token(self, *scopes, **kwargs):
+        return AccessToken("token", int(time.time()) + 3600)
+
+
+def throttle_first(calls):
+    def handler(request):
+        calls.append(request.url)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, content=b"data")
+    return handler
+
+
+def read_stream(handler, open_stream):
+    async def run():
+        http_client = create_http_client()
+        # SDK requests go through the middleware pipeline; raw requests go straight to the transport
+        http_client._transport.pipeline._transport = http_client._transport.transport = httpx.MockTransport(handler)
+        try:
+            user_client = create_graph_client(StaticCredential(), ["https://graph.microsoft.com/.default"], http_client)
+            async with open_stream(user_client) as response:
+                return response.status_code, await response.aread()
+        finally:
+            await http_client.aclose()
+    return asyncio.run(run())
+
+
+def test_pre_authenticated_download_is_retried():
+    calls = []
+
+    result = read_stream(throttle_first(calls), lambda client: stream_url(client, "https://contoso.sharepoint.com/dl"))
+
+    assert result == (200, b"data")
+    assert len(calls) == 2
+
+
+def test_streamed_graph_request_is_retried():
+    calls = []
+
+    result = read_stream(throttle_first(calls), lambda client: stream_response(client, "/me/messages/1/$value"))
+
+    assert result == (200, b"data")
+    assert len(calls) == 2
+
+
+def test_token_bucket_paces_after_burst():
+    async def run():
+        bucket = throttling.TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert 0.08 <= asyncio.run(run()) < 0.5
+
+
+def test_retry_after_formats():
+    assert throttling.parse_retry_after("7") == 7.0
+    assert throttling.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert throttling.parse_retry_after(None) is None
+
+
+def test_batch_budget_counts_every_inner_request():
+    body = json.dumps({"requests": [
+        {"id": str(index), "method": "POST", "url": f"/users/Alice%40contoso.com/messages/m{index}/move"}
+        for index in range(20)]}).encode()
+    batch = httpx.Request("POST", "https://graph.microsoft.com/v1.0/$batch", content=body)
+    single = httpx.Request("GET", "https://graph.microsoft.com/v1.0/me/messages")
+
+    assert throttling.ThrottlingHandler._budget(batch, body) == ("alice@contoso.com", 20)
+    assert throttling.ThrottlingHandler._budget(single, None) == ("me", 1)
+
+
+def test_throttled_graph_request_is_retried_and_pauses_the_mailbox():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"id": "me"})
+
+    async def run():
+        http_client = create_http_client()
+        http_client._transport.pipeline._transport = httpx.MockTransport(handler)
+        try:
+            user_client = create_graph_client(StaticCredential(), ["https://graph.microsoft.com/.default"], http_client)
+            user = await user_client.me.get()
+            return user, throttling.throttling_handler(http_client)
+        finally:
+            await http_client.aclose()
+
+    user, handler_in_pipeline = asyncio.run(run())
+
+    assert user.id == "me"
+    assert len(calls) == 2
+    assert handler_in_pipeline.max_retries == throttling.DEFAULT_MAX_RETRIES
+    bucket, _ = handler_in_pipeline._mailboxes["me"]
+    assert bucket.blocked_until > 0
+
+
+def test_batch_resends_only_throttled_inner_requests(graph_client):
+    sent = []
+
+    def handler(request):
+        inner = json.loads(request.content)["requests"]
+        sent.append([item["url"] for item in inner])
+        responses = []
+        for item in inner:
+            if item["url"].endswith("m1") and len(sent) == 1:
+                responses.append({"id": item["id"], "status": 429, "headers": {"Retry-After": "0"}})
+            else:
+                responses.append({"id": item["id"], "status": 200, "body": {"id": item["url"]}})
+        return httpx.Response(200, json={"responses": responses})
+
+    requests = [BatchRequest(method="GET", url=f"/me/messages/m{index}") for index in range(3)]
+    results = asyncio.run(execute_batch(graph_client(handler), requests))
+
+    assert [result.status for result in results] == [200, 200, 200]
+    assert sent == [["/me/messages/m0", "/me/messages/m1", "/me/messages/m2"], ["/me/messages/m1"]]
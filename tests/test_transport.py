@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import httpx
+from azure.core.credentials import AccessToken
+
+from mcpserver.graph.controller import GraphController
+from mcpserver.transport import create_graph_client, create_http_client
+
+
+class StaticCredential:
+    def __init__(self, token="token"):
+        self.token = token
+
+    def get_token(self, *scopes, **kwargs):
+        return AccessToken(self.token, int(time.time()) + 3600)
+
+
+def mocked_http_client(handler, **kwargs):
+    http_client = create_http_client(**kwargs)
+    http_client._transport.pipeline._transport = httpx.MockTransport(handler)
+    return http_client
+
+
+def test_http_client_is_pooled_with_configured_limits():
+    async def run():
+        http_client = create_http_client(max_connections=7, max_keepalive_connections=3, keepalive_expiry=5.0,
+                                         http2=False)
+        try:
+            return http_client._transport.transport._pool
+        finally:
+            await http_client.aclose()
+
+    pool = asyncio.run(run())
+
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    assert pool._keepalive_expiry == 5.0
+
+
+def test_graph_clients_share_one_http_client_across_credentials():
+    tokens = []
+
+    def handler(request):
+        tokens.append(request.headers["Authorization"])
+        return httpx.Response(200, json={"id": "me", "displayName": "Me"})
+
+    async def run():
+        http_client = mocked_http_client(handler)
+        try:
+            first = create_graph_client(StaticCredential("first"), ["User.Read"], http_client)
+            # Re-authentication creates a new GraphServiceClient on the same pool
+            second = create_graph_client(StaticCredential("second"), ["User.Read"], http_client)
+            assert first.request_adapter._http_client is second.request_adapter._http_client is http_client
+            await first.me.get()
+            await second.me.get()
+        finally:
+            await http_client.aclose()
+
+    asyncio.run(run())
+
+    assert tokens == ["Bearer first", "Bearer second"]
+
+
+def test_controller_aclose_closes_the_shared_client():
+    async def run():
+        http_client = create_http_client()
+        controller = GraphController(None, http_client=http_client)
+        await controller.aclose()
+        await controller.aclose()
+        return http_client
+
+    assert asyncio.run(run()).is_closed